@@ -17,7 +17,7 @@ except ImportError:
 from app.area_selector import AreaSelector, ColorSelector
 from app.capture import capture_fullscreen
 from app.optimizer import SettingsOptimizer
-from app.matcher import precompute_subtitles
+from app.subtitle_cache import get_precomputed
 from app.ocr import find_text_bounds
 
 # --- Stałe / tłumaczenia dla AreaManager ---
@@ -837,7 +837,7 @@ class AreaManagerWindow(CTkToplevel):
 
             # Evaluate original: use flattened area attrs; produce a dict for optimizer
             settings_area = area
-            pre_db = precompute_subtitles(self.subtitle_lines)
+            pre_db = get_precomputed(self.subtitle_lines, 0, self.config_mgr.subtitle_cache_dir)
             optimizer = SettingsOptimizer()
             from app.matcher import MATCH_MODE_FULL
             try:
@@ -0,0 +1,327 @@
+"""
+Trwały backend odtwarzania audio o niskim opóźnieniu.
+
+Zamiast uruchamiać `ffplay` dla każdej linii (start procesu, sondowanie
+pliku i otwarcie urządzenia audio za każdym razem), urządzenie wyjściowe
+jest otwierane raz (`sounddevice.RawOutputStream`), a pliki dekoduje
+`ffmpeg` do potoku (PCM s16le) z tym samym łańcuchem filtrów
+`atempo`/`volume`/`alimiter`. Gdy `sounddevice` lub `ffmpeg` nie są
+dostępne, PlayerThread wraca do `ffplay`.
+
+`AudioPrefetcher` dekoduje w tle kolejne linie (dialog zwykle idzie do
+przodu) do `PcmCache` - dopasowanie przewidzianej linii startuje wtedy
+bez czekania na dekoder.
+"""
+import os
+import queue
+import platform
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+    HAS_SOUNDDEVICE = True
+except (ImportError, OSError):  # OSError: brak biblioteki PortAudio w systemie
+    sd = None
+    HAS_SOUNDDEVICE = False
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+SAMPLE_WIDTH = 2  # s16le
+FRAME_BYTES = CHANNELS * SAMPLE_WIDTH
+CHUNK_FRAMES = 1024
+
+
+def find_ffmpeg_tool(name: str) -> str:
+    """Zwraca ścieżkę do narzędzia FFmpeg (lokalne lib/<name> na Linuksie, potem PATH)."""
+    if platform.system() == "Linux":
+        local_tool = os.path.abspath(os.path.join("lib", name))
+        if os.path.exists(local_tool):
+            return local_tool
+    return shutil.which(name) or name
+
+
+def startup_info():
+    """STARTUPINFO ukrywające okno konsoli procesów potomnych na Windows (inaczej None)."""
+    if platform.system() == "Windows":
+        info = subprocess.STARTUPINFO()
+        info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        info.wShowWindow = 0  # SW_HIDE
+        return info
+    return None
+
+
+def build_filter_chain(speed: float, volume: float, limiter: bool = True) -> str:
+    """
+    Łańcuch filtrów FFmpeg używany zarówno przez silnik, jak i przez ffplay.
+    Tempo 1.00 (np. gotowy wariant z TempoCache) pomija filtr `atempo`.
+    """
+    chain = f"volume={volume:.3f}"
+    if f"{speed:.2f}" != "1.00":
+        chain = f"atempo={speed:.2f},{chain}"
+    if limiter:
+        chain += ",alimiter=limit=0.95"
+    return chain
+
+
+def fade_out(data: bytes) -> bytes:
+    """Liniowe wyciszenie fragmentu PCM s16le (CHANNELS kanałów)."""
+    samples = np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS)
+    ramp = np.linspace(1.0, 0.0, len(samples), dtype=np.float32)[:, None]
+    return (samples * ramp).astype(np.int16).tobytes()
+
+
+class PcmCache:
+    """
+    LRU zdekodowanych klipów (PCM s16le) ograniczone łącznym rozmiarem w bajtach.
+    Klucz: (ścieżka źródła, tempo, wzmocnienie) - ten sam plik z inną
+    prędkością lub głośnością to inny wpis, a gotowy wariant tempa i atempo
+    liczone na żywo dają ten sam klucz. Bezpieczne wątkowo.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._data: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            pcm = self._data.get(key)
+            if pcm is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return pcm
+
+    def put(self, key, pcm: bytes):
+        if len(pcm) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._data[key] = pcm
+            self.nbytes += len(pcm)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats_text(self) -> str:
+        return (f"PCM cache: {self.hits}/{self.hits + self.misses} trafień ({self.hit_ratio:.0%}), "
+                f"{len(self)} klipów, {self.nbytes / 1048576:.1f}/{self.max_bytes / 1048576:.0f} MB")
+
+
+class AudioEngine:
+    """
+    Otwarte na stałe wyjście audio + dekodowanie plików przez potok ffmpeg.
+
+    `play()` blokuje do końca klipu (lub `interrupt()`), więc wywołuje się
+    ją z wątku odtwarzacza. `last_latency_ms` to czas od umieszczenia linii
+    w kolejce (`enqueued_at`, time.perf_counter) do przekazania pierwszych
+    próbek do urządzenia.
+    """
+
+    def __init__(self, ffmpeg_cmd: Optional[str] = None, enabled: bool = True):
+        self.ffmpeg_cmd = ffmpeg_cmd or find_ffmpeg_tool("ffmpeg")
+        self._stream = None
+        self._abort = threading.Event()
+        self._playing = threading.Event()
+        self._fade_frames = 0
+        self.last_latency_ms: Optional[float] = None
+
+        if not enabled or not HAS_SOUNDDEVICE:
+            return
+        if not (os.path.exists(self.ffmpeg_cmd) or shutil.which(self.ffmpeg_cmd)):
+            return
+        try:
+            self._stream = sd.RawOutputStream(
+                samplerate=SAMPLE_RATE, channels=CHANNELS, dtype="int16", latency="low"
+            )
+            self._stream.start()
+        except Exception as e:
+            print(f"Ostrzeżenie: Nie udało się otworzyć wyjścia audio, używam ffplay: {e}")
+            self._stream = None
+
+    @property
+    def available(self) -> bool:
+        return self._stream is not None
+
+    def _open_decoder(self, audio_file: str, filters: str) -> subprocess.Popen:
+        cmd = [
+            self.ffmpeg_cmd, "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-i", audio_file,
+            "-af", filters,
+            "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE),
+            "-",
+        ]
+        return subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            startupinfo=startup_info(),
+        )
+
+    def decode(self, audio_file: str, filters: str) -> Optional[bytes]:
+        """Dekoduje cały plik do pamięci (PCM s16le); None przy błędzie ffmpeg."""
+        try:
+            result = subprocess.run(
+                [self.ffmpeg_cmd, "-hide_banner", "-loglevel", "error", "-nostdin",
+                 "-i", audio_file, "-af", filters,
+                 "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "-"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                startupinfo=startup_info(),
+            )
+        except OSError:
+            return None
+        if result.returncode != 0 or not result.stdout:
+            return None
+        pcm = result.stdout
+        return pcm[:len(pcm) - len(pcm) % FRAME_BYTES]
+
+    def play(self, audio_file: str, filters: str, enqueued_at: Optional[float] = None,
+             stop_event: Optional[threading.Event] = None, pcm: Optional[bytes] = None,
+             is_current: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Odtwarza plik (albo gotowy bufor `pcm` z cache, bez uruchamiania
+        dekodera); zwraca False, jeśli odtwarzanie przerwano (interrupt/stop_event).
+        `is_current()` jest sprawdzane po oznaczeniu startu (`is_playing()`):
+        wywłaszczenie sprzed tej chwili nie trafiłoby w `interrupt()` (flaga
+        przerwania jest tu czyszczona), więc klip nie jest wtedy odtwarzany.
+        """
+        self._abort.clear()
+        self._fade_frames = 0
+        self.last_latency_ms = None
+        self._playing.set()
+        if is_current is not None and not is_current():
+            self._playing.clear()
+            return False
+        decoder = self._open_decoder(audio_file, filters) if pcm is None else None
+        pos = 0
+
+        def read(size: int) -> bytes:
+            nonlocal pos
+            if decoder is not None:
+                data = decoder.stdout.read(size)
+                return data[:len(data) - len(data) % FRAME_BYTES]
+            data = pcm[pos:pos + size]
+            pos += size
+            return data
+
+        first_chunk = True
+        try:
+            while not self._abort.is_set():
+                if stop_event is not None and stop_event.is_set():
+                    self._abort.set()
+                    break
+                data = read(CHUNK_FRAMES * FRAME_BYTES)
+                if not data:
+                    break
+                self._stream.write(data)
+                if first_chunk:
+                    first_chunk = False
+                    if enqueued_at is not None:
+                        self.last_latency_ms = (time.perf_counter() - enqueued_at) * 1000
+            if self._abort.is_set() and self._fade_frames and not first_chunk:
+                # Wyciszenie zamiast urwania klipu w pół słowa
+                data = read(self._fade_frames * FRAME_BYTES)
+                if data:
+                    self._stream.write(fade_out(data))
+            return not self._abort.is_set()
+        finally:
+            if decoder is not None:
+                if decoder.poll() is None:
+                    decoder.kill()
+                decoder.wait()
+                decoder.stdout.close()
+            self._playing.clear()
+
+    def is_playing(self) -> bool:
+        return self._playing.is_set()
+
+    def interrupt(self, fade_ms: int = 0):
+        """Przerywa bieżący klip; `fade_ms` > 0 dogrywa krótkie wyciszenie."""
+        self._fade_frames = max(0, int(SAMPLE_RATE * fade_ms / 1000))
+        self._abort.set()
+
+    def close(self):
+        self.interrupt()
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+
+
+class AudioPrefetcher(threading.Thread):
+    """
+    Wątek dekodujący z wyprzedzeniem pliki przewidzianych linii do PcmCache.
+    `request()` zastępuje poprzednią listę - liczy się tylko najnowsza
+    pozycja w dialogu, zaległe pliki starszej prośby są pomijane.
+    """
+
+    def __init__(self, engine: AudioEngine, cache: PcmCache, stop_event: threading.Event,
+                 resolve_callback: Callable[[str], Tuple[tuple, str, str]]):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.cache = cache
+        self.stop_event = stop_event
+        # ścieżka linii -> (klucz PCM, plik do dekodowania, łańcuch filtrów), jak przy odtwarzaniu
+        self.resolve_callback = resolve_callback
+        self._requests: "queue.Queue[List[str]]" = queue.Queue()
+        self.decoded = 0
+
+    def request(self, paths: List[str]):
+        # Nowa prośba unieważnia wcześniejsze, jeszcze nieobsłużone
+        while True:
+            try:
+                self._requests.get_nowait()
+            except queue.Empty:
+                break
+        self._requests.put(list(paths))
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                paths = self._requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            for path in paths:
+                if self.stop_event.is_set() or not self._requests.empty():
+                    break
+                key, source, filters = self.resolve_callback(path)
+                if key in self.cache or not os.path.exists(source):
+                    continue
+                pcm = self.engine.decode(source, filters)
+                if pcm:
+                    self.cache.put(key, pcm)
+                    self.decoded += 1
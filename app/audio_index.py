@@ -0,0 +1,344 @@
+"""
+Indeks katalogu audio presetu: numer linii -> plik.
+
+Budowany raz przy wczytaniu presetu (jedno `os.scandir`), zamiast składać
+nazwę `output1 (N).ext` i wołać `os.path.exists` przy każdym dopasowaniu.
+Obsługuje mieszane rozszerzenia i inne schematy nazw (wyrażenie regularne
+z grupą numeru linii, liczonego od 1). Dla każdego pliku pamięta
+rozszerzenie, rozmiar i długość (odczytaną z nagłówka WAV/OGG/MP3, bez
+uruchamiania ffprobe).
+
+Indeks jest zapisywany w `.lektor_cache` (JSON). Jeśli czas modyfikacji
+katalogu się nie zmienił, a każdy zapamiętany plik ma ten sam rozmiar
+i mtime (nadpisanie pliku w miejscu nie zmienia mtime katalogu), wczytanie
+to tylko `stat` plików; w przeciwnym razie katalog jest skanowany ponownie,
+a długości plików o niezmienionym rozmiarze i mtime są brane z cache. Tak samo wyniki analizy głośności
+(`python -m app.audio_tools loudness`), z których odtwarzacz liczy stałe
+wzmocnienie pliku.
+"""
+import hashlib
+import json
+import os
+import re
+import struct
+import wave
+from collections import Counter
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+AUDIO_INDEX_VERSION = 2
+
+AUDIO_EXTENSIONS = (".wav", ".opus", ".ogg", ".flac", ".m4a", ".mp3")
+
+# Domyślne schematy nazw (pierwsza grupa = numer linii od 1)
+DEFAULT_NAME_PATTERNS = (
+    r"output1 \((\d+)\)",
+    r"(?:line|linia)?[ _-]?0*(\d+)",
+)
+
+
+class AudioEntry(NamedTuple):
+    path: str
+    ext: str
+    size: int
+    mtime_ns: int
+    duration: Optional[float]  # sekundy; None, gdy nagłówka nie udało się odczytać
+    # Zmierzona głośność zintegrowana (LUFS) i szczyt (dBTP); None = brak analizy
+    loudness: Optional[float] = None
+    true_peak: Optional[float] = None
+
+    def gain_db(self, target_lufs: float, max_gain_db: float = 20.0) -> Optional[float]:
+        """Stałe wzmocnienie doprowadzające plik do `target_lufs` (None bez analizy)."""
+        if self.loudness is None:
+            return None
+        return max(-max_gain_db, min(max_gain_db, target_lufs - self.loudness))
+
+
+# --- Długość z nagłówków ---
+
+def _wav_duration(path: str) -> Optional[float]:
+    with wave.open(path, "rb") as w:
+        rate = w.getframerate()
+        return w.getnframes() / rate if rate else None
+
+
+def _ogg_duration(path: str, size: int) -> Optional[float]:
+    with open(path, "rb") as f:
+        head = f.read(512)
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+    if not head.startswith(b"OggS"):
+        return None
+    # Pierwszy pakiet: nagłówek strony (27 B + tablica segmentów)
+    packet = head[27 + head[26]:]
+    if packet.startswith(b"\x01vorbis"):
+        rate, pre_skip = struct.unpack_from("<I", packet, 12)[0], 0
+    elif packet.startswith(b"OpusHead"):
+        rate, pre_skip = 48000, struct.unpack_from("<H", packet, 10)[0]
+    else:
+        return None
+    last = tail.rfind(b"OggS")
+    if last < 0 or not rate:
+        return None
+    granule = struct.unpack_from("<q", tail, last + 6)[0]
+    return max(0, granule - pre_skip) / rate
+
+
+_MP3_BITRATES = {
+    # (MPEG1, Layer III), (MPEG2/2.5, Layer III) w kbps
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_duration(path: str, size: int) -> Optional[float]:
+    with open(path, "rb") as f:
+        data = f.read(16384)
+    start = 0
+    if data.startswith(b"ID3") and len(data) >= 10:
+        tag_size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        start = 10 + tag_size
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(16384)
+
+    pos = 0
+    while pos + 4 <= len(data):
+        if data[pos] == 0xFF and (data[pos + 1] & 0xE0) == 0xE0:
+            version = (data[pos + 1] >> 3) & 0x03
+            layer = (data[pos + 1] >> 1) & 0x03
+            bitrate_idx = data[pos + 2] >> 4
+            rate_idx = (data[pos + 2] >> 2) & 0x03
+            if version != 1 and layer == 1 and 0 < bitrate_idx < 15 and rate_idx < 3:
+                break
+        pos += 1
+    else:
+        return None
+
+    mpeg1 = version == 3
+    rate = _MP3_RATES[version][rate_idx]
+    samples_per_frame = 1152 if mpeg1 else 576
+    mono = (data[pos + 3] >> 6) == 3
+
+    # Nagłówek Xing/Info (VBR) podaje dokładną liczbę ramek
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info") and len(data) >= xing + 12:
+        flags = struct.unpack_from(">I", data, xing + 4)[0]
+        if flags & 0x1:
+            frames = struct.unpack_from(">I", data, xing + 8)[0]
+            return frames * samples_per_frame / rate
+
+    bitrate = _MP3_BITRATES[1 if mpeg1 else 2][bitrate_idx] * 1000
+    return (size - start - pos) * 8 / bitrate
+
+
+def read_duration(path: str, ext: str, size: int) -> Optional[float]:
+    """Długość pliku w sekundach z samego nagłówka; None dla nieobsługiwanych formatów."""
+    try:
+        if ext == ".wav":
+            return _wav_duration(path)
+        if ext in (".ogg", ".opus"):
+            return _ogg_duration(path, size)
+        if ext == ".mp3":
+            return _mp3_duration(path, size)
+    except (OSError, EOFError, wave.Error, struct.error, KeyError):
+        pass
+    return None
+
+
+# --- Indeks ---
+
+class AudioIndex:
+    """Mapa indeks linii (od 0) -> AudioEntry dla jednego katalogu audio."""
+
+    def __init__(self, audio_dir: str, entries: Dict[int, AudioEntry], dir_mtime_ns: int = 0):
+        self.audio_dir = audio_dir
+        self.entries = entries
+        self.dir_mtime_ns = dir_mtime_ns
+        self._by_path: Optional[Dict[str, AudioEntry]] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, line_idx: int) -> bool:
+        return line_idx in self.entries
+
+    def entry_for(self, line_idx: int) -> Optional[AudioEntry]:
+        return self.entries.get(line_idx)
+
+    def path_for(self, line_idx: int) -> Optional[str]:
+        entry = self.entries.get(line_idx)
+        return entry.path if entry else None
+
+    def entry_for_path(self, path: str) -> Optional[AudioEntry]:
+        if self._by_path is None:
+            self._by_path = {e.path: e for e in self.entries.values()}
+        return self._by_path.get(path)
+
+    def update(self, entries: Dict[int, AudioEntry]):
+        """Podmienia wpisy (np. po analizie głośności)."""
+        self.entries.update(entries)
+        self._by_path = None
+
+    def duration_for(self, line_idx: int) -> Optional[float]:
+        entry = self.entries.get(line_idx)
+        return entry.duration if entry else None
+
+    @property
+    def dominant_ext(self) -> Optional[str]:
+        """Najczęstsze rozszerzenie w katalogu (zastępuje dawne zgadywanie formatu)."""
+        if not self.entries:
+            return None
+        return Counter(e.ext for e in self.entries.values()).most_common(1)[0][0]
+
+    @classmethod
+    def scan(cls, audio_dir: str, preferred_ext: Optional[str] = None,
+             name_pattern: Optional[str] = None,
+             known: Optional[Dict[str, AudioEntry]] = None,
+             extensions: Tuple[str, ...] = AUDIO_EXTENSIONS,
+             skip_names: Optional[Set[str]] = None) -> "AudioIndex":
+        """
+        Skanuje katalog. Gdy kilka plików pasuje do tej samej linii, wygrywa
+        `preferred_ext`, potem kolejność AUDIO_EXTENSIONS. `known` (nazwa ->
+        wpis) pozwala pominąć odczyt nagłówka plików, które się nie zmieniły;
+        `extensions` zawęża brane pod uwagę formaty, a `skip_names` pomija
+        wskazane pliki.
+        """
+        patterns = [re.compile(name_pattern)] if name_pattern else [re.compile(p) for p in DEFAULT_NAME_PATTERNS]
+        preferred_ext = (preferred_ext or "").lower()
+        known = known or {}
+
+        def rank(ext: str) -> int:
+            return -1 if ext == preferred_ext else AUDIO_EXTENSIONS.index(ext)
+
+        entries: Dict[int, AudioEntry] = {}
+        dir_mtime_ns = os.stat(audio_dir).st_mtime_ns
+        with os.scandir(audio_dir) as it:
+            for dirent in it:
+                stem, ext = os.path.splitext(dirent.name)
+                ext = ext.lower()
+                if ext not in extensions or (skip_names and dirent.name in skip_names):
+                    continue
+                for pattern in patterns:
+                    m = pattern.fullmatch(stem)
+                    if m:
+                        break
+                else:
+                    continue
+                if not dirent.is_file():
+                    continue
+                line_idx = int(m.group(1)) - 1
+                if line_idx < 0:
+                    continue
+                current = entries.get(line_idx)
+                if current is not None and rank(current.ext) <= rank(ext):
+                    continue
+
+                st = dirent.stat()
+                cached = known.get(dirent.name)
+                if cached is not None and cached.size == st.st_size and cached.mtime_ns == st.st_mtime_ns:
+                    entries[line_idx] = cached._replace(path=dirent.path)
+                    continue
+                duration = read_duration(dirent.path, ext, st.st_size)
+                entries[line_idx] = AudioEntry(dirent.path, ext, st.st_size, st.st_mtime_ns, duration)
+        return cls(audio_dir, entries, dir_mtime_ns)
+
+    # --- Zapis / odczyt ---
+
+    def to_json(self, preferred_ext: str, name_pattern: str) -> dict:
+        return {
+            "version": AUDIO_INDEX_VERSION,
+            "audio_dir": self.audio_dir,
+            "dir_mtime_ns": self.dir_mtime_ns,
+            "preferred_ext": preferred_ext,
+            "name_pattern": name_pattern,
+            "entries": [[idx, os.path.basename(e.path), e.ext, e.size, e.mtime_ns, e.duration,
+                         e.loudness, e.true_peak]
+                        for idx, e in sorted(self.entries.items())],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "AudioIndex":
+        audio_dir = data["audio_dir"]
+        entries = {
+            idx: AudioEntry(os.path.join(audio_dir, name), ext, size, mtime_ns, duration, loudness, true_peak)
+            for idx, name, ext, size, mtime_ns, duration, loudness, true_peak in data["entries"]
+        }
+        return cls(audio_dir, entries, data["dir_mtime_ns"])
+
+
+def _index_path(cache_dir: str, audio_dir: str) -> str:
+    digest = hashlib.sha1(os.path.normcase(os.path.abspath(audio_dir)).encode("utf-8", "surrogatepass")).hexdigest()
+    return os.path.join(cache_dir, f"audio-{digest[:16]}.json")
+
+
+def _entries_unchanged(index: AudioIndex) -> bool:
+    """Czy każdy plik z indeksu ma nadal ten sam rozmiar i mtime."""
+    for entry in index.entries.values():
+        try:
+            st = os.stat(entry.path)
+        except OSError:
+            return False
+        if st.st_size != entry.size or st.st_mtime_ns != entry.mtime_ns:
+            return False
+    return True
+
+
+def get_audio_index(audio_dir: str, cache_dir: Optional[str] = None,
+                    preferred_ext: Optional[str] = None,
+                    name_pattern: Optional[str] = None) -> AudioIndex:
+    """
+    Zwraca indeks katalogu audio, korzystając z cache na dysku. Brak
+    katalogu daje pusty indeks; błędy cache kończą się zwykłym skanem.
+    """
+    if not audio_dir or not os.path.isdir(audio_dir):
+        return AudioIndex(audio_dir or "", {})
+    audio_dir = os.path.abspath(audio_dir)
+    preferred_ext = (preferred_ext or "").lower()
+    name_pattern = name_pattern or ""
+
+    path = _index_path(cache_dir, audio_dir) if cache_dir else None
+    known: Dict[str, AudioEntry] = {}
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if (data.get("version") == AUDIO_INDEX_VERSION and data.get("audio_dir") == audio_dir
+                    and data.get("name_pattern") == name_pattern):
+                cached = AudioIndex.from_json(data)
+                if (data.get("preferred_ext") == preferred_ext
+                        and cached.dir_mtime_ns == os.stat(audio_dir).st_mtime_ns
+                        and _entries_unchanged(cached)):
+                    return cached
+                known = {os.path.basename(e.path): e for e in cached.entries.values()}
+        except Exception as e:
+            print(f"Uszkodzony cache indeksu audio ({path}): {e}")
+
+    try:
+        index = AudioIndex.scan(audio_dir, preferred_ext, name_pattern or None, known)
+    except re.error as e:
+        print(f"Błędny wzorzec nazw plików audio '{name_pattern}': {e}")
+        index = AudioIndex.scan(audio_dir, preferred_ext, None, known)
+    except OSError as e:
+        print(f"Nie udało się przeskanować katalogu audio: {e}")
+        return AudioIndex(audio_dir, {})
+
+    if cache_dir:
+        save_audio_index(index, cache_dir, preferred_ext, name_pattern)
+    return index
+
+
+def save_audio_index(index: AudioIndex, cache_dir: str, preferred_ext: Optional[str] = None,
+                     name_pattern: Optional[str] = None):
+    """Zapisuje indeks do cache (atomowo); parametry muszą odpowiadać `get_audio_index`."""
+    path = _index_path(cache_dir, index.audio_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_json((preferred_ext or "").lower(), name_pattern or ""), f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Nie udało się zapisać indeksu audio: {e}")
+
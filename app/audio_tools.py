@@ -0,0 +1,290 @@
+"""
+Narzędzia wsadowe dla plików audio presetu.
+
+Uruchomienie z katalogu głównego repozytorium:
+    python -m app.audio_tools tempo --preset ścieżka/lektor.json [--tempos 1.15 1.38] [--workers 4] [--prune]
+    python -m app.audio_tools transcode --preset ścieżka/lektor.json [--format wav|opus] [--workers 4]
+                                        [--target-lufs -16 | --no-normalize] [--keep-ext]
+    python -m app.audio_tools loudness --preset ścieżka/lektor.json [--workers 4] [--force]
+(po instalacji pakietu także jako polecenie `lektor_audio`).
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from app.audio_engine import CHANNELS, SAMPLE_RATE, find_ffmpeg_tool, startup_info
+from app.audio_index import AUDIO_EXTENSIONS, AudioIndex
+from app.config_manager import ConfigManager
+from app.tempo_cache import TempoCache, tempo_steps
+
+TRANSCODE_MANIFEST = ".lektor_transcode.json"
+TRANSCODE_VERSION = 1
+
+# Formaty o tanim starcie dekodera: PCM bez dekodowania, Opus z ramkami 10 ms
+TRANSCODE_FORMATS = {
+    "wav": (".wav", ["-c:a", "pcm_s16le", "-f", "wav"]),
+    "opus": (".opus", ["-c:a", "libopus", "-b:a", "96k", "-frame_duration", "10",
+                       "-application", "audio", "-f", "opus"]),
+}
+
+
+def _print_progress(done: int, total: int):
+    if done == total or done % 50 == 0:
+        print(f"  {done}/{total}", flush=True)
+
+
+def cmd_tempo(preset: str, tempos: Optional[List[float]] = None, workers: Optional[int] = None,
+              prune: bool = False) -> int:
+    """Renderuje warianty tempa wszystkich plików audio presetu do `.lektor_cache/tempo`."""
+    config = ConfigManager()
+    config.load_preset(preset)
+    index = config.load_audio_index()
+    if not len(index):
+        print(f"Brak plików audio w katalogu: {config.audio_dir}")
+        return 1
+
+    cache = TempoCache(config.tempo_cache_dir, index, max_bytes=config.audio_tempo_cache_mb * 1024 * 1024)
+    if prune:
+        print(f"Usunięto nieaktualne warianty: {cache.prune()}")
+
+    tempos = tempos or tempo_steps(config.audio_speed, config.audio_speed_multipliers())
+    if not tempos:
+        print("Preset nie używa temp innych niż 1.00 - nic do zrobienia.")
+        return 0
+    missing = len(cache.missing(tempos))
+    print(f"Pliki: {len(index)}, tempa: {', '.join(f'{t:.2f}' for t in tempos)}, do wyrenderowania: {missing}")
+    rendered = cache.fill(tempos, workers, progress=_print_progress)
+    print(f"Gotowe: {rendered}/{missing} -> {config.tempo_cache_dir}")
+    return 0 if rendered == missing else 2
+
+
+def transcode_file(source: str, target: str, fmt: str, target_lufs: Optional[float],
+                   ffmpeg_cmd: str) -> bool:
+    """
+    Transkoduje jeden plik (zapis atomowy). `target_lufs` = None wyłącza
+    normalizację głośności (loudnorm, jednoprzebiegowo). Funkcja modułu -
+    wywoływana w procesach puli.
+    """
+    codec_args = TRANSCODE_FORMATS[fmt][1]
+    filters = ["-af", f"loudnorm=I={target_lufs}:TP=-1.5:LRA=11"] if target_lufs is not None else []
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        result = subprocess.run(
+            [ffmpeg_cmd, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", "-i", source,
+             *filters, "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), *codec_args, tmp_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            startupinfo=startup_info(),
+        )
+        if result.returncode != 0:
+            return False
+        os.replace(tmp_path, target)
+        return True
+    except OSError:
+        return False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _load_manifest(path: str) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == TRANSCODE_VERSION:
+            return data
+    except (OSError, ValueError):
+        pass
+    return {"version": TRANSCODE_VERSION, "files": {}}
+
+
+def _save_manifest(path: str, manifest: Dict):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def cmd_transcode(preset: str, fmt: str = "wav", workers: Optional[int] = None,
+                  target_lufs: Optional[float] = -16.0, update_preset: bool = True) -> int:
+    """
+    Transkoduje pliki audio presetu obok oryginałów (ta sama nazwa, nowe
+    rozszerzenie). Manifest `.lektor_transcode.json` w katalogu audio
+    pamięta rozmiar i mtime źródła oraz ustawienia - ponowne uruchomienie
+    pomija pliki bez zmian, więc przerwaną konwersję można wznowić.
+    Na końcu `audio_ext` presetu wskazuje nowy format (indeks audio
+    preferuje go, a linie bez konwersji grają z oryginałów).
+    """
+    config = ConfigManager()
+    config.load_preset(preset)
+    audio_dir = config.audio_dir
+    if not audio_dir or not os.path.isdir(audio_dir):
+        print(f"Brak katalogu audio: {audio_dir}")
+        return 1
+
+    out_ext = TRANSCODE_FORMATS[fmt][0]
+    manifest_path = os.path.join(audio_dir, TRANSCODE_MANIFEST)
+    manifest = _load_manifest(manifest_path)
+    # Źródła to oryginały - pliki z wcześniejszych konwersji (dowolny format) są pomijane
+    sources = AudioIndex.scan(
+        audio_dir, None, config.audio_name_pattern or None,
+        extensions=tuple(e for e in AUDIO_EXTENSIONS if e != out_ext),
+        skip_names=set(manifest["files"]),
+    )
+    if not len(sources):
+        print(f"Brak plików do konwersji w katalogu: {audio_dir}")
+        return 1
+    settings = {"format": fmt, "target_lufs": target_lufs}
+    jobs = []
+    for entry in sources.entries.values():
+        out_name = os.path.splitext(os.path.basename(entry.path))[0] + out_ext
+        record = {"source": os.path.basename(entry.path), "size": entry.size,
+                  "mtime_ns": entry.mtime_ns, **settings}
+        if manifest["files"].get(out_name) == record and os.path.exists(os.path.join(audio_dir, out_name)):
+            continue
+        jobs.append((entry, out_name, record))
+
+    print(f"Pliki: {len(sources)}, do konwersji: {len(jobs)} -> {out_ext}"
+          f"{'' if target_lufs is None else f' (normalizacja {target_lufs} LUFS)'}")
+    ffmpeg_cmd = find_ffmpeg_tool("ffmpeg")
+    failed = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(transcode_file, entry.path, os.path.join(audio_dir, out_name),
+                            fmt, target_lufs, ffmpeg_cmd): (out_name, record)
+                for entry, out_name, record in jobs
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                out_name, record = futures[future]
+                if future.result():
+                    manifest["files"][out_name] = record
+                else:
+                    failed += 1
+                    print(f"  Błąd konwersji: {record['source']}")
+                # Zapis co jakiś czas - przerwane zadanie wznowi się od tego miejsca
+                if done % 50 == 0 or done == len(jobs):
+                    _save_manifest(manifest_path, manifest)
+                _print_progress(done, len(jobs))
+
+    if update_preset and (failed < len(jobs) or not jobs):
+        if config.audio_ext != out_ext:
+            config.audio_ext = out_ext
+            print(f"audio_ext w presecie: {out_ext}")
+    print(f"Gotowe: {len(jobs) - failed}/{len(jobs)}, błędy: {failed}")
+    return 0 if failed == 0 else 2
+
+
+def measure_loudness(source: str, ffmpeg_cmd: str) -> Optional[Tuple[float, float]]:
+    """
+    Zwraca (głośność zintegrowana LUFS, szczyt dBTP) pliku - analiza filtrem
+    loudnorm (bez zapisu wyniku). Funkcja modułu - wywoływana w procesach puli.
+    """
+    try:
+        result = subprocess.run(
+            [ffmpeg_cmd, "-hide_banner", "-nostdin", "-i", source,
+             "-af", "loudnorm=print_format=json", "-f", "null", "-"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            startupinfo=startup_info(),
+        )
+    except OSError:
+        return None
+    stderr = result.stderr.decode("utf-8", "replace")
+    start, end = stderr.rfind("{"), stderr.rfind("}")
+    if result.returncode != 0 or start < 0 or end < start:
+        return None
+    try:
+        stats = json.loads(stderr[start:end + 1])
+        loudness, peak = float(stats["input_i"]), float(stats["input_tp"])
+    except (ValueError, KeyError):
+        return None
+    # Cisza daje -inf - takiego pliku nie wzmacniamy
+    if not (math.isfinite(loudness) and math.isfinite(peak)):
+        return None
+    return loudness, peak
+
+
+def cmd_loudness(preset: str, workers: Optional[int] = None, force: bool = False) -> int:
+    """
+    Mierzy głośność plików audio presetu (pula procesów) i zapisuje wyniki
+    w indeksie audio. Pliki już zmierzone (i niezmienione) są pomijane.
+    """
+    config = ConfigManager()
+    config.load_preset(preset)
+    index = config.load_audio_index()
+    if not len(index):
+        print(f"Brak plików audio w katalogu: {config.audio_dir}")
+        return 1
+
+    jobs = [(idx, e) for idx, e in index.entries.items() if force or e.loudness is None]
+    print(f"Pliki: {len(index)}, do analizy: {len(jobs)}")
+    ffmpeg_cmd = find_ffmpeg_tool("ffmpeg")
+    measured: Dict[int, object] = {}
+    failed = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(measure_loudness, e.path, ffmpeg_cmd): (idx, e) for idx, e in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                idx, entry = futures[future]
+                result = future.result()
+                if result is None:
+                    failed += 1
+                else:
+                    measured[idx] = entry._replace(loudness=result[0], true_peak=result[1])
+                # Zapis co jakiś czas - przerwana analiza wznowi się od tego miejsca
+                if done % 50 == 0 or done == len(jobs):
+                    index.update(measured)
+                    config.save_audio_index(index)
+                _print_progress(done, len(jobs))
+
+    target = config.audio_target_lufs
+    gains = [e.gain_db(target) for e in index.entries.values() if e.loudness is not None]
+    if gains:
+        print(f"Wzmocnienia do {target} LUFS: min {min(gains):+.1f} dB, max {max(gains):+.1f} dB")
+    print(f"Gotowe: {len(measured)}/{len(jobs)}, bez wyniku: {failed}")
+    return 0 if failed == 0 else 2
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Narzędzia audio Lektora")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_tempo = sub.add_parser("tempo", help="Wyrenderuj warianty tempa plików audio presetu")
+    p_tempo.add_argument("--preset", type=str, required=True)
+    p_tempo.add_argument("--tempos", type=float, nargs="+", default=None,
+                         help="Tempa do wyrenderowania (domyślnie: z presetu)")
+    p_tempo.add_argument("--workers", type=int, default=None)
+    p_tempo.add_argument("--prune", action="store_true", help="Usuń warianty nieaktualnych plików")
+
+    p_tr = sub.add_parser("transcode", help="Konwertuj pliki audio presetu do formatu o niskim opóźnieniu")
+    p_tr.add_argument("--preset", type=str, required=True)
+    p_tr.add_argument("--format", choices=sorted(TRANSCODE_FORMATS), default="wav")
+    p_tr.add_argument("--workers", type=int, default=None)
+    p_tr.add_argument("--target-lufs", type=float, default=-16.0)
+    p_tr.add_argument("--no-normalize", action="store_true", help="Bez normalizacji głośności")
+    p_tr.add_argument("--keep-ext", action="store_true", help="Nie zmieniaj audio_ext w presecie")
+
+    p_ld = sub.add_parser("loudness", help="Zmierz głośność plików audio (stałe wzmocnienie zamiast limitera)")
+    p_ld.add_argument("--preset", type=str, required=True)
+    p_ld.add_argument("--workers", type=int, default=None)
+    p_ld.add_argument("--force", action="store_true", help="Zmierz ponownie wszystkie pliki")
+
+    args = parser.parse_args(argv)
+    if args.command == "tempo":
+        return cmd_tempo(args.preset, args.tempos, args.workers, args.prune)
+    if args.command == "transcode":
+        return cmd_transcode(args.preset, args.format, args.workers,
+                             None if args.no_normalize else args.target_lufs, not args.keep_ext)
+    if args.command == "loudness":
+        return cmd_loudness(args.preset, args.workers, args.force)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
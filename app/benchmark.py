@@ -0,0 +1,863 @@
+"""
+Proste benchmarki wydajności gorących ścieżek Lektora.
+
+Uruchomienie z katalogu głównego repozytorium:
+    python -m app.benchmark ocr [--image obraz.png] [--iterations 20]
+    python -m app.benchmark matcher [--lines 100000] [--queries 200]
+    python -m app.benchmark scoring [--lines 100000] [--queries 60]
+    python -m app.benchmark cache [--lines 100000]
+    python -m app.benchmark capture [--width 1920] [--height 200] [--seconds 3]
+    python -m app.benchmark pipewire [--iterations 50]
+    python -m app.benchmark preprocess [--cases 200] [--iterations 30]
+    python -m app.benchmark change [--iterations 100]
+    python -m app.benchmark audio --file plik.ogg [--iterations 5]
+    python -m app.benchmark audioindex [--dir katalog_audio] [--files 5000]
+    python -m app.benchmark tempo [--lines 300] [--budget 5] [--gap 2.5]
+    python -m app.benchmark gap [--clips 20] [--clip-ms 150]
+    python -m app.benchmark runtime [--iterations 200]
+    python -m app.benchmark areas [--areas 8] [--iterations 500]
+    python -m app.benchmark reload [--lines 100000] [--edits 5]
+    python -m app.benchmark memory [--lines 200000]
+    python -m app.benchmark startup [--budget 600] [--top 15]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List, Optional
+
+from PIL import Image, ImageDraw
+
+
+def _sample_text_image(text: str = "Witaj wędrowcze, dokąd zmierzasz?") -> Image.Image:
+    """Generuje obraz przypominający przetworzony napis (czarny tekst na białym tle)."""
+    img = Image.new("L", (900, 60), 255)
+    draw = ImageDraw.Draw(img)
+    draw.text((10, 15), text, fill=0)
+    return img.resize((img.width * 2, img.height * 2), Image.BICUBIC)
+
+
+def _measure(fn: Callable[[], object], iterations: int) -> List[float]:
+    """Zwraca czasy kolejnych wywołań w milisekundach."""
+    times = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def _report(label: str, times: List[float]):
+    if not times:
+        print(f"{label:<28} brak pomiarów")
+        return
+    print(f"{label:<28} median={statistics.median(times):8.2f} ms | "
+          f"min={min(times):8.2f} ms | max={max(times):8.2f} ms | n={len(times)}")
+
+
+def bench_ocr(image_path: Optional[str] = None, iterations: int = 20):
+    """Porównuje opóźnienie pojedynczego wywołania OCR: pytesseract vs trwały silnik."""
+    from app.ocr import OcrEngine, _pytesseract_image_to_string
+
+    image = Image.open(image_path) if image_path else _sample_text_image()
+
+    _report("pytesseract (subprocess)", _measure(lambda: _pytesseract_image_to_string(image), iterations))
+
+    engine = OcrEngine()
+    if not engine.in_process:
+        print("tesserocr niedostępny - pomijam pomiar silnika in-process.")
+        return
+    try:
+        engine.image_to_string(image)  # rozgrzewka
+        _report("OcrEngine (in-process)", _measure(lambda: engine.image_to_string(image), iterations))
+    finally:
+        engine.close()
+
+
+_SYLLABLES = ["ka", "mi", "no", "wie", "rz", "sz", "cz", "ła", "ść", "do", "bro", "gra", "le",
+              "ta", "pa", "ko", "we", "dzi", "ni", "ro", "ża", "ję", "mo", "sy", "ty", "ch"]
+
+
+def _synthetic_subtitles(count: int, seed: int = 1) -> List[str]:
+    """Generuje pseudo-polskie linie dialogowe (słownik ~4000 słów)."""
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(4000)]
+    lines = []
+    for _ in range(count):
+        words = [rng.choice(vocab) for _ in range(rng.randint(3, 16))]
+        lines.append(" ".join(words).capitalize() + rng.choice([".", "?", "!", "..."]))
+    return lines
+
+
+def _ocr_noise(text: str, rng: random.Random, rate: float = 0.06) -> str:
+    """Symuluje błędy OCR: podmiana, usunięcie lub wstawienie znaku."""
+    out = []
+    for ch in text:
+        r = rng.random()
+        if r < rate / 3:
+            continue
+        if r < 2 * rate / 3:
+            out.append(rng.choice("abcdeilnorstuwz"))
+            continue
+        out.append(ch)
+        if r < rate:
+            out.append(rng.choice("il1.,"))
+    return "".join(out)
+
+
+def _matcher_queries(lines: List[str], count: int, seed: int = 2):
+    """Zapytania (tekst_ocr, tryb, ostatni_indeks) dla wszystkich trybów dopasowania."""
+    from app.matcher import MATCH_MODE_FULL, MATCH_MODE_STARTS, MATCH_MODE_PARTIAL
+
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        idx = rng.randrange(len(lines))
+        mode = [MATCH_MODE_FULL, MATCH_MODE_STARTS, MATCH_MODE_PARTIAL][i % 3]
+        text = lines[idx]
+        if mode != MATCH_MODE_FULL:
+            words = text.split()
+            text = " ".join(words[:max(3, len(words) // 2)])
+        # Połowa zapytań z "trafionym" oknem lokalnym, połowa to globalne chybienia
+        last_index = idx - rng.randint(1, 20) if i % 2 else rng.randrange(len(lines))
+        queries.append((_ocr_noise(text, rng), mode, last_index))
+    return queries
+
+
+def _matcher_config(**overrides):
+    from app.config_manager import PresetConfig
+    from app.runtime_config import RuntimeConfig
+
+    return RuntimeConfig.from_config(PresetConfig(**overrides))
+
+
+def bench_matcher(line_count: int = 100000, query_count: int = 200):
+    """
+    Porównuje globalne wyszukiwanie przez indeks trigramów z pełnym skanem:
+    czas na zapytanie oraz zgodność wyników.
+    """
+    from app.matcher import precompute_subtitles, find_best_match
+
+    lines = _synthetic_subtitles(line_count)
+    t0 = time.perf_counter()
+    db = precompute_subtitles(lines)
+    print(f"precompute_subtitles({line_count} linii): {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    queries = _matcher_queries(lines, query_count)
+    results = {}
+    for label, cfg in (("pełny skan", _matcher_config(matcher_use_index=False)),
+                       ("indeks trigramów", _matcher_config(matcher_use_index=True))):
+        times, found = [], []
+        for text, mode, last_index in queries:
+            t0 = time.perf_counter()
+            found.append(find_best_match(text, db, mode, last_index=last_index, matcher_config=cfg))
+            times.append((time.perf_counter() - t0) * 1000)
+        _report(label, times)
+        results[label] = found
+
+    same = sum(1 for a, b in zip(results["pełny skan"], results["indeks trigramów"]) if a == b)
+    print(f"Zgodność wyników: {same}/{len(queries)}")
+
+
+def bench_scoring(line_count: int = 100000, query_count: int = 60):
+    """
+    Porównuje ocenę kandydatów pętlą fuzz.ratio z oceną wsadową (process.cdist)
+    przy pełnym skanie bazy (bez indeksu trigramów).
+    """
+    import app.matcher as matcher
+
+    if matcher.process is None:
+        print("rapidfuzz niedostępny - brak ścieżki wsadowej.")
+        return
+
+    lines = _synthetic_subtitles(line_count)
+    db = matcher.precompute_subtitles(lines)
+    queries = _matcher_queries(lines, query_count)
+    cfg = _matcher_config(matcher_use_index=False)
+
+    results = {}
+    original = matcher.USE_BATCH_SCORING
+    try:
+        for label, batch in (("pętla fuzz.ratio", False), ("process.cdist", True)):
+            matcher.USE_BATCH_SCORING = batch
+            times, found = [], []
+            for text, mode, last_index in queries:
+                t0 = time.perf_counter()
+                found.append(matcher.find_best_match(text, db, mode, last_index=last_index, matcher_config=cfg))
+                times.append((time.perf_counter() - t0) * 1000)
+            _report(label, times)
+            results[label] = found
+    finally:
+        matcher.USE_BATCH_SCORING = original
+
+    same = sum(1 for a, b in zip(results["pętla fuzz.ratio"], results["process.cdist"]) if a == b)
+    print(f"Zgodność wyników: {same}/{len(queries)}")
+
+
+def bench_subtitle_cache(line_count: int = 100000):
+    """Porównuje precompute_subtitles z wczytaniem bazy z cache na dysku."""
+    import tempfile
+    from app.matcher import precompute_subtitles
+    from app.subtitle_cache import get_precomputed
+
+    lines = _synthetic_subtitles(line_count)
+    _report("precompute_subtitles", _measure(lambda: precompute_subtitles(lines), 3))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t0 = time.perf_counter()
+        fresh = precompute_subtitles(lines)
+        get_precomputed(lines, 0, cache_dir)
+        print(f"pierwsze uruchomienie (zapis cache): {(time.perf_counter() - t0) * 1000:.0f} ms")
+        _report("wczytanie z cache", _measure(lambda: get_precomputed(lines, 0, cache_dir), 5))
+
+        cached = get_precomputed(lines, 0, cache_dir)
+        store = cached[0]
+        same = ([e[1:] for e in store] == [e[1:] for e in fresh[0]]
+                and all(store.original_at(p) == e[0] for p, e in enumerate(fresh[0]))
+                and all(cached[1][k] == v for k, v in fresh[1].items())
+                and all((getattr(cached[2], n) == getattr(fresh[2], n)).all()
+                        for n in ("alphabet", "gram_ids", "offsets", "postings")))
+        print(f"Zgodność z precompute_subtitles: {'tak' if same else 'NIE'}")
+
+
+def _captures_per_second(fn: Callable[[], object], seconds: float) -> float:
+    count = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - t0)
+
+
+def bench_capture(width: int = 1920, height: int = 200, seconds: float = 3.0):
+    """Zrzuty regionu na sekundę: nowy `mss.mss()` na klatkę vs uchwyt wątku."""
+    import mss
+    from app.capture import capture_region, close_thread_capture
+
+    rect = {"top": 0, "left": 0, "width": width, "height": height}
+
+    def per_frame_handle():
+        with mss.mss() as sct:
+            sct_img = sct.grab(rect)
+            return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+
+    try:
+        before = _captures_per_second(per_frame_handle, seconds)
+    except Exception as e:
+        print(f"mss niedostępne w tym środowisku: {e}")
+        return
+    after = _captures_per_second(lambda: capture_region(rect), seconds)
+    close_thread_capture()
+
+    print(f"mss.mss() na klatkę      {before:8.1f} zrzutów/s")
+    print(f"MssCapture (uchwyt wątku) {after:8.1f} zrzutów/s")
+
+
+def bench_pipewire_region(iterations: int = 50):
+    """
+    Wycinanie paska napisów z klatki 4K BGRA: dawna ścieżka (kopia całej klatki
+    + konwersja kanałów, potem wycinek) vs konwersja samego wycinka.
+    Raportuje czas i szczytową alokację (tracemalloc).
+    """
+    import tracemalloc
+    import numpy as np
+    from app.capture import PipewireWaylandCapture
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (2160, 3840, 4), dtype=np.uint8)
+
+    class _FakeStream:
+        window_invalid = False
+
+        def get_frame(self):
+            return frame
+
+    grabber = PipewireWaylandCapture.__new__(PipewireWaylandCapture)
+    grabber._stream = _FakeStream()
+    region = (400, 1800, 3000, 220)
+
+    def legacy():
+        arr = np.array(grabber._stream.get_frame())[:, :, [2, 1, 0]]
+        x, y, w, h = region
+        return Image.fromarray(arr[y:y + h, x:x + w], mode="RGB")
+
+    variants = (("kopia klatki (dawniej)", legacy),
+                ("wycinek RGB", lambda: grabber.grab_region(*region)),
+                ("wycinek L", lambda: grabber.grab_region(*region, grayscale=True)))
+    for label, fn in variants:
+        tracemalloc.start()
+        img = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        _report(label, _measure(fn, iterations))
+        # tracemalloc nie widzi buforów Pillow - doliczamy rozmiar obrazu wynikowego
+        out = img.width * img.height * len(img.getbands())
+        print(f"{'':<28} alokacja: numpy {peak / 1024:,.0f} KiB + obraz {out / 1024:,.0f} KiB")
+
+    same_rgb = legacy().tobytes() == grabber.grab_region(*region).tobytes()
+    same_l = legacy().convert("L").tobytes() == grabber.grab_region(*region, grayscale=True).tobytes()
+    print(f"Zgodność z dawną ścieżką: RGB {'tak' if same_rgb else 'NIE'}, L {'tak' if same_l else 'NIE'}")
+
+
+def _subtitle_frame(rng: random.Random, width: int = 1600, height: int = 180,
+                    text_color=(240, 230, 60)) -> Image.Image:
+    """Pasek z kolorowym napisem na zaszumionym, kolorowym tle (jak fragment klatki gry)."""
+    import numpy as np
+
+    noise = np.random.default_rng(rng.randrange(1 << 30)).integers(0, 140, (height, width, 3), dtype=np.uint8)
+    img = Image.fromarray(noise, mode="RGB")
+    draw = ImageDraw.Draw(img)
+    for row in range(2):
+        draw.text((rng.randint(50, 600), 40 + row * 50), " ".join(rng.sample(_SYLLABLES, 8)) * 3,
+                  fill=text_color)
+    return img
+
+
+def bench_preprocess(case_count: int = 200, iterations: int = 30):
+    """
+    Test równoważności preprocess_image (NumPy) z implementacją PIL na losowych
+    ustawieniach obszaru oraz porównanie czasu na klatkę.
+    """
+    from app.config_manager import AreaConfig
+    from app.ocr import _preprocess_image_numpy, _preprocess_image_pil
+
+    rng = random.Random(3)
+    cfg = _matcher_config()
+    text_color = (240, 230, 60)
+
+    mismatches = 0
+    for i in range(case_count):
+        img = _subtitle_frame(rng, rng.randint(40, 500), rng.randint(20, 120), text_color)
+        if i % 5 == 0:
+            img = img.convert("L")
+        colors = rng.choice([[], ["#f0e63c"], ["#f0e63c", "#ffffff"], ["#ffffff", "bad", ""], [""]])
+        area = AreaConfig(
+            colors=colors,
+            text_thickening=rng.choice([0, 0, 1, 2]),
+            brightness_threshold=rng.choice([0, 80, 150, 200, 254, 255]),
+            contrast=rng.choice([0.0, 0.0, 0.5, 1.5, -0.5]),
+            color_tolerance=rng.choice([1, 10, 40]),
+            ocr_scale_factor=rng.choice([1.0, 1.0, 1.5, 0.5]),
+            brightness_mode=rng.choice(["Light", "Dark", "Mixed"]),
+        )
+        # Ścieżka PIL wypisuje błąd przycinania dla RGB w trybie Mixed - wyciszamy go
+        with contextlib.redirect_stdout(io.StringIO()):
+            a = _preprocess_image_pil(img.copy(), cfg, area_config=area)
+        b = _preprocess_image_numpy(img.copy(), cfg, area_config=area)
+        if a[1:] != b[1:] or a[0].mode != b[0].mode or a[0].tobytes() != b[0].tobytes():
+            mismatches += 1
+            print(f"Różnica dla {area} (tryb obrazu {img.mode}): {a[1:]} vs {b[1:]}")
+    print(f"Zgodność NumPy vs PIL: {case_count - mismatches}/{case_count}")
+
+    frame = _subtitle_frame(rng, text_color=text_color)
+    for label, area in (("kolory + pogrubienie", AreaConfig(colors=["#f0e63c", "#ffffff"], text_thickening=1)),
+                        ("jasność + kontrast", AreaConfig(contrast=0.5, brightness_threshold=150))):
+        _report(f"PIL   | {label}", _measure(lambda: _preprocess_image_pil(frame, cfg, area_config=area), iterations))
+        _report(f"NumPy | {label}", _measure(lambda: _preprocess_image_numpy(frame, cfg, area_config=area), iterations))
+
+
+def bench_change_detection(iterations: int = 100):
+    """
+    Wykrywanie zmian wycinka: pełna różnica ImageChops + ImageStat względem
+    kopii poprzedniej klatki vs sygnatury kafelków (TileChangeDetector).
+    """
+    from PIL import ImageChops, ImageStat
+    from app.change_detector import TileChangeDetector
+
+    rng = random.Random(4)
+    frame = _subtitle_frame(rng)
+    other = _subtitle_frame(rng)
+    similarity = 5
+
+    def full_diff():
+        stat = ImageStat.Stat(ImageChops.difference(frame, frame.copy()))
+        return sum(stat.mean) < similarity
+
+    detector = TileChangeDetector()
+    detector.changed_tiles(0, frame, similarity)
+    _report("ImageChops + ImageStat", _measure(full_diff, iterations))
+    _report("TileChangeDetector", _measure(lambda: detector.changed_tiles(0, frame, similarity), iterations))
+
+    signature = detector._signatures[0]
+    print(f"Pamięć na obszar: kopia {frame.width * frame.height * 3 / 1024:,.0f} KiB, "
+          f"sygnatura {signature.nbytes / 1024:,.1f} KiB ({signature.shape[0]}x{signature.shape[1]} kafelków)")
+    changed = detector.changed_tiles(0, other, similarity)
+    print(f"Inny napis: zmienione kafelki {int(changed.sum())}/{changed.size}; "
+          f"pominięte klatki {detector.skip_ratio * 100:.0f}%")
+
+    # Zgodność decyzji "nowa klatka" z pełną różnicą dla drobnych zmian obrazu
+    agree = 0
+    variants = [Image.eval(frame, lambda v, d=d: min(255, v + d)) for d in range(0, 12)] + [other]
+    for variant in variants:
+        detector.reset()
+        detector.changed_tiles(0, frame, similarity)
+        stat = ImageStat.Stat(ImageChops.difference(frame, variant))
+        agree += (sum(stat.mean) >= similarity) == bool(detector.changed_tiles(0, variant, similarity).any())
+    print(f"Zgodność z progiem całej klatki (similarity={similarity}): {agree}/{len(variants)}")
+
+
+def bench_audio(audio_file: str, iterations: int = 5):
+    """
+    Opóźnienie startu odtwarzania: czas od "wrzucenia do kolejki" do pierwszych
+    próbek w urządzeniu (AudioEngine, z dekoderem i z PCM z cache) oraz do
+    uruchomienia procesu ffplay.
+    Odtwarza plik z głośnością 0.
+    """
+    import subprocess
+    from app.audio_engine import AudioEngine, build_filter_chain, find_ffmpeg_tool
+
+    filters = build_filter_chain(1.0, 0.0)
+    engine = AudioEngine()
+    if engine.available:
+        latencies = []
+        for _ in range(iterations):
+            engine.play(audio_file, filters, enqueued_at=time.perf_counter())
+            latencies.append(engine.last_latency_ms)
+        _report("AudioEngine: 1. próbka", latencies)
+
+        # Linia przewidziana przez AudioPrefetcher: PCM już w pamięci
+        pcm = engine.decode(audio_file, filters)
+        if pcm:
+            cached = []
+            for _ in range(iterations):
+                engine.play(audio_file, filters, enqueued_at=time.perf_counter(), pcm=pcm)
+                cached.append(engine.last_latency_ms)
+            _report("AudioEngine + PCM cache: 1. próbka", cached)
+            print(f"  PCM: {len(pcm) / 1048576:.2f} MB")
+    else:
+        print("AudioEngine niedostępny (brak sounddevice lub ffmpeg).")
+    engine.close()
+
+    ffplay = find_ffmpeg_tool("ffplay")
+    spawn = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        try:
+            proc = subprocess.Popen([ffplay, "-nodisp", "-autoexit", "-af", filters, audio_file],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"ffplay niedostępny: {e}")
+            return
+        spawn.append((time.perf_counter() - t0) * 1000)
+        proc.wait()
+    _report("ffplay: start procesu", spawn)
+
+
+def bench_audio_index(audio_dir: Optional[str] = None, file_count: int = 5000):
+    """
+    Skan katalogu audio (zimny / z cache) oraz koszt wyszukania pliku linii:
+    os.path.exists na złożonej nazwie vs AudioIndex.path_for.
+    Bez --dir tworzy tymczasowy katalog z pustymi plikami WAV.
+    """
+    import os
+    import tempfile
+    import wave
+    from app.audio_index import get_audio_index
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not audio_dir:
+            audio_dir = os.path.join(tmp, "audio")
+            os.makedirs(audio_dir)
+            for i in range(file_count):
+                with wave.open(os.path.join(audio_dir, f"output1 ({i + 1}).wav"), "wb") as w:
+                    w.setnchannels(1)
+                    w.setsampwidth(2)
+                    w.setframerate(22050)
+                    w.writeframes(b"\0\0" * 2205)
+        cache_dir = os.path.join(tmp, "cache")
+
+        t0 = time.perf_counter()
+        index = get_audio_index(audio_dir, cache_dir, ".wav")
+        print(f"pierwszy skan ({len(index)} plików): {(time.perf_counter() - t0) * 1000:.0f} ms")
+        _report("wczytanie z cache", _measure(lambda: get_audio_index(audio_dir, cache_dir, ".wav"), 5))
+
+        ext = index.dominant_ext or ".wav"
+        lines = sorted(index.entries)[:1000] or list(range(1000))
+        _report("os.path.exists x1000", _measure(
+            lambda: [os.path.exists(os.path.join(audio_dir, f"output1 ({i + 1}){ext}")) for i in lines], 5))
+        _report("AudioIndex.path_for x1000", _measure(lambda: [index.path_for(i) for i in lines], 5))
+
+
+def bench_tempo_schedule(line_count: int = 300, budget: float = 5.0, mean_gap: float = 2.5):
+    """
+    Symulacja szybkiego dialogu: linie (długość 1-6 s) pojawiają się średnio
+    co `mean_gap` s. Porównuje zaległość kolejki audio przy stałym mnożniku
+    audio_speed_inc i przy TempoScheduler (budżet `budget` s).
+    """
+    from app.tempo_scheduler import TempoScheduler, speed_steps
+
+    base, speed_inc, speed_max = 1.15, 1.2, 1.5
+    rng = random.Random(0)
+    arrivals, durations, t = [], [], 0.0
+    for _ in range(line_count):
+        t += rng.expovariate(1.0 / mean_gap)
+        arrivals.append(t)
+        durations.append(rng.uniform(1.0, 6.0))
+
+    def simulate(pick):
+        busy_until, waits, tempos = 0.0, [], []
+        for now, duration in zip(arrivals, durations):
+            wait = max(0.0, busy_until - now)
+            multiplier = pick(now, duration, wait > 0)
+            busy_until = now + wait + duration / (base * multiplier)
+            waits.append(wait)
+            tempos.append(multiplier)
+        return waits, tempos
+
+    scheduler = TempoScheduler(budget, speed_steps(speed_inc, speed_max), lambda: base)
+    for label, pick in (
+        ("stały audio_speed_inc", lambda now, d, busy: speed_inc if busy else 1.0),
+        ("TempoScheduler", lambda now, d, busy: scheduler.plan(d, busy, now)[0]),
+    ):
+        waits, tempos = simulate(pick)
+        print(f"{label:<24} oczekiwanie: mediana={statistics.median(waits):5.2f} s, "
+              f"p95={sorted(waits)[int(len(waits) * 0.95)]:5.2f} s, max={max(waits):5.2f} s | "
+              f"średni mnożnik={statistics.mean(tempos):.2f}")
+
+
+def bench_clip_gap(clips: int = 20, clip_ms: int = 150):
+    """
+    Przerwa między klipami w PlayerThread (ścieżka procesowa). Zamiast ffplay
+    uruchamiany jest skrypt, który zapisuje czas startu i końca "odtwarzania";
+    przerwa = start kolejnego - koniec poprzedniego. Dla porównania: sam
+    start procesu skryptu (wliczony w przerwę). Tylko POSIX (shebang).
+    """
+    import os
+    import subprocess
+    import tempfile
+    import threading
+    from app.playback_queue import PlaybackItem, PlaybackQueue
+    from app.player import PlayerThread
+
+    if os.name != "posix":
+        print("Benchmark wymaga systemu POSIX.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_ffplay")
+        with open(script, "w") as f:
+            f.write(f"#!{sys.executable}\n"
+                    "import sys, time\n"
+                    "open(sys.argv[-1] + '.start', 'w').write(repr(time.time()))\n"
+                    f"time.sleep({clip_ms / 1000})\n"
+                    "open(sys.argv[-1] + '.end', 'w').write(repr(time.time()))\n")
+        os.chmod(script, 0o755)
+
+        def stamp(path, kind):
+            with open(f"{path}.{kind}") as f:
+                return float(f.read())
+
+        spawn = []
+        for i in range(5):
+            path = os.path.join(tmp, f"baseline{i}")
+            t0 = time.time()
+            subprocess.run([script, path])
+            spawn.append((stamp(path, "start") - t0) * 1000)
+
+        stop_event = threading.Event()
+        audio_queue = PlaybackQueue()
+        player = PlayerThread(stop_event, audio_queue, use_engine=False)
+        player.ffplay_cmd = script
+        paths = [os.path.join(tmp, f"clip{i}") for i in range(clips)]
+        for path in paths:
+            audio_queue.put(PlaybackItem(path, 1.0, time.perf_counter()))
+        player.start()
+
+        deadline = time.monotonic() + clips * (clip_ms / 1000 + 1.0)
+        while not os.path.exists(paths[-1] + ".end") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop_event.set()
+        player.join(2.0)
+
+        done = [p for p in paths if os.path.exists(p + ".end")]
+        gaps = [(stamp(b, "start") - stamp(a, "end")) * 1000 for a, b in zip(done, done[1:])]
+        _report("start procesu (bazowo)", spawn)
+        _report("koniec -> start kolejnego", gaps)
+        _report("PlayerThread.clip_gaps", list(player.clip_gaps))
+
+
+def bench_runtime_config(iterations: int = 200):
+    """
+    Koszt odczytu ustawień w gorącej pętli: właściwości ConfigManager
+    (przez _get_preset_obj) vs migawka RuntimeConfig, oraz dawny fallback
+    find_best_match bez konfiguracji (nowy ConfigManager() z odczytem z dysku).
+    """
+    from app.config_manager import ConfigManager, PresetConfig
+    from app.runtime_config import RuntimeConfig, default_runtime_config
+
+    fields = ("capture_interval", "partial_mode_min_len", "match_score_short", "match_score_long",
+              "match_len_diff_ratio", "matcher_use_index", "matcher_index_top_n")
+    cm = ConfigManager()
+    cm.preset_path = ""
+    cm.preset_cache = PresetConfig()
+    snapshot = RuntimeConfig.from_config(cm)
+    reads = 1000
+
+    def read_all(source):
+        def run():
+            for _ in range(reads):
+                for name in fields:
+                    getattr(source, name)
+        return run
+
+    print(f"{reads} x {len(fields)} odczytów pól dopasowania/przechwytywania:")
+    _report("ConfigManager", _measure(read_all(cm), iterations))
+    _report("RuntimeConfig", _measure(read_all(snapshot), iterations))
+
+    def old_fallback():
+        # Dawne find_best_match(matcher_config=None): nowy ConfigManager, każdy
+        # odczyt bez preset_cache buduje PresetConfig od nowa
+        fallback = ConfigManager()
+        fallback.preset_path = ""
+        for name in fields:
+            getattr(fallback, name)
+
+    _report("fallback ConfigManager()", _measure(old_fallback, iterations))
+    _report("default_runtime_config()", _measure(default_runtime_config, iterations))
+    _report("RuntimeConfig.from_config", _measure(lambda: RuntimeConfig.from_config(cm), iterations))
+
+
+def bench_area_views(area_count: int = 8, iterations: int = 500):
+    """
+    ConfigManager.get_areas: dawna deepcopy + przeskalowanie przy każdym
+    wywołaniu vs widoki z cache (get_area_views) i tanie kopie (get_areas).
+    Odświeżenie listy w AreaManagerze to jedno get_areas(), rysowanie palety
+    kolorów - jedno get_area_views().
+    """
+    import copy
+    from app.config_manager import AreaConfig, ConfigManager, PresetConfig, STANDARD_WIDTH
+
+    cm = ConfigManager()
+    cm.preset_path = ""
+    cm.preset_cache = PresetConfig(areas=[
+        AreaConfig(id=i + 1, type="continuous" if i == 0 else "manual",
+                   rect={"left": 100 * i, "top": 1700, "width": 3000, "height": 300},
+                   colors=["#ffffff", "#f0e68c"], ocr_scale_factor=2.0)
+        for i in range(area_count)
+    ])
+    cm.display_resolution = (1920, 1080)
+
+    def legacy_get_areas():
+        areas_copy = copy.deepcopy(cm.preset_cache.areas)
+        dw, dh = cm.display_resolution
+        ratio = STANDARD_WIDTH / dw
+        for area in areas_copy:
+            area.rect = cm._scale_rect_to_physical(area.rect, dw, dh)
+            area.ocr_scale_factor = float(area.ocr_scale_factor) / ratio
+        return areas_copy
+
+    same = [a._to_dict() for a in legacy_get_areas()] == [a._to_dict() for a in cm.get_areas()]
+    print(f"{area_count} obszarów, 1920x1080 - zgodność z dawnym get_areas: {same}")
+    _report("deepcopy + skalowanie", _measure(legacy_get_areas, iterations))
+    _report("get_areas (kopie widoków)", _measure(cm.get_areas, iterations))
+    _report("get_area_views", _measure(cm.get_area_views, iterations))
+    _report("get_area(0)", _measure(lambda: cm.get_area(0), iterations))
+
+
+def bench_subtitle_reload(line_count: int = 100000, edits: int = 5):
+    """
+    Przeładowanie edytowanego pliku napisów: pełne precompute_subtitles vs
+    update_precomputed (poprawki w miejscu oraz wstawienie/usunięcie linii),
+    ze sprawdzeniem zgodności wpisów i wyników dopasowania.
+    """
+    from app.matcher import precompute_subtitles, update_precomputed, find_best_match
+
+    lines = _synthetic_subtitles(line_count)
+    data = precompute_subtitles(lines)
+    rng = random.Random(5)
+
+    edited = list(lines)
+    for _ in range(edits):
+        k = rng.randrange(len(edited))
+        edited[k] = edited[k] + " naprawdę"
+    shifted = list(edited)
+    shifted.insert(rng.randrange(len(shifted)), "Nowa linia dialogu.")
+    del shifted[rng.randrange(len(shifted))]
+
+    cfg = _matcher_config()
+    for label, new_lines in ((f"{edits} poprawek", edited), ("wstawienie + usunięcie", shifted)):
+        t0 = time.perf_counter()
+        full = precompute_subtitles(new_lines)
+        t_full = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        updated, reprocessed = update_precomputed(lines, new_lines, data)
+        t_update = (time.perf_counter() - t0) * 1000
+
+        queries = _matcher_queries(new_lines, 30)
+        with contextlib.redirect_stdout(io.StringIO()):
+            same = sum(
+                find_best_match(t, full, m, last_index=i, matcher_config=cfg)
+                == find_best_match(t, updated, m, last_index=i, matcher_config=cfg)
+                for t, m, i in queries
+            )
+        print(f"{label}: pełne {t_full:.0f} ms | przyrostowe {t_update:.0f} ms "
+              f"(przetworzono {reprocessed} linii) | wpisy zgodne: {updated[0] == full[0]} | "
+              f"dopasowania {same}/{len(queries)}")
+
+
+def bench_subtitle_memory(line_count: int = 200000):
+    """
+    Pamięć bazy napisów (tracemalloc): lista linii + precompute_subtitles
+    vs strumieniowe wczytanie do SubtitleStore i baza zmapowana z cache.
+    Podaje szczyt w trakcie wczytywania i pamięć zajętą po nim.
+    """
+    import gc
+    import tempfile
+    import tracemalloc
+    from app.matcher import precompute_subtitles
+    from app.subtitle_cache import get_subtitle_db
+
+    def load_list(path):
+        # Dotychczasowa ścieżka czytnika (jak ConfigManager.load_text_lines)
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        return lines, precompute_subtitles(lines)
+
+    def measure(label, load):
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        data = load()
+        elapsed = (time.perf_counter() - t0) * 1000
+        gc.collect()
+        kept, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:28s} {elapsed:7.0f} ms | szczyt {peak / 2**20:7.1f} MB | "
+              f"po wczytaniu {kept / 2**20:7.1f} MB")
+        return data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "napisy.txt")
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(_synthetic_subtitles(line_count)) + "\n")
+        print(f"Plik napisów: {line_count} linii, {os.path.getsize(text_path) / 2**20:.1f} MB")
+        cache_dir = os.path.join(tmp, "cache")
+
+        listed = measure("lista + precompute", lambda: load_list(text_path))
+        del listed
+        measure("SubtitleStore (bez cache)", lambda: get_subtitle_db(text_path, 0, None))
+        get_subtitle_db(text_path, 0, cache_dir)
+        measure("SubtitleStore (mmap cache)", lambda: get_subtitle_db(text_path, 0, cache_dir))
+
+
+def bench_startup(budget_ms: float, top: int = 15) -> int:
+    """Zimny start (import lektor w nowym procesie); zwraca kod wyjścia profile_startup."""
+    from app.startup_profile import profile_startup
+
+    return profile_startup(budget_ms, top)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmarki wydajności Lektora")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p_ocr = sub.add_parser("ocr", help="Opóźnienie OCR: pytesseract vs silnik in-process")
+    p_ocr.add_argument("--image", type=str, default=None)
+    p_ocr.add_argument("--iterations", type=int, default=20)
+
+    p_match = sub.add_parser("matcher", help="find_best_match: indeks trigramów vs pełny skan")
+    p_match.add_argument("--lines", type=int, default=100000)
+    p_match.add_argument("--queries", type=int, default=200)
+
+    p_score = sub.add_parser("scoring", help="_scan_list: pętla fuzz.ratio vs process.cdist")
+    p_score.add_argument("--lines", type=int, default=100000)
+    p_score.add_argument("--queries", type=int, default=60)
+
+    p_cache = sub.add_parser("cache", help="precompute_subtitles vs cache bazy napisów na dysku")
+    p_cache.add_argument("--lines", type=int, default=100000)
+
+    p_cap = sub.add_parser("capture", help="capture_region: mss.mss() na klatkę vs trwały uchwyt")
+    p_cap.add_argument("--width", type=int, default=1920)
+    p_cap.add_argument("--height", type=int, default=200)
+    p_cap.add_argument("--seconds", type=float, default=3.0)
+
+    p_pw = sub.add_parser("pipewire", help="PipeWire: kopia całej klatki vs konwersja wycinka")
+    p_pw.add_argument("--iterations", type=int, default=50)
+
+    p_pre = sub.add_parser("preprocess", help="preprocess_image: NumPy vs PIL (zgodność i czas)")
+    p_pre.add_argument("--cases", type=int, default=200)
+    p_pre.add_argument("--iterations", type=int, default=30)
+
+    p_chg = sub.add_parser("change", help="Wykrywanie zmian: pełna różnica obrazu vs sygnatury kafelków")
+    p_chg.add_argument("--iterations", type=int, default=100)
+
+    p_audio = sub.add_parser("audio", help="Opóźnienie startu audio: AudioEngine vs ffplay")
+    p_audio.add_argument("--file", type=str, required=True)
+    p_audio.add_argument("--iterations", type=int, default=5)
+
+    p_aidx = sub.add_parser("audioindex", help="Indeks katalogu audio vs os.path.exists")
+    p_aidx.add_argument("--dir", type=str, default=None)
+    p_aidx.add_argument("--files", type=int, default=5000)
+
+    p_tempo = sub.add_parser("tempo", help="Symulacja zaległości audio: stały mnożnik vs TempoScheduler")
+    p_tempo.add_argument("--lines", type=int, default=300)
+    p_tempo.add_argument("--budget", type=float, default=5.0)
+    p_tempo.add_argument("--gap", type=float, default=2.5)
+
+    p_gap = sub.add_parser("gap", help="Przerwa między kolejnymi klipami w PlayerThread")
+    p_gap.add_argument("--clips", type=int, default=20)
+    p_gap.add_argument("--clip-ms", type=int, default=150)
+
+    p_rt = sub.add_parser("runtime", help="Odczyt ustawień: ConfigManager vs migawka RuntimeConfig")
+    p_rt.add_argument("--iterations", type=int, default=200)
+
+    p_areas = sub.add_parser("areas", help="get_areas: deepcopy na wywołanie vs widoki z cache")
+    p_areas.add_argument("--areas", type=int, default=8)
+    p_areas.add_argument("--iterations", type=int, default=500)
+
+    p_reload = sub.add_parser("reload", help="Przeładowanie napisów: pełne vs przyrostowe")
+    p_reload.add_argument("--lines", type=int, default=100000)
+    p_reload.add_argument("--edits", type=int, default=5)
+
+    p_mem = sub.add_parser("memory", help="Pamięć bazy napisów: listy krotek vs SubtitleStore")
+    p_mem.add_argument("--lines", type=int, default=200000)
+
+    from app.startup_profile import STARTUP_BUDGET_MS
+
+    p_start = sub.add_parser("startup", help="Czas importu lektor.py przy zimnym starcie (kod 1 = ponad budżet)")
+    p_start.add_argument("--budget", type=float, default=STARTUP_BUDGET_MS)
+    p_start.add_argument("--top", type=int, default=15)
+
+    args = parser.parse_args(argv)
+    if args.bench == "ocr":
+        bench_ocr(args.image, args.iterations)
+    elif args.bench == "matcher":
+        bench_matcher(args.lines, args.queries)
+    elif args.bench == "scoring":
+        bench_scoring(args.lines, args.queries)
+    elif args.bench == "cache":
+        bench_subtitle_cache(args.lines)
+    elif args.bench == "capture":
+        bench_capture(args.width, args.height, args.seconds)
+    elif args.bench == "pipewire":
+        bench_pipewire_region(args.iterations)
+    elif args.bench == "preprocess":
+        bench_preprocess(args.cases, args.iterations)
+    elif args.bench == "change":
+        bench_change_detection(args.iterations)
+    elif args.bench == "audio":
+        bench_audio(args.file, args.iterations)
+    elif args.bench == "audioindex":
+        bench_audio_index(args.dir, args.files)
+    elif args.bench == "tempo":
+        bench_tempo_schedule(args.lines, args.budget, args.gap)
+    elif args.bench == "gap":
+        bench_clip_gap(args.clips, args.clip_ms)
+    elif args.bench == "runtime":
+        bench_runtime_config(args.iterations)
+    elif args.bench == "areas":
+        bench_area_views(args.areas, args.iterations)
+    elif args.bench == "reload":
+        bench_subtitle_reload(args.lines, args.edits)
+    elif args.bench == "memory":
+        bench_subtitle_memory(args.lines)
+    elif args.bench == "startup":
+        return bench_startup(args.budget, args.top)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,28 +3,48 @@ import platform
 import os
 import time
 import atexit
+import importlib.util
 import logging
 import json
-from typing import Optional, Dict
+import threading
+from typing import Optional, Dict, TYPE_CHECKING
 
 import mss
-import numpy as np
 from PIL import Image
-if platform.system().lower() == 'linux':
-    try:
-        from pipewire_capture import (
-            PortalCapture,
-            CaptureStream,
-            is_available as pw_is_available,
-        )
-    except ImportError:
-        PortalCapture = None
-        CaptureStream = None
-        pw_is_available = lambda: False
-else:
-    PortalCapture = None
-    CaptureStream = None
-    pw_is_available = lambda: False
+
+if TYPE_CHECKING:
+    import numpy as np  # numpy potrzebny tylko backendowi PipeWire (import w metodach)
+
+# Moduł pipewire_capture: None = jeszcze nie ładowany, False = niedostępny.
+# Import (i start PipeWire/portalu) następuje dopiero przy pierwszym użyciu
+# backendu - zwykle przy START - a nie przy starcie aplikacji.
+_pipewire = None
+
+
+def _pipewire_module():
+    global _pipewire
+    if _pipewire is None:
+        _pipewire = False
+        if platform.system().lower() == 'linux':
+            try:
+                import pipewire_capture
+
+                _pipewire = pipewire_capture
+            except ImportError:
+                pass
+    return _pipewire or None
+
+
+def pw_is_available() -> bool:
+    module = _pipewire_module()
+    return module is not None and module.is_available()
+
+
+def _pipewire_installed() -> bool:
+    """Czy pakiet pipewire_capture jest zainstalowany (bez importu)."""
+    if _pipewire is not None:
+        return bool(_pipewire)
+    return platform.system().lower() == 'linux' and importlib.util.find_spec('pipewire_capture') is not None
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +72,8 @@ class PipewireWaylandCapture:
         if not pw_is_available():
             raise RuntimeError("PipeWire capture nie jest dostępne w tym środowisku.")
 
-        self._portal = PortalCapture()
+        pipewire = _pipewire_module()
+        self._portal = pipewire.PortalCapture()
         self._session = None
         self._stream = None
 
@@ -64,7 +85,7 @@ class PipewireWaylandCapture:
         self._width = session.width
         self._height = session.height
 
-        self._stream = CaptureStream(
+        self._stream = pipewire.CaptureStream(
             session.fd,
             session.node_id,
             session.width,
@@ -73,8 +94,11 @@ class PipewireWaylandCapture:
         )
         self._stream.start()
 
-    def _get_latest_frame_array(self, timeout: float = 0.5):
-        """Pobiera najnowszą klatkę jako numpy array (H, W, 3) RGB."""
+    def _get_latest_frame(self, timeout: float = 0.5) -> "np.ndarray":
+        """
+        Pobiera najnowszą klatkę jako widok numpy (H, W, 4) BGRA - bez kopiowania
+        bufora; konwersja kanałów dotyczy dopiero wyciętego regionu.
+        """
         if getattr(self._stream, "window_invalid", False):
             raise RuntimeError("Okno przechwytywane przez PipeWire zostało zamknięte.")
 
@@ -88,20 +112,40 @@ class PipewireWaylandCapture:
         if frame is None:
             raise RuntimeError("Brak dostępnej ramki z PipeWire w zadanym czasie.")
 
-        arr = np.array(frame)  # BGRA: (H, W, 4)
+        import numpy as np
+
+        arr = np.asarray(frame)  # BGRA: (H, W, 4)
         if arr.ndim != 3 or arr.shape[2] < 3:
             raise RuntimeError(f"Nieoczekiwany kształt ramki: {arr.shape}")
-
-        # BGRA -> RGB
-        rgb_arr = arr[:, :, [2, 1, 0]]
-        return rgb_arr
-
-    def grab_fullscreen(self) -> Image.Image:
-        arr = self._get_latest_frame_array()
-        return Image.fromarray(arr, mode="RGB")
-
-    def grab_region(self, left: int, top: int, width: int, height: int) -> Image.Image:
-        arr = self._get_latest_frame_array()
+        return arr
+
+    @staticmethod
+    def _bgra_to_image(frame: "np.ndarray", x1: int, y1: int, x2: int, y2: int,
+                       grayscale: bool = False) -> Image.Image:
+        """
+        Konwertuje prostokąt klatki BGRA na obraz RGB lub od razu na luminancję L.
+        Pillow dekoduje wiersze wprost z bufora klatki (stride = szerokość wiersza),
+        więc alokowany jest tylko obraz wynikowy o rozmiarze wycinka.
+        """
+        w, h = x2 - x1, y2 - y1
+        channels = frame.shape[2]
+        rawmode = "BGRX" if channels == 4 else "BGR"
+        if frame.flags.c_contiguous:
+            stride = frame.shape[1] * channels
+            start = y1 * stride + x1 * channels
+            data = frame.reshape(-1)[start:start + (h - 1) * stride + w * channels]
+        else:
+            data, stride = frame[y1:y2, x1:x2].copy(order="C"), 0
+        img = Image.frombuffer("RGB", (w, h), data, "raw", rawmode, stride, 1)
+        return img.convert("L") if grayscale else img
+
+    def grab_fullscreen(self, grayscale: bool = False) -> Image.Image:
+        arr = self._get_latest_frame()
+        return self._bgra_to_image(arr, 0, 0, arr.shape[1], arr.shape[0], grayscale)
+
+    def grab_region(self, left: int, top: int, width: int, height: int,
+                    grayscale: bool = False) -> Image.Image:
+        arr = self._get_latest_frame()
         h, w = arr.shape[0], arr.shape[1]
         x1 = max(0, min(left, w))
         y1 = max(0, min(top, h))
@@ -109,7 +153,7 @@ class PipewireWaylandCapture:
         y2 = max(0, min(top + height, h))
         if x2 <= x1 or y2 <= y1:
             raise RuntimeError("Żądany region wychodzi poza obszar klatki.")
-        return Image.fromarray(arr[y1:y2, x1:x2], mode="RGB")
+        return self._bgra_to_image(arr, x1, y1, x2, y2, grayscale)
 
     def stop(self) -> None:
         try:
@@ -162,9 +206,11 @@ def reset_pipewire_source():
         return False
 
 
-def _determine_backend() -> str:
+def _determine_backend(probe: bool = True) -> str:
     """
     Automatycznie dobiera najlepszy backend do zrzutów ekranu.
+    Z `probe=False` nie importuje pipewire_capture (wystarczy, że pakiet
+    jest zainstalowany) - do stanu przycisków UI przy starcie.
     """
     app_config_path = os.path.expanduser('~/.config/app_config.json')
     try:
@@ -176,13 +222,103 @@ def _determine_backend() -> str:
     except Exception:
         pass
 
-    if _is_wayland() and pw_is_available():
+    if _is_wayland() and (pw_is_available() if probe else _pipewire_installed()):
         return 'pipewire_wayland'
 
     return 'mss'
 
 
-SCREENSHOT_BACKEND = _determine_backend()
+_SCREENSHOT_BACKEND: Optional[str] = None
+
+
+def get_screenshot_backend() -> str:
+    """Backend zrzutów ustalany przy pierwszym zrzucie (wcześniej: przy imporcie modułu)."""
+    global _SCREENSHOT_BACKEND
+    if _SCREENSHOT_BACKEND is None:
+        _SCREENSHOT_BACKEND = _determine_backend()
+    return _SCREENSHOT_BACKEND
+
+
+def expected_backend() -> str:
+    """Ustalony backend albo jego przewidywanie bez importu pipewire_capture."""
+    return _SCREENSHOT_BACKEND or _determine_backend(probe=False)
+
+
+# ---------------------------------------------------------------------------
+# Backend: mss (X11 / Windows / macOS)
+# ---------------------------------------------------------------------------
+
+class MssCapture:
+    """
+    Długożyjący uchwyt mss dla jednego wątku.
+
+    `mss.mss()` przy każdym wywołaniu otwiera i zamyka połączenie z X11/GDI
+    (wraz z segmentem pamięci współdzielonej), więc trzymamy jeden uchwyt
+    na wątek (mss nie jest bezpieczne wielowątkowo). Uchwyt jest odtwarzany
+    po `invalidate_capture()` (zmiana rozdzielczości) oraz po błędzie zrzutu.
+    """
+
+    def __init__(self) -> None:
+        self._sct = mss.mss()
+        self.generation = _MSS_GENERATION
+
+    def _grab(self, rect: Dict[str, int]) -> Image.Image:
+        sct_img = self._sct.grab(rect)
+        return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+
+    def grab_fullscreen(self) -> Image.Image:
+        monitors = self._sct.monitors
+        monitor = monitors[1] if len(monitors) > 1 else monitors[0]
+        return self._grab(monitor)
+
+    def grab_region(self, left: int, top: int, width: int, height: int) -> Image.Image:
+        return self._grab({"top": top, "left": left, "width": width, "height": height})
+
+    def close(self) -> None:
+        try:
+            self._sct.close()
+        except Exception:
+            pass
+
+
+_MSS_GENERATION = 0
+_mss_local = threading.local()
+
+
+def _get_mss_capture() -> MssCapture:
+    grabber = getattr(_mss_local, "capture", None)
+    if grabber is not None and grabber.generation != _MSS_GENERATION:
+        grabber.close()
+        grabber = None
+    if grabber is None:
+        grabber = MssCapture()
+        _mss_local.capture = grabber
+    return grabber
+
+
+def _mss_grab(grab):
+    """Wykonuje zrzut uchwytem wątku; po błędzie odtwarza uchwyt i ponawia raz."""
+    try:
+        return grab(_get_mss_capture())
+    except mss.ScreenShotError:
+        close_thread_capture()
+        return grab(_get_mss_capture())
+
+
+def invalidate_capture():
+    """Unieważnia uchwyty mss wszystkich wątków (np. po zmianie rozdzielczości)."""
+    global _MSS_GENERATION
+    _MSS_GENERATION += 1
+
+
+def close_thread_capture():
+    """Zamyka uchwyt mss bieżącego wątku (wywołaj przed zakończeniem wątku)."""
+    grabber = getattr(_mss_local, "capture", None)
+    if grabber is not None:
+        grabber.close()
+        _mss_local.capture = None
+
+atexit.register(close_thread_capture)
 
 
 def capture_fullscreen() -> Optional[Image.Image]:
@@ -190,30 +326,25 @@ def capture_fullscreen() -> Optional[Image.Image]:
     Pobiera zrzut całego ekranu.
     """
     try:
-        if SCREENSHOT_BACKEND == 'pipewire_wayland':
+        if get_screenshot_backend() == 'pipewire_wayland':
             try:
                 grabber = _get_pipewire_capture()
                 return grabber.grab_fullscreen()
             except Exception as e:
                 logger.error(f"Błąd backendu PipeWire: {e}, fallback do mss...")
-                with mss.mss() as sct:
-                    monitor = sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0]
-                    sct_img = sct.grab(monitor)
-                    return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+                return _mss_grab(lambda g: g.grab_fullscreen())
 
-        with mss.mss() as sct:
-            monitor = sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0]
-            sct_img = sct.grab(monitor)
-            return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+        return _mss_grab(lambda g: g.grab_fullscreen())
 
     except Exception as e:
         logger.error(f"BŁĄD (capture_fullscreen): {e}")
         return None
 
 
-def capture_region(region: Dict[str, int]) -> Optional[Image.Image]:
+def capture_region(region: Dict[str, int], grayscale: bool = False) -> Optional[Image.Image]:
     """
     Pobiera wycinek ekranu zdefiniowany przez słownik region.
+    Z `grayscale=True` zwraca od razu obraz w trybie L (luminancja).
     """
     try:
         top = int(region.get('top', 0))
@@ -221,21 +352,16 @@ def capture_region(region: Dict[str, int]) -> Optional[Image.Image]:
         width = int(region.get('width', 100))
         height = int(region.get('height', 100))
 
-        if SCREENSHOT_BACKEND == 'pipewire_wayland':
+        if get_screenshot_backend() == 'pipewire_wayland':
             try:
                 grabber = _get_pipewire_capture()
-                return grabber.grab_region(left=left, top=top, width=width, height=height)
+                return grabber.grab_region(left=left, top=top, width=width, height=height,
+                                           grayscale=grayscale)
             except Exception as e:
                 logger.error(f"Błąd backendu PipeWire (region): {e}, fallback do mss...")
-                with mss.mss() as sct:
-                    rect = {"top": top, "left": left, "width": width, "height": height}
-                    sct_img = sct.grab(rect)
-                    return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
-
-        with mss.mss() as sct:
-            rect = {"top": top, "left": left, "width": width, "height": height}
-            sct_img = sct.grab(rect)
-            return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+
+        img = _mss_grab(lambda g: g.grab_region(left, top, width, height))
+        return img.convert("L") if grayscale else img
 
     except Exception as e:
         logger.error(f"BŁĄD (capture_region): {e}")
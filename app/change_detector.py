@@ -0,0 +1,92 @@
+"""
+Tani detektor zmian obrazu dla obszarów czytnika.
+
+Zamiast trzymać pełną kopię ostatniego wycinka i liczyć
+`ImageChops.difference` + `ImageStat` dla całego obrazu, każdy obszar ma
+tylko małą sygnaturę: wycinek zmniejszony (filtr BOX) do siatki kafelków,
+po `SAMPLES x SAMPLES` próbek RGB na kafelek.
+
+Próg `similarity` z presetu zachowuje dawne znaczenie: klatka jest nowa,
+gdy suma średnich różnic kanałów dla całego wycinka osiąga próg (tu liczona
+na próbkach sygnatury). Dopiero dla nowej klatki mapa kafelków wskazuje,
+gdzie nastąpiła zmiana - z osobnym progiem `tile_similarity`.
+"""
+import math
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+# Docelowy rozmiar kafelka w pikselach oraz liczba próbek na bok kafelka
+TILE_SIZE = 32
+SAMPLES = 4
+
+
+class TileChangeDetector:
+    """Przechowuje sygnatury kafelków dla każdego obszaru (klucz dowolny)."""
+
+    def __init__(self, tile_size: int = TILE_SIZE, samples: int = SAMPLES):
+        self.tile_size = tile_size
+        self.samples = samples
+        self._signatures: Dict[Any, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.skips = 0
+
+    def _signature(self, image: Image.Image) -> np.ndarray:
+        cols = max(1, math.ceil(image.width / self.tile_size))
+        rows = max(1, math.ceil(image.height / self.tile_size))
+        s = self.samples
+        small = image.convert("RGB").resize((cols * s, rows * s), Image.BOX)
+        # (rows, s, cols, s, 3) -> (rows, cols, s * s * 3)
+        arr = np.asarray(small).reshape(rows, s, cols, s, 3)
+        return arr.transpose(0, 2, 1, 3, 4).reshape(rows, cols, s * s * 3)
+
+    def changed_tiles(self, key: Any, image: Image.Image, similarity: float,
+                      tile_similarity: Optional[float] = None) -> np.ndarray:
+        """
+        Zwraca siatkę (wiersze, kolumny) kafelków uznanych za zmienione
+        (pusta, gdy cały wycinek jest poniżej progu `similarity`). Pierwsza
+        klatka, zmiana rozmiaru lub `similarity == 0` oznaczają zmianę
+        wszystkich kafelków. Bez `tile_similarity` kafelki porównywane są
+        z `similarity`; gdy żaden go nie osiąga, oznaczany jest kafelek
+        o największej zmianie. Sygnatura jest zapamiętywana tylko przy
+        zmianie, więc powolny dryf obrazu w końcu zostanie wykryty.
+        """
+        signature = self._signature(image)
+        with self._lock:
+            self.checks += 1
+            previous = self._signatures.get(key)
+            if similarity == 0 or previous is None or previous.shape != signature.shape:
+                changed = np.ones(signature.shape[:2], dtype=bool)
+            else:
+                # Średnia różnica na kanał, zsumowana po kanałach (jak sum(ImageStat.mean))
+                diff = np.abs(signature.astype(np.int16) - previous).mean(axis=2) * 3
+                if diff.mean() < similarity:
+                    changed = np.zeros(diff.shape, dtype=bool)
+                else:
+                    changed = diff >= (similarity if tile_similarity is None else tile_similarity)
+                    if not changed.any():
+                        changed.flat[int(np.argmax(diff))] = True
+
+            if changed.any():
+                self._signatures[key] = signature
+            else:
+                self.skips += 1
+        return changed
+
+    def has_changed(self, key: Any, image: Image.Image, similarity: float) -> bool:
+        return bool(self.changed_tiles(key, image, similarity).any())
+
+    def reset(self, key: Optional[Any] = None):
+        """Zapomina sygnaturę obszaru (lub wszystkich), wymuszając pełne przetworzenie."""
+        with self._lock:
+            if key is None:
+                self._signatures.clear()
+            else:
+                self._signatures.pop(key, None)
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skips / self.checks if self.checks else 0.0
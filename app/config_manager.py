@@ -1,12 +1,21 @@
+import atexit
+import copy
 import json
 import os
-from typing import Dict, Any, List, Optional
+import threading
+import types
+import weakref
+from typing import Callable, Dict, Any, List, Optional
 from pathlib import Path
 from typing import Tuple
-from dataclasses import dataclass, field
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+
+from app.audio_index import AudioIndex, get_audio_index, save_audio_index
+from app.tempo_scheduler import speed_steps
 
 APP_CONFIG_FILE = Path.home() / '.config' / 'app_config.json'
+# Zapis odroczony: plik jest przepisywany po tylu sekundach bez kolejnych zmian
+SAVE_DELAY = 1.0
 STANDARD_WIDTH = 3840
 STANDARD_HEIGHT = 2160
 
@@ -45,6 +54,93 @@ import shutil
 import datetime
 
 
+def _atomic_write_json(path, data: Any, **dump_kwargs):
+    """Zapis JSON przez plik tymczasowy i os.replace - przerwany zapis nie psuje pliku."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class WriteBehind:
+    """
+    Odroczony zapis pliku konfiguracji. `schedule(target)` tylko oznacza stan
+    jako zmieniony (tanio, w wątku wywołującym) i (re)startuje licznik ciszy;
+    po `delay` s bez zmian `write(target)` robi jedną migawkę i zapisuje ją
+    raz, niezależnie od liczby zmian. `flush()` zapisuje od razu. Zapis
+    odbywa się pod tą samą blokadą co `schedule()`, `cancel()` i zrzut przy
+    wyjściu, więc pliku nie zapisują równocześnie dwa wątki.
+    """
+
+    def __init__(self, write: Callable[[Any], None], delay: float = SAVE_DELAY):
+        self._write = write
+        self.delay = delay
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self._target: Any = None
+        self.requested = 0  # liczba zmian, które dawniej oznaczały pełny zapis
+        self.written = 0
+
+    @property
+    def saved(self) -> int:
+        """Zapisy zaoszczędzone przez scalanie zmian."""
+        return max(0, self.requested - self.written - int(self._dirty))
+
+    @property
+    def pending(self) -> Any:
+        """Cel czekający na zapis (None, gdy nic nie czeka)."""
+        with self._lock:
+            return self._target if self._dirty else None
+
+    def schedule(self, target: Any = None):
+        with self._lock:
+            self.requested += 1
+            self._dirty = True
+            self._target = target
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        """Porzuca oczekujący zapis (stan został właśnie zapisany inną drogą)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._dirty = False
+            self._target = None
+
+    def flush(self) -> bool:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return False
+            target, self._target = self._target, None
+            self._dirty = False
+            self._write(target)
+            self.written += 1
+            return True
+
+
+# Instancje ConfigManager z oczekującymi zapisami - zrzucane przy wyjściu
+_MANAGERS = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all_managers():
+    for manager in list(_MANAGERS):
+        manager.flush()
+
+
 @dataclass
 class AreaConfig:
     """Single flattened dataclass representing an Area including per-area settings."""
@@ -134,6 +230,53 @@ class AreaConfig:
         return cls(**kw)
 
 
+_AREA_FIELDS = None
+
+
+def _area_fields() -> Tuple[str, ...]:
+    global _AREA_FIELDS
+    if _AREA_FIELDS is None:
+        _AREA_FIELDS = tuple(f.name for f in fields(AreaConfig))
+    return _AREA_FIELDS
+
+
+class AreaView(AreaConfig):
+    """
+    Przeskalowany obszar tylko do odczytu, współdzielony przez wszystkie
+    wywołania `get_area_views()` dla danej rozdzielczości. `rect` to
+    mappingproxy, `colors` krotka; do edycji służy `get_areas()` (kopie).
+    """
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AreaView jest tylko do odczytu - edytuj kopię z get_areas()")
+
+    def __delattr__(self, name):
+        raise AttributeError("AreaView jest tylko do odczytu - edytuj kopię z get_areas()")
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    @classmethod
+    def freeze(cls, area: AreaConfig) -> 'AreaView':
+        view = object.__new__(cls)
+        for name in _area_fields():
+            value = getattr(area, name)
+            if name == 'rect' and value is not None:
+                value = types.MappingProxyType(dict(value))
+            elif name == 'colors':
+                value = tuple(value or ())
+            object.__setattr__(view, name, value)
+        return view
+
+    def copy(self) -> AreaConfig:
+        """Zwykły, modyfikowalny AreaConfig (kopia przy zapisie)."""
+        values = {name: getattr(self, name) for name in _area_fields()}
+        if values['rect'] is not None:
+            values['rect'] = dict(values['rect'])
+        values['colors'] = list(values['colors'])
+        return AreaConfig(**values)
+
+
 @dataclass
 class PresetConfig:
     audio_speed: float = 1.15
@@ -151,9 +294,44 @@ class PresetConfig:
     match_len_diff_ratio: float = 0.30
     partial_mode_min_len: int = 20
     audio_speed_inc: float = 1.20
+    # Próg zmiany całego wycinka (suma średnich różnic kanałów, 0 = każda klatka)
     similarity: float = 5.0
+    # Próg zmiany pojedynczego kafelka w mapie zmian (dziennik / diagnostyka)
+    tile_similarity: float = 5.0
     regex_mode_name: str = ""
     regex_pattern: str = ""
+    # Globalne wyszukiwanie przez indeks trigramów (False = pełny skan)
+    matcher_use_index: bool = True
+    matcher_index_top_n: int = 200
+    # Liczba wyników OCR pamiętanych w cache LRU (0 = wyłączony)
+    ocr_cache_size: int = 256
+    # Liczba równoległych wątków OCR w potoku czytnika
+    ocr_workers: int = 2
+    # Ile kolejnych linii audio dekodować z wyprzedzeniem (0 = wyłączone)
+    audio_prefetch_count: int = 3
+    # Limit pamięci cache zdekodowanego PCM (MB)
+    audio_pcm_cache_mb: int = 64
+    # Wzorzec nazw plików audio (regex z grupą numeru linii od 1; puste = domyślne)
+    audio_name_pattern: str = ""
+    # Renderuj brakujące warianty tempa w tle podczas czytania (gotowe z
+    # `audio_tools tempo` są używane zawsze)
+    audio_tempo_cache: bool = False
+    # Limit rozmiaru katalogu wariantów tempa (MB, 0 = bez limitu)
+    audio_tempo_cache_mb: int = 512
+    # Docelowy czas (s) rozładowania kolejki audio; 0 = stały mnożnik audio_speed_inc
+    audio_latency_budget: float = 5.0
+    # Największy mnożnik tempa dobierany przy zaległościach
+    audio_speed_max: float = 1.5
+    # Linie starsze (od zrzutu ekranu) niż tyle sekund są pomijane; 0 = bez limitu
+    audio_max_age: float = 15.0
+    # Nowe dopasowanie z obszaru głównego przerywa bieżącą linię i czyści kolejkę
+    audio_preempt: bool = False
+    audio_fade_ms: int = 120
+    # Stałe wzmocnienie z analizy głośności zamiast limitera na żywo
+    audio_normalize: bool = True
+    audio_target_lufs: float = -16.0
+    # Przeładowanie presetu i napisów po edycji plików w trakcie czytania
+    hot_reload: bool = True
     
     # Global defaults for new areas
     text_thickening: int = 0
@@ -202,6 +380,21 @@ class ConfigManager:
         self.preset_path = preset_path
         self.display_resolution: Optional[Tuple[int, int]] = None
         self.settings = DEFAULT_CONFIG.copy()
+        # Settery nie zapisują od razu - zmiany są scalane i zapisywane po chwili ciszy.
+        # Settery zmieniają stan pod `_state_lock`, a wątek licznika robi pod nią
+        # jedną migawkę (dane JSON presetu, kopia ustawień aplikacji) na zapis.
+        self._state_lock = threading.RLock()
+        self._preset_writes = WriteBehind(self._write_pending_preset)
+        self._app_writes = WriteBehind(lambda _: self._write_app_config(self._app_snapshot()))
+        # Widoki obszarów per rozdzielczość; ważne, dopóki preset trzyma tę samą listę areas
+        self._area_views_src: Optional[List[AreaConfig]] = None
+        self._area_views: Dict[Optional[Tuple[int, int]], Tuple[AreaView, ...]] = {}
+        # (ścieżka, preset w stanie pliku na dysku) - wg ostatniego wczytania lub zapisu;
+        # pozwala odróżnić własne niezapisane zmiany od zewnętrznej edycji pliku
+        self._preset_baseline: Optional[Tuple[str, PresetConfig]] = None
+        # (mtime_ns, rozmiar) pliku presetu po ostatnim własnym zapisie
+        self._written_signature: Dict[str, Tuple[int, int]] = {}
+        _MANAGERS.add(self)
         self.load_app_config()
 
     # --------------------- Typed accessors (properties) ---------------------
@@ -220,8 +413,9 @@ class ConfigManager:
 
     @hotkey_start_stop.setter
     def hotkey_start_stop(self, value: str):
-        self.settings['hotkey_start_stop'] = value
-        self.save_app_config()
+        with self._state_lock:
+            self.settings['hotkey_start_stop'] = value
+        self._schedule_app_save()
 
     @property
     def last_resolution_key(self) -> str:
@@ -229,8 +423,9 @@ class ConfigManager:
 
     @last_resolution_key.setter
     def last_resolution_key(self, value: str):
-        self.settings['last_resolution_key'] = value
-        self.save_app_config()
+        with self._state_lock:
+            self.settings['last_resolution_key'] = value
+        self._schedule_app_save()
 
     @property
     def last_regex_mode(self) -> str:
@@ -238,8 +433,9 @@ class ConfigManager:
 
     @last_regex_mode.setter
     def last_regex_mode(self, value: str):
-        self.settings['last_regex_mode'] = value
-        self.save_app_config()
+        with self._state_lock:
+            self.settings['last_regex_mode'] = value
+        self._schedule_app_save()
 
     @property
     def capture_backend(self) -> str:
@@ -247,8 +443,9 @@ class ConfigManager:
 
     @capture_backend.setter
     def capture_backend(self, value: str):
-        self.settings['capture_backend'] = value
-        self.save_app_config()
+        with self._state_lock:
+            self.settings['capture_backend'] = value
+        self._schedule_app_save()
 
     @property
     def last_custom_regex(self) -> str:
@@ -256,8 +453,9 @@ class ConfigManager:
 
     @last_custom_regex.setter
     def last_custom_regex(self, value: str):
-        self.settings['last_custom_regex'] = value
-        self.save_app_config()
+        with self._state_lock:
+            self.settings['last_custom_regex'] = value
+        self._schedule_app_save()
 
     @property
     def recent_presets_list(self) -> List[str]:
@@ -272,9 +470,10 @@ class ConfigManager:
     @capture_interval.setter
     def capture_interval(self, value: float):
         obj = self._get_preset_obj()
-        obj.capture_interval = float(value)
+        with self._state_lock:
+            obj.capture_interval = float(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def partial_mode_min_len(self) -> int:
@@ -283,9 +482,10 @@ class ConfigManager:
     @partial_mode_min_len.setter
     def partial_mode_min_len(self, value: int):
         obj = self._get_preset_obj()
-        obj.partial_mode_min_len = int(value)
+        with self._state_lock:
+            obj.partial_mode_min_len = int(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def match_len_diff_ratio(self) -> float:
@@ -294,9 +494,10 @@ class ConfigManager:
     @match_len_diff_ratio.setter
     def match_len_diff_ratio(self, value: float):
         obj = self._get_preset_obj()
-        obj.match_len_diff_ratio = float(value)
+        with self._state_lock:
+            obj.match_len_diff_ratio = float(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def match_score_short(self) -> int:
@@ -305,9 +506,10 @@ class ConfigManager:
     @match_score_short.setter
     def match_score_short(self, value: int):
         obj = self._get_preset_obj()
-        obj.match_score_short = int(value)
+        with self._state_lock:
+            obj.match_score_short = int(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def match_score_long(self) -> int:
@@ -316,9 +518,238 @@ class ConfigManager:
     @match_score_long.setter
     def match_score_long(self, value: int):
         obj = self._get_preset_obj()
-        obj.match_score_long = int(value)
+        with self._state_lock:
+            obj.match_score_long = int(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def matcher_use_index(self) -> bool:
+        return self._get_preset_obj().matcher_use_index
+
+    @matcher_use_index.setter
+    def matcher_use_index(self, value: bool):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.matcher_use_index = bool(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def matcher_index_top_n(self) -> int:
+        return self._get_preset_obj().matcher_index_top_n
+
+    @matcher_index_top_n.setter
+    def matcher_index_top_n(self, value: int):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.matcher_index_top_n = int(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def ocr_cache_size(self) -> int:
+        return self._get_preset_obj().ocr_cache_size
+
+    @ocr_cache_size.setter
+    def ocr_cache_size(self, value: int):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.ocr_cache_size = int(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def ocr_workers(self) -> int:
+        return self._get_preset_obj().ocr_workers
+
+    @ocr_workers.setter
+    def ocr_workers(self, value: int):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.ocr_workers = int(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_prefetch_count(self) -> int:
+        return self._get_preset_obj().audio_prefetch_count
+
+    @audio_prefetch_count.setter
+    def audio_prefetch_count(self, value: int):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_prefetch_count = int(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_pcm_cache_mb(self) -> int:
+        return self._get_preset_obj().audio_pcm_cache_mb
+
+    @audio_pcm_cache_mb.setter
+    def audio_pcm_cache_mb(self, value: int):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_pcm_cache_mb = int(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_name_pattern(self) -> str:
+        return self._get_preset_obj().audio_name_pattern
+
+    @audio_name_pattern.setter
+    def audio_name_pattern(self, value: str):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_name_pattern = str(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_tempo_cache(self) -> bool:
+        return self._get_preset_obj().audio_tempo_cache
+
+    @audio_tempo_cache.setter
+    def audio_tempo_cache(self, value: bool):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_tempo_cache = bool(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_tempo_cache_mb(self) -> int:
+        return self._get_preset_obj().audio_tempo_cache_mb
+
+    @audio_tempo_cache_mb.setter
+    def audio_tempo_cache_mb(self, value: int):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_tempo_cache_mb = int(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_latency_budget(self) -> float:
+        return self._get_preset_obj().audio_latency_budget
+
+    @audio_latency_budget.setter
+    def audio_latency_budget(self, value: float):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_latency_budget = float(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_speed_max(self) -> float:
+        return self._get_preset_obj().audio_speed_max
+
+    @audio_speed_max.setter
+    def audio_speed_max(self, value: float):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_speed_max = float(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_max_age(self) -> float:
+        return self._get_preset_obj().audio_max_age
+
+    @audio_max_age.setter
+    def audio_max_age(self, value: float):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_max_age = float(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_preempt(self) -> bool:
+        return self._get_preset_obj().audio_preempt
+
+    @audio_preempt.setter
+    def audio_preempt(self, value: bool):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_preempt = bool(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_fade_ms(self) -> int:
+        return self._get_preset_obj().audio_fade_ms
+
+    @audio_fade_ms.setter
+    def audio_fade_ms(self, value: int):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_fade_ms = int(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    def audio_speed_multipliers(self) -> List[float]:
+        """Mnożniki tempa, których może użyć odtwarzanie (także do renderu TempoCache)."""
+        if self.audio_latency_budget > 0:
+            return speed_steps(self.audio_speed_inc, self.audio_speed_max)
+        return sorted({1.0, self.audio_speed_inc})
+
+    @property
+    def tempo_cache_dir(self) -> Optional[str]:
+        """Katalog wariantów tempa plików audio (w katalogu cache presetu)."""
+        cache_dir = self.subtitle_cache_dir
+        return os.path.join(cache_dir, "tempo") if cache_dir else None
+
+    @property
+    def audio_normalize(self) -> bool:
+        return self._get_preset_obj().audio_normalize
+
+    @audio_normalize.setter
+    def audio_normalize(self, value: bool):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_normalize = bool(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def audio_target_lufs(self) -> float:
+        return self._get_preset_obj().audio_target_lufs
+
+    @audio_target_lufs.setter
+    def audio_target_lufs(self, value: float):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.audio_target_lufs = float(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    @property
+    def hot_reload(self) -> bool:
+        return self._get_preset_obj().hot_reload
+
+    @hot_reload.setter
+    def hot_reload(self, value: bool):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.hot_reload = bool(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
+
+    def load_audio_index(self) -> AudioIndex:
+        """Indeks plików audio presetu (z cache w `subtitle_cache_dir`)."""
+        return get_audio_index(
+            self.audio_dir, self.subtitle_cache_dir,
+            preferred_ext=self.audio_ext, name_pattern=self.audio_name_pattern,
+        )
+
+    def save_audio_index(self, index: AudioIndex):
+        """Zapisuje zmieniony indeks (np. po analizie głośności) do cache presetu."""
+        if self.subtitle_cache_dir:
+            save_audio_index(index, self.subtitle_cache_dir, self.audio_ext, self.audio_name_pattern)
 
     @property
     def audio_speed_inc(self) -> float:
@@ -327,9 +758,10 @@ class ConfigManager:
     @audio_speed_inc.setter
     def audio_speed_inc(self, value: float):
         obj = self._get_preset_obj()
-        obj.audio_speed_inc = float(value)
+        with self._state_lock:
+            obj.audio_speed_inc = float(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def audio_speed(self) -> float:
@@ -338,9 +770,10 @@ class ConfigManager:
     @audio_speed.setter
     def audio_speed(self, value: float):
         obj = self._get_preset_obj()
-        obj.audio_speed = float(value)
+        with self._state_lock:
+            obj.audio_speed = float(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def audio_volume(self) -> float:
@@ -349,9 +782,10 @@ class ConfigManager:
     @audio_volume.setter
     def audio_volume(self, value: float):
         obj = self._get_preset_obj()
-        obj.audio_volume = float(value)
+        with self._state_lock:
+            obj.audio_volume = float(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def similarity(self) -> float:
@@ -360,9 +794,22 @@ class ConfigManager:
     @similarity.setter
     def similarity(self, value: float):
         obj = self._get_preset_obj()
-        obj.similarity = float(value)
+        with self._state_lock:
+            obj.similarity = float(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
+
+    @property
+    def tile_similarity(self) -> float:
+        return self._get_preset_obj().tile_similarity
+
+    @tile_similarity.setter
+    def tile_similarity(self, value: float):
+        obj = self._get_preset_obj()
+        with self._state_lock:
+            obj.tile_similarity = float(value)
+        if self.preset_path:
+            self._schedule_preset_save(obj)
 
     @property
     def save_logs(self) -> bool:
@@ -371,9 +818,10 @@ class ConfigManager:
     @save_logs.setter
     def save_logs(self, value: bool):
         obj = self._get_preset_obj()
-        obj.save_logs = bool(value)
+        with self._state_lock:
+            obj.save_logs = bool(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def min_line_length(self) -> int:
@@ -382,9 +830,10 @@ class ConfigManager:
     @min_line_length.setter
     def min_line_length(self, value: int):
         obj = self._get_preset_obj()
-        obj.min_line_length = int(value)
+        with self._state_lock:
+            obj.min_line_length = int(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def text_file_path(self) -> str:
@@ -393,9 +842,17 @@ class ConfigManager:
     @text_file_path.setter
     def text_file_path(self, value: str):
         obj = self._get_preset_obj()
-        obj.text_file_path = str(value)
+        with self._state_lock:
+            obj.text_file_path = str(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
+
+    @property
+    def subtitle_cache_dir(self) -> Optional[str]:
+        """Katalog cache przetworzonej bazy napisów (obok pliku presetu)."""
+        if not self.preset_path:
+            return None
+        return os.path.join(os.path.dirname(os.path.abspath(self.preset_path)), ".lektor_cache")
 
     @property
     def audio_dir(self) -> str:
@@ -404,9 +861,10 @@ class ConfigManager:
     @audio_dir.setter
     def audio_dir(self, value: str):
         obj = self._get_preset_obj()
-        obj.audio_dir = str(value)
+        with self._state_lock:
+            obj.audio_dir = str(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def audio_ext(self) -> str:
@@ -415,9 +873,10 @@ class ConfigManager:
     @audio_ext.setter
     def audio_ext(self, value: str):
         obj = self._get_preset_obj()
-        obj.audio_ext = str(value)
+        with self._state_lock:
+            obj.audio_ext = str(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def areas(self) -> List[AreaConfig]:
@@ -440,9 +899,10 @@ class ConfigManager:
                 if hasattr(area, 'ocr_scale_factor'):
                     area.ocr_scale_factor = float(area.ocr_scale_factor) * ratio
         
-        obj.areas = new_areas
+        with self._state_lock:
+            obj.areas = new_areas
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def auto_remove_names(self) -> bool:
@@ -451,9 +911,10 @@ class ConfigManager:
     @auto_remove_names.setter
     def auto_remove_names(self, value: bool):
         obj = self._get_preset_obj()
-        obj.auto_remove_names = bool(value)
+        with self._state_lock:
+            obj.auto_remove_names = bool(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def show_debug(self) -> bool:
@@ -462,9 +923,10 @@ class ConfigManager:
     @show_debug.setter
     def show_debug(self, value: bool):
         obj = self._get_preset_obj()
-        obj.show_debug = bool(value)
+        with self._state_lock:
+            obj.show_debug = bool(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def subtitle_mode(self) -> str:
@@ -473,9 +935,10 @@ class ConfigManager:
     @subtitle_mode.setter
     def subtitle_mode(self, value: str):
         obj = self._get_preset_obj()
-        obj.subtitle_mode = str(value)
+        with self._state_lock:
+            obj.subtitle_mode = str(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def brightness_threshold(self) -> int:
@@ -484,9 +947,10 @@ class ConfigManager:
     @brightness_threshold.setter
     def brightness_threshold(self, value: int):
         obj = self._get_preset_obj()
-        obj.brightness_threshold = int(value)
+        with self._state_lock:
+            obj.brightness_threshold = int(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def contrast(self) -> float:
@@ -495,9 +959,10 @@ class ConfigManager:
     @contrast.setter
     def contrast(self, value: float):
         obj = self._get_preset_obj()
-        obj.contrast = float(value)
+        with self._state_lock:
+            obj.contrast = float(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def color_tolerance(self) -> int:
@@ -506,9 +971,10 @@ class ConfigManager:
     @color_tolerance.setter
     def color_tolerance(self, value: int):
         obj = self._get_preset_obj()
-        obj.color_tolerance = int(value)
+        with self._state_lock:
+            obj.color_tolerance = int(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def text_thickening(self) -> int:
@@ -517,9 +983,10 @@ class ConfigManager:
     @text_thickening.setter
     def text_thickening(self, value: int):
         obj = self._get_preset_obj()
-        obj.text_thickening = int(value)
+        with self._state_lock:
+            obj.text_thickening = int(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def regex_mode_name(self) -> str:
@@ -528,9 +995,10 @@ class ConfigManager:
     @regex_mode_name.setter
     def regex_mode_name(self, value: str):
         obj = self._get_preset_obj()
-        obj.regex_mode_name = str(value)
+        with self._state_lock:
+            obj.regex_mode_name = str(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def regex_pattern(self) -> str:
@@ -539,9 +1007,10 @@ class ConfigManager:
     @regex_pattern.setter
     def regex_pattern(self, value: str):
         obj = self._get_preset_obj()
-        obj.regex_pattern = str(value)
+        with self._state_lock:
+            obj.regex_pattern = str(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
 
     @property
     def colors(self) -> List[str]:
@@ -550,13 +1019,97 @@ class ConfigManager:
     @colors.setter
     def colors(self, value: List[str]):
         obj = self._get_preset_obj()
-        obj.colors = list(value)
+        with self._state_lock:
+            obj.colors = list(value)
         if self.preset_path:
-            self.save_preset(self.preset_path, obj)
+            self._schedule_preset_save(obj)
+
+
+    # --- Zapis odroczony ---
+
+    def _schedule_preset_save(self, obj: PresetConfig):
+        """
+        Oznacza preset jako zmieniony; zapis nastąpi po SAVE_DELAY s ciszy.
+        Serializacja odbywa się raz, w wątku licznika (`_write_pending_preset`).
+        """
+        self._preset_writes.schedule((self.preset_path, obj))
+
+    def _write_pending_preset(self, pending: Tuple[str, PresetConfig]):
+        path, obj = pending
+        try:
+            # Migawka pod blokadą setterów - żadne pole nie zmienia się w trakcie kopiowania
+            with self._state_lock:
+                data = self._preset_data(path, obj)
+                baseline = copy.deepcopy(obj)
+        except Exception as e:
+            print(f"Error saving preset: {e}")
+            return
+        if self._write_preset_data(path, data):
+            self._preset_baseline = (path, baseline)
 
+    def _schedule_app_save(self):
+        """Jak `_schedule_preset_save` dla app_config.json."""
+        self._app_writes.schedule()
+
+    def _app_snapshot(self) -> Dict[str, Any]:
+        with self._state_lock:
+            return copy.deepcopy(self.settings)
+
+    def flush(self):
+        """Zapisuje od razu oczekujące zmiany presetu i konfiguracji aplikacji."""
+        self._preset_writes.flush()
+        self._app_writes.flush()
+
+    def write_stats(self) -> Dict[str, int]:
+        """Liczba zmian, wykonanych zapisów i zapisów zaoszczędzonych przez scalanie."""
+        writers = (self._preset_writes, self._app_writes)
+        return {
+            "changes": sum(w.requested for w in writers),
+            "writes": sum(w.written for w in writers),
+            "saved": sum(w.saved for w in writers),
+        }
+
+    def reload_preset(self) -> PresetConfig:
+        """
+        Wczytuje bieżący preset ponownie z dysku (plik zmieniony poza aplikacją).
+        Zewnętrzna edycja ma pierwszeństwo: oczekujący zapis jest porzucany,
+        a własne niezapisane zmiany wracają tylko w polach, których edycja
+        pliku nie dotknęła (i są zapisywane ponownie).
+        """
+        path = self.preset_path
+        pending = self._preset_writes.pending
+        self._preset_writes.cancel()
+        local = pending[1] if pending is not None and pending[0] == path else None
+        baseline = self._preset_baseline
+        baseline = baseline[1] if baseline is not None and baseline[0] == path else None
+
+        self.preset_cache = None
+        obj = self.load_preset(path)
+        if local is None or baseline is None or self.preset_cache is not obj:
+            return obj  # brak własnych zmian albo plik nieczytelny (np. zapis w toku)
+
+        changed = []
+        with self._state_lock:
+            for f in fields(PresetConfig):
+                ours, base = getattr(local, f.name), getattr(baseline, f.name)
+                if ours != base and getattr(obj, f.name) == base:
+                    setattr(obj, f.name, copy.deepcopy(ours))
+                    changed.append(f.name)
+        if changed:
+            self._schedule_preset_save(obj)
+        return obj
+
+    def is_own_write(self, path: str) -> bool:
+        """Czy plik presetu jest w stanie z ostatniego zapisu tej instancji."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return self._written_signature.get(os.path.abspath(path)) == (st.st_mtime_ns, st.st_size)
 
     def backup_preset(self, path: str) -> Optional[str]:
         """Tworzy kopię zapasową pliku preset z timestampem."""
+        self.flush()
         if not path or not os.path.exists(path):
             return None
         
@@ -641,9 +1194,12 @@ class ConfigManager:
             print(f"Błąd ładowania konfigu: {e}")
 
     def save_app_config(self):
+        self._app_writes.cancel()
+        self._write_app_config(self._app_snapshot())
+
+    def _write_app_config(self, settings: Dict[str, Any]):
         try:
-            with open(APP_CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, indent=2)
+            _atomic_write_json(APP_CONFIG_FILE, settings, indent=2)
         except Exception as e:
             print(f"Błąd zapisu konfigu: {e}")
 
@@ -651,12 +1207,13 @@ class ConfigManager:
 
     def add_recent_preset(self, path: str):
         path = os.path.abspath(path)
-        recents = self.settings.get('recent_presets', [])
-        if path in recents:
-            recents.remove(path)
-        recents.insert(0, path)
-        self.settings['recent_presets'] = recents[:10]
-        self.save_app_config()
+        with self._state_lock:
+            recents = list(self.settings.get('recent_presets', []))
+            if path in recents:
+                recents.remove(path)
+            recents.insert(0, path)
+            self.settings['recent_presets'] = recents[:10]
+        self._schedule_app_save()
 
     def get(self, key: str, default=None):
         return self.settings.get(key, default)
@@ -690,6 +1247,8 @@ class ConfigManager:
 
     def load_preset(self, path: Optional[str] = None) -> PresetConfig:
         """Loads preset and returns a PresetConfig object. Rects are left in canonical 4K."""
+        # Oczekujące zmiany trafiają na dysk, zanim cokolwiek zostanie z niego wczytane
+        self._preset_writes.flush()
         if path and path != self.preset_path:
             self.preset_cache = None
             self.preset_path = path
@@ -726,6 +1285,7 @@ class ConfigManager:
 
             obj = PresetConfig._from_dict(data)
             self.preset_cache = obj
+            self._preset_baseline = (path, copy.deepcopy(obj))
             return obj
         except Exception as e:
             print(f"Error loading preset: {e}")
@@ -784,26 +1344,44 @@ class ConfigManager:
         return res_obj._to_dict()
 
     # High-level helpers for area-level access
+    def get_area_views(self, resolution: Optional[Tuple[int, int]] = None) -> Tuple[AreaView, ...]:
+        """
+        Read-only areas scaled to `resolution` (default: current display_resolution).
+        Cached per resolution; rebuilt only when the preset's areas list is
+        replaced (areas setter, preset load/import).
+        """
+        obj = self._get_preset_obj()
+        source = obj.areas
+        if source is not self._area_views_src:
+            self._area_views_src = source
+            self._area_views = {}
+        resolution = resolution or self.display_resolution
+        key = tuple(resolution) if resolution else None
+        views = self._area_views.get(key)
+        if views is None:
+            views = tuple(AreaView.freeze(self._scaled_area(area, key)) for area in source)
+            self._area_views[key] = views
+        return views
+
+    def _scaled_area(self, area: AreaConfig, resolution: Optional[Tuple[int, int]]) -> AreaConfig:
+        """Canonical-4K area -> area at `resolution` (nowy obiekt, źródło bez zmian)."""
+        if not resolution:
+            return area
+        dw, dh = resolution
+        ratio = STANDARD_WIDTH / dw if dw > 0 else 1.0
+        values = {name: getattr(area, name) for name in _area_fields()}
+        values['rect'] = self._scale_rect_to_physical(area.rect, dw, dh)
+        values['ocr_scale_factor'] = float(area.ocr_scale_factor) / ratio
+        return AreaConfig(**values)
+
     def get_areas(self) -> List[AreaConfig]:
         """Return a copy of areas scaled to current display_resolution."""
-        obj = self._get_preset_obj()
-        import copy as _copy
-        areas_copy = _copy.deepcopy(obj.areas)
-        
-        if self.display_resolution:
-            dw, dh = self.display_resolution
-            ratio = STANDARD_WIDTH / dw if dw > 0 else 1.0
-            for area in areas_copy:
-                area.rect = self._scale_rect_to_physical(area.rect, dw, dh)
-                if hasattr(area, 'ocr_scale_factor'):
-                    area.ocr_scale_factor = float(area.ocr_scale_factor) / ratio
-        
-        return areas_copy
+        return [view.copy() for view in self.get_area_views()]
 
     def get_area(self, index: int) -> Optional[AreaConfig]:
-        areas = self.get_areas()
-        if 0 <= index < len(areas):
-            return areas[index]
+        views = self.get_area_views()
+        if 0 <= index < len(views):
+            return views[index].copy()
         return None
 
     def set_areas_from_display(self, areas: List[Any], src_resolution: Optional[Tuple[int, int]] = None):
@@ -853,28 +1431,50 @@ class ConfigManager:
         if not path:
             return
 
-        try:
-            import copy as _copy
-            # Work on a copy for path normalization
-            save_obj = _copy.deepcopy(obj)
-            
-            # 1. Path normalization (Absolute -> Relative)
-            base_dir = os.path.dirname(os.path.abspath(path))
-            if os.path.isabs(str(save_obj.audio_dir)):
-                save_obj.audio_dir = self._to_relative(base_dir, save_obj.audio_dir)
-            if os.path.isabs(str(save_obj.text_file_path)):
-                save_obj.text_file_path = self._to_relative(base_dir, save_obj.text_file_path)
+        pending = self._preset_writes.pending
+        if pending is not None and pending[0] == path:
+            self._preset_writes.cancel()
+        if self._write_preset(path, obj):
+            self.preset_cache = obj
 
-            # 2. Serialization
-            write_data = save_obj._to_dict()
+    def _preset_data(self, path: str, obj: PresetConfig) -> Dict[str, Any]:
+        """Serializuje preset do zapisu (niezależna kopia, ścieżki względne)."""
+        # Work on a copy for path normalization
+        save_obj = copy.deepcopy(obj)
 
-            # 3. Write to disk
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(write_data, f, indent=4, ensure_ascii=False)
-            
-            self.preset_cache = obj
+        # 1. Path normalization (Absolute -> Relative)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        if os.path.isabs(str(save_obj.audio_dir)):
+            save_obj.audio_dir = self._to_relative(base_dir, save_obj.audio_dir)
+        if os.path.isabs(str(save_obj.text_file_path)):
+            save_obj.text_file_path = self._to_relative(base_dir, save_obj.text_file_path)
+
+        # 2. Serialization
+        return save_obj._to_dict()
+
+    def _write_preset(self, path: str, obj: PresetConfig) -> bool:
+        try:
+            with self._state_lock:
+                write_data = self._preset_data(path, obj)
+                baseline = copy.deepcopy(obj)
+        except Exception as e:
+            print(f"Error saving preset: {e}")
+            return False
+        if not self._write_preset_data(path, write_data):
+            return False
+        self._preset_baseline = (path, baseline)
+        return True
+
+    def _write_preset_data(self, path: str, write_data: Dict[str, Any]) -> bool:
+        try:
+            # 3. Write to disk (atomowo)
+            _atomic_write_json(path, write_data, indent=4, ensure_ascii=False)
+            st = os.stat(path)
+            self._written_signature[os.path.abspath(path)] = (st.st_mtime_ns, st.st_size)
+            return True
         except Exception as e:
             print(f"Error saving preset: {e}")
+            return False
 
 
     def load_text_lines(self, path: Optional[str] = None) -> List[str]:
@@ -0,0 +1,125 @@
+"""
+Obserwacja plików presetu i napisów w trakcie czytania.
+
+Z pakietem `inotify_simple` wątek czeka na zdarzenia jądra dla katalogów
+obserwowanych plików (edytory często zapisują przez plik tymczasowy
+i rename, więc obserwowany jest katalog, nie sam plik). Bez niego
+sprawdza co `interval` sekund sygnaturę (mtime, rozmiar) plików.
+W obu trybach zmiana jest zgłaszana dopiero, gdy sygnatura pliku
+przestanie się zmieniać przez `settle` sekund (zapis mógł trwać).
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+
+    HAS_INOTIFY = True
+except ImportError:
+    INotify = None
+    inotify_flags = None
+    HAS_INOTIFY = False
+
+Signature = Optional[Tuple[int, int]]
+
+
+def file_signature(path: str) -> Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FileWatcher(threading.Thread):
+    """
+    Wywołuje `callback(path)` (w wątku obserwatora) po każdej zakończonej
+    zmianie jednego z plików. Lista plików może być podmieniona w locie
+    przez `watch()`.
+    """
+
+    def __init__(self, paths: Iterable[str], callback: Callable[[str], None],
+                 stop_event: threading.Event, interval: float = 1.0, settle: float = 0.3):
+        super().__init__(daemon=True, name="file-watcher")
+        self.callback = callback
+        self.stop_event = stop_event
+        self.interval = interval
+        self.settle = settle
+        self._lock = threading.Lock()
+        self._signatures: Dict[str, Signature] = {}
+        self._inotify = None
+        self._watched_dirs: Dict[str, int] = {}
+        self.backend = "inotify" if HAS_INOTIFY else "polling"
+        self.watch(paths)
+
+    def watch(self, paths: Iterable[str]):
+        """Ustawia listę obserwowanych plików (bieżący stan nie jest zgłaszany)."""
+        paths = {os.path.abspath(p) for p in paths if p}
+        with self._lock:
+            self._signatures = {p: self._signatures.get(p, file_signature(p)) for p in paths}
+            # watch() może być wołane z innego wątku (np. UI) niż pętla obserwatora
+            if self._inotify is not None:
+                self._watch_dirs()
+
+    def _watch_dirs(self):
+        mask = (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+                | inotify_flags.CREATE | inotify_flags.DELETE)
+        for directory in {os.path.dirname(p) for p in self._signatures}:
+            if directory not in self._watched_dirs:
+                try:
+                    self._watched_dirs[directory] = self._inotify.add_watch(directory, mask)
+                except OSError as e:
+                    print(f"FileWatcher: nie można obserwować {directory}: {e}")
+
+    def _changed(self):
+        with self._lock:
+            current = {p: file_signature(p) for p in self._signatures}
+            changed = [p for p, sig in current.items() if sig != self._signatures[p]]
+        return changed, current
+
+    def _wait_for_event(self):
+        """Blokuje do zdarzenia (inotify) albo na `interval` (polling)."""
+        if self._inotify is not None:
+            self._inotify.read(timeout=int(self.interval * 1000))
+        else:
+            self.stop_event.wait(self.interval)
+
+    def run(self):
+        if HAS_INOTIFY:
+            try:
+                self._inotify = INotify()
+                with self._lock:
+                    self._watch_dirs()
+            except OSError as e:
+                print(f"FileWatcher: inotify niedostępne ({e}), przechodzę na polling")
+                self._inotify = None
+                self.backend = "polling"
+        try:
+            while not self.stop_event.is_set():
+                self._wait_for_event()
+                changed, current = self._changed()
+                if not changed:
+                    continue
+                # Czekamy, aż zapis się zakończy (sygnatura przestaje się zmieniać)
+                while not self.stop_event.is_set():
+                    time.sleep(self.settle)
+                    latest = {p: file_signature(p) for p in changed}
+                    if all(latest[p] == current[p] for p in changed):
+                        break
+                    current.update(latest)
+                with self._lock:
+                    for p in changed:
+                        if p in self._signatures:
+                            self._signatures[p] = current[p]
+                for path in changed:
+                    if current[path] is None:
+                        continue  # plik chwilowo usunięty (zapis przez rename) - poczekaj na nowy
+                    try:
+                        self.callback(path)
+                    except Exception as e:
+                        print(f"FileWatcher: błąd obsługi zmiany {path}: {e}")
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
@@ -62,6 +62,17 @@ class LogWindow(CTkToplevel):
 
                 # Bardziej zwarty format
                 msg += f"   [Czasy: Cap:{t_cap:.0f} | Pre:{t_pre:.0f} | OCR:{t_ocr:.0f} | Match:{t_match:.0f} ms]\n"
+                if 'skip_ratio' in stats:
+                    msg += (f"   [Zmienione kafelki: {stats.get('tiles', '?')} | "
+                            f"Pominięte klatki: {stats['skip_ratio'] * 100:.0f}%]\n")
+                if 'ocr_queue' in stats:
+                    msg += (f"   [Kolejki: klatki {stats.get('frame_queue', 0)} | OCR {stats['ocr_queue']} | "
+                            f"wyniki {stats.get('result_queue', 0)} | porzucone klatki "
+                            f"{stats.get('dropped_frames', 0)} | porzucone zadania OCR {stats.get('dropped_ocr_jobs', 0)} | "
+                            f"pominięte wyniki OCR {stats.get('skipped_ocr_seqs', 0)}]\n")
+                if 'ocr_cache_hits' in stats:
+                    msg += (f"   [Cache OCR: trafienia {stats['ocr_cache_hits']} | "
+                            f"chybienia {stats.get('ocr_cache_misses', 0)}]\n")
 
             if match:
                 msg += f"   >>> MATCH ({match[1]}%): {line_text}\n"
@@ -3,67 +3,377 @@ MATCH_MODE_FULL = "Full Lines"
 MATCH_MODE_STARTS = "Starts With"
 MATCH_MODE_PARTIAL = "Partial"
 
+import difflib
 import re
-from typing import List, Optional, Tuple, Dict, Any
+from bisect import bisect_left, bisect_right
+from typing import List, Mapping, Optional, Sequence, Tuple, Dict, Any
+
+import numpy as np
+
 from app.text_processing import clean_text, smart_remove_name
-from app.config_manager import ConfigManager
+from app.runtime_config import RuntimeConfig, default_runtime_config
+from app.subtitle_store import ExactIndex, SubtitleStore
 
 
-# Note: we expect `matcher_config` passed to matcher functions to be an instance
-# of `ConfigManager` (or an object providing the same typed properties). This
-# keeps the code typed and avoids dynamic getattr usage.
+# Note: `matcher_config` passed to matcher functions is a `RuntimeConfig`
+# snapshot (or any object providing the same typed attributes, e.g.
+# ConfigManager in the optimizer). Reads are plain attribute lookups.
 
 try:
-    from rapidfuzz import fuzz
+    from rapidfuzz import fuzz, process
 except ImportError:
     from thefuzz import fuzz
 
+    process = None
     print("OSTRZEŻENIE: Brak 'rapidfuzz'. Używam wolniejszego 'thefuzz'.")
 
+# Ocena wszystkich kandydatów jednym wywołaniem rapidfuzz.process.cdist (C++)
+# zamiast pętli fuzz.ratio w Pythonie. Wymaga rapidfuzz.
+USE_BATCH_SCORING = process is not None
+
 # Typ pomocniczy: (oryginalna_linia, oczyszczona_linia, indeks_wiersza, dlugosc_oczyszczona)
-SubtitleEntry = Tuple[str, str, int, int]
+# W SubtitleStore oryginał to None (dekodowany tylko do logu) - dopasowanie
+# korzysta wyłącznie z pól 1-3.
+SubtitleEntry = Tuple[Optional[str], str, int, int]
+
+# Okno wyszukiwania lokalnego wokół ostatnio dopasowanej linii
+WINDOW_BACK = 50
+WINDOW_FWD = 200
+
 
+def _utf32(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
 
-def precompute_subtitles(raw_lines: List[str], min_length: int = 0) -> Tuple[List[SubtitleEntry], Dict[str, int]]:
+
+class NgramIndex:
+    """
+    Odwrócony indeks trigramów znakowych dla listy napisów.
+
+    Znaki są mapowane na gęste numery (`alphabet` to posortowane punkty kodowe),
+    trigram to liczba `(a * A + b) * A + c`. Listy pozycji (indeksy w liście
+    `SubtitleEntry`) trzymane są w formacie CSR:
+    `postings[offsets[k]:offsets[k + 1]]` to wpisy zawierające trigram
+    `gram_ids[k]`. Służy do zawężenia globalnego skanowania do kilkuset
+    kandydatów o największej liczbie wspólnych trigramów z tekstem z OCR.
+    """
+
+    def __init__(self, alphabet: np.ndarray, gram_ids: np.ndarray, offsets: np.ndarray,
+                 postings: np.ndarray, lengths: np.ndarray, line_indices: np.ndarray):
+        self.alphabet = alphabet
+        self.gram_ids = gram_ids
+        self.offsets = offsets
+        self.postings = postings
+        self.lengths = lengths
+        self.line_indices = line_indices
+
+    @classmethod
+    def build(cls, entries: Sequence[SubtitleEntry]) -> 'NgramIndex':
+        n = len(entries)
+        if isinstance(entries, SubtitleStore):
+            lengths = np.array(entries.lengths, dtype=np.int32)
+            line_indices = np.array(entries.line_indices, dtype=np.int32)
+            texts = entries.cleaned_list()
+        else:
+            lengths = np.fromiter((e[3] for e in entries), dtype=np.int32, count=n)
+            line_indices = np.fromiter((e[2] for e in entries), dtype=np.int32, count=n)
+            texts = [e[1] for e in entries]
+        if n == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(empty.astype(np.uint32), empty, np.zeros(1, dtype=np.int64),
+                       empty.astype(np.int32), lengths, line_indices)
+
+        # Wszystkie linie w jednym buforze; trigramy na styku linii są odrzucane
+        padded = [f" {t} " for t in texts]
+        owner = np.repeat(np.arange(n, dtype=np.int64), [len(t) for t in padded])
+        chars = _utf32("".join(padded))
+        alphabet = np.flatnonzero(np.bincount(chars)).astype(np.uint32)
+        dense = np.zeros(int(alphabet[-1]) + 1, dtype=np.int64)
+        dense[alphabet] = np.arange(len(alphabet))
+        ids = cls._trigrams(dense[chars], len(alphabet))
+        same_line = owner[:-2] == owner[2:]
+
+        # Jeden klucz (trigram, pozycja): jedno sortowanie i usunięcie powtórzeń
+        keys = ids[same_line] * n + owner[:-2][same_line]
+        return cls._from_keys(alphabet, keys, n, lengths, line_indices)
+
+    @classmethod
+    def _from_keys(cls, alphabet: np.ndarray, keys: np.ndarray, n: int,
+                   lengths: np.ndarray, line_indices: np.ndarray) -> 'NgramIndex':
+        """Układ CSR z kluczy `trigram * n + pozycja` (kolejność i powtórzenia dowolne)."""
+        keys = np.sort(keys)
+        keys = keys[np.append(True, keys[1:] != keys[:-1])]
+        grams = keys // n
+        postings = (keys % n).astype(np.int32)
+
+        starts = np.flatnonzero(np.append(True, grams[1:] != grams[:-1]))
+        gram_ids = grams[starts]
+        offsets = np.append(starts, len(keys)).astype(np.int64)
+        return cls(alphabet, gram_ids, offsets, postings, lengths, line_indices)
+
+    def patched(self, positions: List[int], cleaned: List[str]) -> Optional['NgramIndex']:
+        """
+        Nowy indeks z podmienionym tekstem wpisów `positions` (pozostałe wpisy
+        i ich pozycje bez zmian). Zwraca None, gdy nowy tekst zawiera znaki
+        spoza alfabetu indeksu - wtedy potrzebne jest pełne `build`.
+        """
+        n = len(self.lengths)
+        if n == 0 or len(self.alphabet) == 0:
+            return None
+        padded = [f" {t} " for t in cleaned]
+        chars = _utf32("".join(padded))
+        dense = np.minimum(np.searchsorted(self.alphabet, chars), len(self.alphabet) - 1)
+        if not (self.alphabet[dense] == chars).all():
+            return None
+
+        changed = np.asarray(positions, dtype=np.int64)
+        owner = np.repeat(changed, [len(t) for t in padded])
+        ids = self._trigrams(dense.astype(np.int64), len(self.alphabet))
+        same_line = owner[:-2] == owner[2:]
+        new_keys = ids[same_line] * n + owner[:-2][same_line]
+
+        old_grams = np.repeat(self.gram_ids, np.diff(self.offsets))
+        keep = ~np.isin(self.postings, changed)
+        old_keys = old_grams[keep] * n + self.postings[keep]
+
+        lengths = np.array(self.lengths, dtype=np.int32)
+        lengths[changed] = [len(t) for t in cleaned]
+        return self._from_keys(self.alphabet, np.concatenate([old_keys, new_keys]), n,
+                               lengths, np.array(self.line_indices, dtype=np.int32))
+
+    @staticmethod
+    def _trigrams(dense: np.ndarray, size: int) -> np.ndarray:
+        return (dense[:-2] * size + dense[1:-1]) * size + dense[2:]
+
+    def _query_slots(self, ocr_text: str) -> np.ndarray:
+        """Numery list CSR dla trigramów tekstu (nieznane znaki/trigramy są pomijane)."""
+        chars = _utf32(f" {ocr_text} ")
+        dense = np.minimum(np.searchsorted(self.alphabet, chars), len(self.alphabet) - 1)
+        known = self.alphabet[dense] == chars
+        ids = self._trigrams(dense.astype(np.int64), len(self.alphabet))
+        ids = np.unique(ids[known[:-2] & known[1:-1] & known[2:]])
+
+        pos = np.searchsorted(self.gram_ids, ids)
+        in_range = pos < len(self.gram_ids)
+        pos, ids = pos[in_range], ids[in_range]
+        return pos[self.gram_ids[pos] == ids]
+
+    def top_candidates(self, ocr_text: str, ocr_len: int, mode: str, ratio_limit: float,
+                       limit: int, exclude: Tuple[int, int] = (0, 0)) -> np.ndarray:
+        """
+        Zwraca pozycje (rosnąco) maksymalnie `limit` wpisów o największym pokryciu
+        trigramów. Wpisy odrzucane przez filtry długości z `_scan_list` oraz
+        zakres `exclude` (już przeskanowane okno lokalne) są pomijane.
+        """
+        n = len(self.lengths)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        slots = self._query_slots(ocr_text)
+        if len(slots) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        parts = [self.postings[self.offsets[s]:self.offsets[s + 1]] for s in slots]
+        counts = np.bincount(np.concatenate(parts), minlength=n).astype(np.float32)
+
+        lo, hi = exclude
+        if hi > lo:
+            counts[lo:hi] = 0
+
+        # Te same filtry długości co w _scan_list - odrzucamy je przed rankingiem
+        lengths = self.lengths
+        if mode == MATCH_MODE_STARTS:
+            counts[lengths < ocr_len - 5] = 0
+        elif mode == MATCH_MODE_PARTIAL:
+            counts[lengths < ocr_len - 2] = 0
+        else:
+            len_diff = np.abs(lengths - ocr_len)
+            counts[len_diff > np.maximum(lengths, ocr_len) * ratio_limit] = 0
+            # Dla pełnych linii liczy się podobieństwo całości (współczynnik Dice'a)
+            counts = 2 * counts / (lengths + ocr_len + 4)
+
+        nonzero = np.flatnonzero(counts)
+        if len(nonzero) > limit:
+            top = np.argpartition(counts[nonzero], -limit)[-limit:]
+            nonzero = nonzero[top]
+        return np.sort(nonzero)
+
+
+# Wpisy: lista SubtitleEntry albo SubtitleStore; mapa: dict albo ExactIndex
+PrecomputedData = Tuple[Sequence[SubtitleEntry], Mapping[str, int], Optional[NgramIndex]]
+
+
+def precompute_subtitles(raw_lines: List[str], min_length: int = 0) -> PrecomputedData:
     """
     Przetwarza listę napisów na format gotowy do szybkiego wyszukiwania.
+    Zwraca (wpisy, mapa_dokładnych_trafień, indeks_trigramów).
     """
     processed = []
     exact_map = {}
 
     for i, line in enumerate(raw_lines):
-        cleaned = clean_text(line)
-        if len(cleaned) > 0:
-            meaningful_content = re.sub(r'[^\w\s]', '', cleaned)
+        entry = _precompute_line(line, i, min_length)
+        if entry is not None:
+            processed.append(entry)
 
-            if len(meaningful_content) < min_length:
+            # Optymalizacja: O(1) dla idealnych trafień
+            if entry[1] not in exact_map:
+                exact_map[entry[1]] = i
+
+    return processed, exact_map, NgramIndex.build(processed)
+
+
+def precompute_subtitle_file(path: str, min_length: int = 0) -> PrecomputedData:
+    """
+    Strumieniowa wersja `precompute_subtitles` dla pliku napisów: linie są
+    czytane i czyszczone po jednej, a wynik trafia od razu do zwartych
+    buforów `SubtitleStore` (bez list napisów na czas całego wczytywania).
+    """
+    originals, cleaned = bytearray(), bytearray()
+    original_offsets, cleaned_offsets = [0], [0]
+    lengths, line_indices = [], []
+    line_count = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            line_count += 1
+            entry = _precompute_line(line.strip(), i, min_length)
+            if entry is None:
                 continue
+            originals += entry[0].encode('utf-8', 'surrogatepass')
+            cleaned += entry[1].encode('utf-8', 'surrogatepass')
+            original_offsets.append(len(originals))
+            cleaned_offsets.append(len(cleaned))
+            line_indices.append(i)
+            lengths.append(entry[3])
+
+    store = SubtitleStore(bytes(originals), np.array(original_offsets, dtype=np.int64),
+                          bytes(cleaned), np.array(cleaned_offsets, dtype=np.int64),
+                          np.array(lengths, dtype=np.int32), np.array(line_indices, dtype=np.int32),
+                          line_count)
+    return store, ExactIndex.build(store), NgramIndex.build(store)
+
+
+def compact_precomputed(data: PrecomputedData, line_count: int) -> PrecomputedData:
+    """Przenosi wynik `precompute_subtitles` do SubtitleStore (indeks bez zmian)."""
+    entries, index = data[0], data[2] if len(data) > 2 else None
+    store = entries if isinstance(entries, SubtitleStore) else SubtitleStore.from_entries(entries, line_count)
+    if index is None:
+        index = NgramIndex.build(store)
+    # Długości i numery linii współdzielone z indeksem
+    store.lengths, store.line_indices = index.lengths, index.line_indices
+    return store, ExactIndex.build(store), index
+
+
+def _precompute_line(line: str, i: int, min_length: int) -> Optional[SubtitleEntry]:
+    cleaned = clean_text(line)
+    if len(cleaned) == 0:
+        return None
+    meaningful_content = re.sub(r'[^\w\s]', '', cleaned)
+    if len(meaningful_content) < min_length:
+        return None
+    return line, cleaned, i, len(cleaned)
+
+
+def _diff_opcodes(old_lines: List[str], new_lines: List[str]):
+    """Opkody difflib dla dwóch wersji pliku; wspólny początek i koniec pomijane przed diffem."""
+    head = 0
+    limit = min(len(old_lines), len(new_lines))
+    while head < limit and old_lines[head] == new_lines[head]:
+        head += 1
+    tail = 0
+    while (tail < limit - head
+           and old_lines[len(old_lines) - 1 - tail] == new_lines[len(new_lines) - 1 - tail]):
+        tail += 1
+    old_mid = old_lines[head:len(old_lines) - tail]
+    new_mid = new_lines[head:len(new_lines) - tail]
+
+    opcodes = [("equal", 0, head, 0, head)]
+    differing = [k for k, (a, b) in enumerate(zip(old_mid, new_mid)) if a != b] \
+        if len(old_mid) == len(new_mid) else None
+    if differing is not None and len(differing) <= max(64, len(old_mid) // 100):
+        # Same liczba linii i nieliczne zmiany: porównanie pozycyjne zamiast SequenceMatchera
+        pos = 0
+        for k in differing:
+            opcodes.append(("equal", head + pos, head + k, head + pos, head + k))
+            opcodes.append(("replace", head + k, head + k + 1, head + k, head + k + 1))
+            pos = k + 1
+        opcodes.append(("equal", head + pos, head + len(old_mid), head + pos, head + len(new_mid)))
+    else:
+        matcher = difflib.SequenceMatcher(None, old_mid, new_mid, autojunk=False)
+        opcodes += [(tag, i1 + head, i2 + head, j1 + head, j2 + head)
+                    for tag, i1, i2, j1, j2 in matcher.get_opcodes()]
+    opcodes.append(("equal", len(old_lines) - tail, len(old_lines), len(new_lines) - tail, len(new_lines)))
+    return opcodes
 
-            length = len(cleaned)
-            processed.append((line, cleaned, i, length))
 
-            # Optymalizacja: O(1) dla idealnych trafień
-            if cleaned not in exact_map:
-                exact_map[cleaned] = i
+def update_precomputed(old_lines: List[str], new_lines: List[str], data: PrecomputedData,
+                       min_length: int = 0) -> Tuple[PrecomputedData, int]:
+    """
+    Przyrostowa wersja `precompute_subtitles` po edycji pliku napisów.
+    Linie bez zmian (wg diffu old_lines -> new_lines) zachowują oczyszczony
+    tekst, czyszczone są tylko zmienione i dodane. Gdy pozycje wpisów się
+    nie przesunęły, indeks trigramów jest łatany tylko dla zmienionych
+    wpisów; w przeciwnym razie budowany od nowa (bez przetwarzania tekstu).
+    Zwraca (nowe dane, liczba przetworzonych linii).
+    """
+    entries, index = data[0], data[2] if len(data) > 2 else None
+    compact = isinstance(entries, SubtitleStore)
+    line_indices = entries.line_indices.tolist() if compact else [e[2] for e in entries]
+
+    processed: List[SubtitleEntry] = []
+    changed: List[int] = []  # pozycje wpisów z nowym tekstem (gdy układ się nie zmienia)
+    same_layout = True
+    reprocessed = 0
+    for tag, i1, i2, j1, j2 in _diff_opcodes(old_lines, new_lines):
+        lo, hi = bisect_left(line_indices, i1), bisect_left(line_indices, i2)
+        if tag == "equal":
+            shift = j1 - i1
+            if shift or compact:
+                # Oryginał z nowego pliku (linie równe), bo SubtitleStore go nie dekoduje
+                same_layout = same_layout and not shift
+                processed.extend((new_lines[e[2] + shift], e[1], e[2] + shift, e[3]) for e in entries[lo:hi])
+            else:
+                processed.extend(entries[lo:hi])
+            continue
+
+        start = len(processed)
+        for j in range(j1, j2):
+            entry = _precompute_line(new_lines[j], j, min_length)
+            reprocessed += 1
+            if entry is not None:
+                processed.append(entry)
+        if same_layout and i1 == j1 and \
+                [e[2] for e in processed[start:]] == line_indices[lo:hi]:
+            changed.extend(p for p in range(start, len(processed))
+                           if processed[p][1] != entries[lo + p - start][1])
+        else:
+            same_layout = False
+
+    new_index = None
+    if index is not None and same_layout:
+        new_index = index.patched(changed, [processed[p][1] for p in changed]) if changed else index
+    if new_index is None:
+        new_index = NgramIndex.build(processed)
+    if compact:
+        return compact_precomputed((processed, None, new_index), len(new_lines)), reprocessed
 
-    return processed, exact_map
+    cleaned = [e[1] for e in processed]
+    # Pierwsze wystąpienie wygrywa - jak w precompute_subtitles
+    exact_map = dict(zip(reversed(cleaned), reversed([e[2] for e in processed])))
+    return (processed, exact_map, new_index), reprocessed
 
 
 def find_best_match(ocr_text: str,
-                    precomputed_data: Tuple[List[SubtitleEntry], Dict[str, int]],
+                    precomputed_data: PrecomputedData,
                     mode: str,
                     last_index: int = -1,
-                    matcher_config: Optional[ConfigManager] = None) -> Optional[Tuple[int, int]]:
+                    matcher_config: Optional[RuntimeConfig] = None) -> Optional[Tuple[int, int]]:
     """
     Znajduje najlepsze dopasowanie tekstu z OCR w bazie napisów, używając konfiguracji.
     """
     if not ocr_text:
         return None
 
-    # matcher_config should be a ConfigManager-like object; if None we'll
-    # construct a default ConfigManager later.
-
-    subtitles_list, exact_map = precomputed_data
+    subtitles_list, exact_map = precomputed_data[0], precomputed_data[1]
+    ngram_index = precomputed_data[2] if len(precomputed_data) > 2 else None
 
     # Wstępne czyszczenie OCR
     ocr_no_name = smart_remove_name(ocr_text)
@@ -73,36 +383,30 @@ def find_best_match(ocr_text: str,
         return None
 
     # Szybka ścieżka: Exact Match
-    if ocr_clean in exact_map:
-        return exact_map[ocr_clean], 100
-
-    # Ustalanie okna wyszukiwania
-    WINDOW_BACK = 50
-    WINDOW_FWD = 200
-    candidates_in_window = []
-    candidates_outside = []
+    exact_idx = exact_map.get(ocr_clean)
+    if exact_idx is not None:
+        return exact_idx, 100
 
+    # Ustalanie okna wyszukiwania (wpisy są posortowane po indeksie wiersza)
+    win_lo = win_hi = 0
     if last_index >= 0:
-        for entry in subtitles_list:
-            orig_idx = entry[2]
-            if last_index - WINDOW_BACK <= orig_idx <= last_index + WINDOW_FWD:
-                candidates_in_window.append(entry)
-            else:
-                candidates_outside.append(entry)
-    else:
-        candidates_outside = subtitles_list
+        if ngram_index is not None:
+            line_indices = ngram_index.line_indices
+            win_lo = int(np.searchsorted(line_indices, last_index - WINDOW_BACK, side='left'))
+            win_hi = int(np.searchsorted(line_indices, last_index + WINDOW_FWD, side='right'))
+        else:
+            line_indices = [e[2] for e in subtitles_list]
+            win_lo = bisect_left(line_indices, last_index - WINDOW_BACK)
+            win_hi = bisect_right(line_indices, last_index + WINDOW_FWD)
+    candidates_in_window = subtitles_list[win_lo:win_hi]
 
     ocr_len = len(ocr_clean)
 
-    # Expect a ConfigManager-like object; fall back to defaults if None
+    # Bez konfiguracji: domyślne wartości PresetConfig (bez odczytu z dysku)
     if matcher_config is None:
-        cm = ConfigManager()
-        # Ensure load_preset won't attempt to stat a None path
-        cm.preset_path = ""
-        matcher_config = cm
+        matcher_config = default_runtime_config()
     partial_min_len = matcher_config.partial_mode_min_len
 
-    from app.matcher import MATCH_MODE_FULL
     effective_mode = MATCH_MODE_FULL if ocr_len < partial_min_len else mode
 
     # 1. Szukanie lokalne
@@ -115,6 +419,15 @@ def find_best_match(ocr_text: str,
         return match
 
     # 2. Szukanie globalne
+    if ngram_index is not None and matcher_config.matcher_use_index:
+        # Fuzzy scoring tylko dla top-N kandydatów z indeksu trigramów
+        positions = ngram_index.top_candidates(
+            ocr_clean, ocr_len, effective_mode, matcher_config.match_len_diff_ratio,
+            matcher_config.matcher_index_top_n, exclude=(win_lo, win_hi))
+        candidates_outside = [subtitles_list[p] for p in positions]
+    else:
+        candidates_outside = subtitles_list[:win_lo] + subtitles_list[win_hi:]
+
     global_match = _scan_list(ocr_clean, ocr_len, candidates_outside, effective_mode, matcher_config)
 
     if global_match:
@@ -129,19 +442,48 @@ def find_best_match(ocr_text: str,
     return global_match
 
 
-def _scan_list(ocr_text: str, ocr_len: int, candidates: List[SubtitleEntry], mode: str, config: ConfigManager) -> \
+def _scan_list(ocr_text: str, ocr_len: int, candidates: List[SubtitleEntry], mode: str, config: RuntimeConfig) -> \
 Optional[Tuple[int, int]]:
+    """Wybiera kandydata o najwyższym Levenshtein ratio, jeśli przekracza próg zależny od długości."""
+    min_score = _min_score(ocr_len, config)
+    ratio_limit = config.match_len_diff_ratio
+
+    if USE_BATCH_SCORING:
+        best_score, best_original_idx = _best_candidate_batch(ocr_text, ocr_len, candidates, mode, ratio_limit, min_score)
+    else:
+        best_score, best_original_idx = _best_candidate_loop(ocr_text, ocr_len, candidates, mode, ratio_limit)
+
+    if best_score >= min_score:
+        return best_original_idx, int(best_score)
+
+    return None
+
+
+def _min_score(ocr_len: int, config: RuntimeConfig) -> float:
+    """Minimalny wynik: interpolacja między match_score_short a match_score_long."""
+    score_short = config.match_score_short
+    score_long = config.match_score_long
+
+    len_min_threshold = 6
+    len_max_threshold = 60
+
+    if ocr_len < len_min_threshold:
+        return score_short
+    if ocr_len > len_max_threshold:
+        return score_long
+
+    length_progress = (ocr_len - len_min_threshold) / (len_max_threshold - len_min_threshold)
+    score_diff = score_long - score_short
+    return score_short + (length_progress * score_diff)
+
+
+def _best_candidate_loop(ocr_text: str, ocr_len: int, candidates: List[SubtitleEntry], mode: str,
+                         ratio_limit: float) -> Tuple[float, int]:
     """Wewnętrzna funkcja iterująca po kandydatach i licząca Levenshtein ratio."""
     best_score = 0
     best_original_idx = -1
     best_len_diff = float('inf')
 
-    # Pobieranie parametrów z konfigu
-    ratio_limit = config.match_len_diff_ratio
-    score_short = config.match_score_short
-    score_long = config.match_score_long
-
-    from app.matcher import MATCH_MODE_STARTS, MATCH_MODE_PARTIAL
     for _, sub_clean, original_idx, sub_len in candidates:
         len_diff = abs(ocr_len - sub_len)
 
@@ -174,27 +516,54 @@ Optional[Tuple[int, int]]:
             best_original_idx = original_idx
             best_len_diff = len_diff
             if best_score == 100 and len_diff == 0:
-                return best_original_idx, 100
+                return 100, best_original_idx
 
         elif score == best_score:
             if len_diff < best_len_diff:
                 best_original_idx = original_idx
                 best_len_diff = len_diff
 
-    len_min_threshold = 6
-    len_max_threshold = 60
+    return best_score, best_original_idx
 
-    if ocr_len < len_min_threshold:
-        min_score = score_short
-    elif ocr_len > len_max_threshold:
-        min_score = score_long
+
+def _best_candidate_batch(ocr_text: str, ocr_len: int, candidates: List[SubtitleEntry], mode: str,
+                          ratio_limit: float, min_score: float) -> Tuple[float, int]:
+    """
+    Odpowiednik `_best_candidate_loop` liczący wyniki jednym wywołaniem cdist.
+    Wyniki poniżej `min_score` są zerowane przez score_cutoff. Remisy rozstrzyga
+    najmniejsza różnica długości, a potem kolejność na liście - jak w pętli.
+    """
+    if mode == MATCH_MODE_STARTS:
+        kept = [c for c in candidates if c[3] >= ocr_len - 5]
+    elif mode == MATCH_MODE_PARTIAL:
+        kept = [c for c in candidates if c[3] >= ocr_len - 2]
     else:
-        length_progress = (ocr_len - len_min_threshold) / (len_max_threshold - len_min_threshold)
+        kept = [c for c in candidates if abs(ocr_len - c[3]) <= max(ocr_len, c[3]) * ratio_limit]
 
-        score_diff = score_long - score_short
-        min_score = score_short + (length_progress * score_diff)
+    if not kept:
+        return 0, -1
 
-    if best_score >= min_score:
-        return best_original_idx, int(best_score)
+    def _scores(scorer, choices):
+        return process.cdist([ocr_text], choices, scorer=scorer, score_cutoff=min_score, dtype=np.float64)[0]
 
-    return None
\ No newline at end of file
+    if mode not in (MATCH_MODE_STARTS, MATCH_MODE_PARTIAL):
+        scores = _scores(fuzz.ratio, [c[1] for c in kept])
+    else:
+        # Widoki przycięte do długości tekstu z OCR (+5 znaków zapasu)
+        truncated = [c[1][:ocr_len + 5] for c in kept]
+        scores = _scores(fuzz.ratio, truncated)
+        if mode == MATCH_MODE_PARTIAL:
+            scores = np.maximum(scores, _scores(fuzz.partial_ratio, [c[1] for c in kept]))
+            np.minimum(scores, 100, out=scores)
+
+    best_score = scores.max()
+    if best_score <= 0:
+        return 0, -1
+
+    tied = np.flatnonzero(scores == best_score)
+    if len(tied) > 1:
+        len_diffs = np.abs(np.fromiter((kept[i][3] for i in tied), dtype=np.int64, count=len(tied)) - ocr_len)
+        best_pos = int(tied[np.argmin(len_diffs)])
+    else:
+        best_pos = int(tied[0])
+    return float(best_score), kept[best_pos][2]
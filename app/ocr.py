@@ -2,60 +2,239 @@ import sys
 import os
 import platform
 import tempfile
+import hashlib
+import importlib.util
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional, Tuple, List
 
+import numpy as np
+
 from app.config_manager import ConfigManager, AreaConfig
 from app.path_utils import get_base_dir
 
 try:
-    import pytesseract
-    from pytesseract import Output
     from PIL import Image, ImageOps, ImageEnhance, ImageFilter, ImageChops
 except ImportError:
+    Image = None
+# pytesseract jest importowany przy pierwszym OCR (_pytesseract()) - przy
+# starcie sprawdzamy tylko, czy pakiet jest zainstalowany
+if Image is None or importlib.util.find_spec("pytesseract") is None:
     print("Brak biblioteki Pillow lub pytesseract.", file=sys.stderr)
     sys.exit(1)
 
+try:
+    # Opcjonalny silnik in-process (wiązania C++ API Tesseracta).
+    # Bez niego każde wywołanie OCR uruchamia osobny proces `tesseract`.
+    from tesserocr import PyTessBaseAPI, PSM
+    HAS_TESSEROCR = True
+except ImportError:
+    PyTessBaseAPI = None
+    PSM = None
+    HAS_TESSEROCR = False
+
 from app.text_processing import smart_remove_name
 
+# Preprocessing obrazu operacjami NumPy na tablicy zrzutu zamiast łańcucha
+# operacji PIL (_preprocess_image_pil pozostaje jako implementacja wzorcowa).
+USE_NUMPY_PREPROCESS = True
+
 # Konfiguracja języka OCR
 OCR_LANGUAGE = 'pol'
 # Znaków na białej liście używamy w psm 6
 WHITELIST_CHARS = "aąbcćdeęfghijklłmnńoóprsśtuwyzźżAĄBCĆDEĘFGHIJKLŁMNŃOÓPRSŚTUWYZŹŻ0123456789.,:;-?!()[] "
 
 CONFIG_FILE_PATH = os.path.join(tempfile.gettempdir(), "lektor_ocr_config.txt")
-HAS_CONFIG_FILE = False
 
-try:
-    with open(CONFIG_FILE_PATH, "w", encoding="utf-8") as f:
-        f.write(f"tessedit_char_whitelist {WHITELIST_CHARS}")
-    HAS_CONFIG_FILE = True
-except Exception as e:
-    print(f"Ostrzeżenie: Nie udało się utworzyć pliku config dla OCR: {e}", file=sys.stderr)
-
-if platform.system() == "Windows":
-    path_tesseract = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-    path_tessdata = r"C:\Program Files\Tesseract-OCR\tessdata"
-    if os.path.exists(path_tesseract):
-        pytesseract.pytesseract.tesseract_cmd = path_tesseract
-        if os.path.exists(path_tessdata):
-            os.environ['TESSDATA_PREFIX'] = path_tessdata
-elif platform.system() == "Linux":
-    import shutil
-    
-    # Fallback paths for Linux - check relative to application base dir (for Steam Deck portable)
-    base_dir = get_base_dir()
-    local_tesseract_path = os.path.join(base_dir, "vendor", "tesseract_deck", "tesseract")
-    local_tesseract_path_legacy = os.path.join(base_dir, "lib", "tesseract", "tesseract")
-    
-    if os.path.exists(local_tesseract_path):
-        pytesseract.pytesseract.tesseract_cmd = local_tesseract_path
-    elif os.path.exists(local_tesseract_path_legacy):
-        pytesseract.pytesseract.tesseract_cmd = local_tesseract_path_legacy
-    else:
+# Stan leniwej konfiguracji Tesseracta (ścieżki, plik whitelisty, moduł pytesseract)
+_TESSERACT_LOCK = threading.Lock()
+_tesseract_cmd: Optional[str] = None
+_tesseract_paths_ready = False
+_pytesseract_module = None
+_config_file: Optional[str] = None
+
+
+def _find_tesseract_cmd() -> Optional[str]:
+    """Ścieżka do programu `tesseract` (None = domyślna); na Windows ustawia też TESSDATA_PREFIX."""
+    if platform.system() == "Windows":
+        path_tesseract = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+        path_tessdata = r"C:\Program Files\Tesseract-OCR\tessdata"
+        if os.path.exists(path_tesseract):
+            if os.path.exists(path_tessdata):
+                os.environ['TESSDATA_PREFIX'] = path_tessdata
+            return path_tesseract
+    elif platform.system() == "Linux":
+        import shutil
+
+        # Fallback paths for Linux - check relative to application base dir (for Steam Deck portable)
+        base_dir = get_base_dir()
+        local_tesseract_path = os.path.join(base_dir, "vendor", "tesseract_deck", "tesseract")
+        local_tesseract_path_legacy = os.path.join(base_dir, "lib", "tesseract", "tesseract")
+
+        if os.path.exists(local_tesseract_path):
+            return local_tesseract_path
+        if os.path.exists(local_tesseract_path_legacy):
+            return local_tesseract_path_legacy
         # Fallback to system-wide tesseract if available
-        system_tesseract = shutil.which("tesseract")
-        if system_tesseract:
-            pytesseract.pytesseract.tesseract_cmd = system_tesseract
+        return shutil.which("tesseract")
+    return None
+
+
+def _ensure_tesseract_paths():
+    """Jednorazowe ustalenie ścieżek Tesseracta (przy pierwszym OCR, nie przy imporcie)."""
+    global _tesseract_cmd, _tesseract_paths_ready
+    with _TESSERACT_LOCK:
+        if not _tesseract_paths_ready:
+            _tesseract_cmd = _find_tesseract_cmd()
+            _tesseract_paths_ready = True
+
+
+def _pytesseract():
+    """
+    Moduł pytesseract skonfigurowany do pracy (ścieżka programu, plik
+    whitelisty w katalogu tymczasowym) - importowany przy pierwszym użyciu.
+    """
+    global _pytesseract_module, _config_file
+    if _pytesseract_module is not None:
+        return _pytesseract_module
+    _ensure_tesseract_paths()
+    with _TESSERACT_LOCK:
+        if _pytesseract_module is None:
+            import pytesseract
+
+            if _tesseract_cmd:
+                pytesseract.pytesseract.tesseract_cmd = _tesseract_cmd
+            try:
+                with open(CONFIG_FILE_PATH, "w", encoding="utf-8") as f:
+                    f.write(f"tessedit_char_whitelist {WHITELIST_CHARS}")
+                _config_file = CONFIG_FILE_PATH
+            except Exception as e:
+                print(f"Ostrzeżenie: Nie udało się utworzyć pliku config dla OCR: {e}", file=sys.stderr)
+            _pytesseract_module = pytesseract
+    return _pytesseract_module
+
+
+def _find_tessdata_dir() -> Optional[str]:
+    """Zwraca katalog tessdata dla silnika in-process (None = domyślny z kompilacji)."""
+    env_dir = os.environ.get('TESSDATA_PREFIX')
+    if env_dir and os.path.isdir(env_dir):
+        return env_dir
+    local_tessdata = os.path.join(get_base_dir(), "vendor", "tesseract_deck", "tessdata")
+    if os.path.isdir(local_tessdata):
+        return local_tessdata
+    return None
+
+
+class OcrEngine:
+    """
+    Trwały uchwyt do Tesseracta działający w procesie aplikacji.
+
+    Model `pol` ładowany jest raz przy tworzeniu obiektu, a kolejne wywołania
+    tylko podmieniają obraz. Uchwyt nie jest bezpieczny wątkowo - każdy wątek
+    OCR powinien mieć własną instancję. Gdy `tesserocr` jest niedostępny,
+    silnik przechodzi na `pytesseract` (osobny proces na każde wywołanie).
+    """
+
+    def __init__(self):
+        self._api = None
+        if not HAS_TESSEROCR:
+            return
+        _ensure_tesseract_paths()
+        try:
+            kwargs = {"lang": OCR_LANGUAGE, "psm": PSM.SINGLE_BLOCK}
+            tessdata_dir = _find_tessdata_dir()
+            if tessdata_dir:
+                kwargs["path"] = tessdata_dir
+            self._api = PyTessBaseAPI(**kwargs)
+            self._api.SetVariable("tessedit_char_whitelist", WHITELIST_CHARS)
+        except Exception as e:
+            print(f"Ostrzeżenie: Nie udało się uruchomić Tesseracta in-process, używam pytesseract: {e}", file=sys.stderr)
+            self._api = None
+
+    @property
+    def in_process(self) -> bool:
+        return self._api is not None
+
+    def image_to_string(self, image: Image.Image) -> str:
+        if self._api is None:
+            return _pytesseract_image_to_string(image)
+        self._api.SetImage(image)
+        return self._api.GetUTF8Text()
+
+    def close(self):
+        if self._api is not None:
+            try:
+                self._api.End()
+            except Exception:
+                pass
+            self._api = None
+
+
+class OcrCache:
+    """
+    Ograniczony cache LRU wyników OCR.
+
+    Kluczem jest skrót (BLAKE2b) pikseli obrazu po `preprocess_image` -
+    zbinaryzowanego i przyciętego - więc migające lub przerysowane okno
+    dialogowe z tą samą linią nie wymaga ponownego wywołania Tesseracta.
+    Przechowywany jest surowy tekst z silnika (przed usuwaniem imion).
+    Bezpieczny wątkowo.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max(0, int(max_size))
+        self._items: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(image: Image.Image) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{image.mode}:{image.width}x{image.height}".encode("ascii"))
+        h.update(image.tobytes())
+        return h.digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            text = self._items.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: bytes, text: str):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._items[key] = text
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _pytesseract_image_to_string(image: Image.Image) -> str:
+    """Ścieżka zapasowa: jedno wywołanie procesu `tesseract` (psm 6 + whitelist)."""
+    pytesseract = _pytesseract()
+    if _config_file:
+        config_str = f'--psm 6 "{_config_file}"'
+        return pytesseract.image_to_string(image, lang=OCR_LANGUAGE, config=config_str)
+    return pytesseract.image_to_string(image, lang=OCR_LANGUAGE, config='--psm 6')
 
 def check_alignment(bbox: Tuple[int, int, int, int], width: int, align_mode: str, column_ratio: float = 0.25) -> bool:
     """
@@ -112,6 +291,156 @@ def preprocess_image(image: Image.Image, config_manager: ConfigManager, area_con
     Zwraca krotkę: (przetworzony_obraz, czy_zawiera_tresc, bbox).
     Przetwarza obraz pod kątem OCR w oparciu o jawną konfigurację.
     """
+    if USE_NUMPY_PREPROCESS:
+        return _preprocess_image_numpy(image, config_manager, area_config, override_colors)
+    return _preprocess_image_pil(image, config_manager, area_config, override_colors)
+
+
+# --- Wektoryzowany (NumPy) odpowiednik _preprocess_image_pil ---
+# Wyniki są identyczne piksel w piksel z łańcuchem operacji PIL.
+
+# Wagi luminancji używane przez Pillow przy konwersji RGB -> L (stałoprzecinkowo, >> 16)
+_LUM_WEIGHTS = np.array([19595, 38470, 7471], dtype=np.int32)
+
+
+def _luminance(rgb: np.ndarray) -> np.ndarray:
+    """RGB (H, W, 3) uint8 -> L (H, W) uint8, ta sama formuła co Image.convert('L')."""
+    return ((rgb @ _LUM_WEIGHTS + 0x8000) >> 16).astype(np.uint8)
+
+
+@lru_cache(maxsize=32)
+def _threshold_lut(thresh: int) -> np.ndarray:
+    """Tablica 256 wartości logicznych: piksel > próg."""
+    return np.arange(256) > thresh
+
+
+def _parse_hex_colors(hex_colors: List[str]) -> np.ndarray:
+    """Kolory '#RRGGBB' -> tablica (K, 3); niepoprawne wpisy są pomijane (jak w remove_background)."""
+    parsed = []
+    for c in hex_colors:
+        if not (isinstance(c, str) and c.startswith('#') and len(c) == 7):
+            continue
+        try:
+            parsed.append((int(c[1:3], 16), int(c[3:5], 16), int(c[5:7], 16)))
+        except ValueError:
+            continue
+    return np.array(parsed, dtype=np.int32).reshape(-1, 3)
+
+
+def _color_mask(rgb: np.ndarray, colors: np.ndarray, tolerance: int) -> np.ndarray:
+    """
+    Maska pikseli bliskich któremukolwiek z kolorów - wszystkie kolory naraz
+    (broadcast (K, H, W, 3)). Luminancja różnicy < tolerancja, jak w remove_background.
+    """
+    if len(colors) == 0:
+        return np.zeros(rgb.shape[:2], dtype=bool)
+    diff = np.abs(rgb[None, :, :, :].astype(np.int32) - colors[:, None, None, :])
+    # (lum + 0x8000) >> 16 < tol  <=>  lum + 0x8000 < tol << 16
+    return ((diff @ _LUM_WEIGHTS + 0x8000) < (tolerance << 16)).any(axis=0)
+
+
+def _max_filter(mask: np.ndarray, radius: int) -> np.ndarray:
+    """Maksimum w kwadratowym oknie (2r+1) dla maski logicznej - odpowiednik ImageFilter.MaxFilter."""
+    out = mask.copy()
+    h, w = mask.shape
+    for d in range(1, min(radius, h - 1) + 1):
+        out[d:] |= mask[:-d]
+        out[:-d] |= mask[d:]
+    rows = out.copy()
+    for d in range(1, min(radius, w - 1) + 1):
+        out[:, d:] |= rows[:, :-d]
+        out[:, :-d] |= rows[:, d:]
+    return out
+
+
+def _enhance_contrast(arr: np.ndarray, factor: float) -> np.ndarray:
+    """Odpowiednik ImageEnhance.Contrast(...).enhance(factor) (blend w float32 jak w Pillow)."""
+    gray = _luminance(arr) if arr.ndim == 3 else arr
+    mean = np.float32(int(gray.mean() + 0.5))
+    out = mean + np.float32(factor) * (arr.astype(np.float32) - mean)
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+def _preprocess_image_numpy(image: Image.Image, config_manager: ConfigManager, area_config: Optional[AreaConfig] = None, override_colors: Optional[List[str]] = None) -> Tuple[Image.Image, bool, Optional[Tuple[int, int, int, int]]]:
+    try:
+        thick = int(area_config.text_thickening)
+        thresh = int(area_config.brightness_threshold)
+        contr = float(area_config.contrast or 0.0)
+        cols_source = override_colors if override_colors is not None else area_config.colors
+        color_tol = int(area_config.color_tolerance)
+        show_debug = bool(config_manager.show_debug)
+
+        # Parametry obszaru
+        brightness_mode = str(area_config.brightness_mode if area_config and hasattr(area_config, 'brightness_mode') else "Light")
+        scale_factor = float(area_config.ocr_scale_factor if area_config and hasattr(area_config, 'ocr_scale_factor') else 1.0)
+
+        if show_debug:
+            print(f"Preprocess area: thinning={thick}, threshold={thresh}, contrast={contr}, color_tol={color_tol}, colors={cols_source}")
+
+        valid_colors = [c for c in (cols_source or []) if c]
+
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        arr = np.asarray(image)
+
+        if valid_colors:
+            rgb = arr if arr.ndim == 3 else np.repeat(arr[:, :, None], 3, axis=2)
+            mask = _color_mask(rgb, _parse_hex_colors(valid_colors), color_tol)
+            if thick > 0:
+                mask = _max_filter(mask, thick)
+            gray = mask.astype(np.uint8) * 255
+        else:
+            if contr != 0:
+                arr = _enhance_contrast(arr, contr + 1.0)
+            if brightness_mode == "Mixed" and arr.ndim == 3:
+                # Ścieżka PIL nie progruje obrazu RGB (point(..., '1') rzuca wyjątek),
+                # więc w trybie Mixed obraz nie jest przycinany.
+                result = Image.fromarray(arr)
+                if abs(scale_factor - 1.0) > 0.05:
+                    result = result.resize((int(result.width * scale_factor), int(result.height * scale_factor)), Image.BICUBIC)
+                return result, True, (0, 0, arr.shape[1], arr.shape[0])
+            gray = _luminance(arr) if arr.ndim == 3 else arr
+            if brightness_mode == "Dark":
+                gray = 255 - gray
+
+        height, width = gray.shape
+        on = _threshold_lut(thresh)[gray]
+        rows = np.flatnonzero(on.any(axis=1))
+        if len(rows) == 0:
+            return Image.fromarray(gray), False, (0, 0, width, height)
+        cols = np.flatnonzero(on.any(axis=0))
+
+        # bbox maski po MaxFilter(3) (rozszerzenie o 1 px) + margines 4 px
+        padding = 4 + 1
+        left = max(0, int(cols[0]) - padding)
+        upper = max(0, int(rows[0]) - padding)
+        right = min(width, int(cols[-1]) + 1 + padding)
+        lower = min(height, int(rows[-1]) + 1 + padding)
+
+        if (right - left) > 10 and (lower - upper) > 10:
+            crop_box = (left, upper, right, lower)
+            gray = gray[upper:lower, left:right]
+        else:
+            crop_box = (0, 0, width, height)
+
+        if abs(scale_factor - 1.0) > 0.05:
+            result = Image.fromarray(gray)
+            result = result.resize((int(result.width * scale_factor), int(result.height * scale_factor)), Image.BICUBIC)
+            if brightness_mode != "Mixed":
+                result = ImageOps.invert(result)
+            return result, True, crop_box
+
+        if brightness_mode != "Mixed":
+            gray = 255 - gray
+        return Image.fromarray(np.ascontiguousarray(gray)), True, crop_box
+
+    except Exception as e:
+        print(f"Błąd preprocessingu: {e}", file=sys.stderr)
+        return image, True, (0, 0, image.width, image.height)
+
+
+def _preprocess_image_pil(image: Image.Image, config_manager: ConfigManager, area_config: Optional[AreaConfig] = None, override_colors: Optional[List[str]] = None) -> Tuple[Image.Image, bool, Optional[Tuple[int, int, int, int]]]:
+    """Pierwotna implementacja oparta o operacje PIL (punkt odniesienia dla wersji NumPy)."""
     try:
         thick = int(area_config.text_thickening)
         thresh = int(area_config.brightness_threshold)
@@ -191,7 +520,8 @@ def get_text_bounds(image: Image.Image) -> Optional[Tuple[int, int, int, int]]:
     Używa pytesseract.image_to_data, aby znaleźć bounding box wokół faktycznego tekstu.
     """
     try:
-        data = pytesseract.image_to_data(image, lang=OCR_LANGUAGE, output_type=Output.DICT)
+        pytesseract = _pytesseract()
+        data = pytesseract.image_to_data(image, lang=OCR_LANGUAGE, output_type=pytesseract.Output.DICT)
         n_boxes = len(data['text'])
         min_l, min_t = image.width, image.height
         max_r, max_b = 0, 0
@@ -214,19 +544,26 @@ def get_text_bounds(image: Image.Image) -> Optional[Tuple[int, int, int, int]]:
         return None
 
 
-def recognize_text(image: Image.Image, config_manager: ConfigManager) -> str:
+def recognize_text(image: Image.Image, config_manager: ConfigManager, engine: Optional[OcrEngine] = None,
+                   cache: Optional[OcrCache] = None) -> str:
     """
     Główna funkcja OCR.
+    Jeśli podano `engine`, używa trwałego uchwytu Tesseracta zamiast pytesseract.
+    Jeśli podano `cache`, identyczny obraz nie trafia ponownie do Tesseracta.
     """
     # Use ConfigManager to read behaviour flags
     # note: we keep backward compatibility by consulting preset dict via helper where needed
 
     try:
-        if HAS_CONFIG_FILE:
-            config_str = f'--psm 6 "{CONFIG_FILE_PATH}"'
-            text = pytesseract.image_to_string(image, lang=OCR_LANGUAGE, config=config_str)
-        else:
-            text = pytesseract.image_to_string(image, lang=OCR_LANGUAGE, config='--psm 6')
+        key = cache.key_for(image) if cache is not None else None
+        text = cache.get(key) if key is not None else None
+        if text is None:
+            if engine is not None:
+                text = engine.image_to_string(image)
+            else:
+                text = _pytesseract_image_to_string(image)
+            if key is not None:
+                cache.put(key, text or "")
 
         if not text:
             print(f"OCR: No text recognized.")
@@ -291,11 +628,12 @@ def find_text_bounds(image: Image.Image, config_str: str = "") -> Optional[Tuple
         if not config_str:
              pass
 
+        pytesseract = _pytesseract()
         cfg = f"--psm 6 -l {OCR_LANGUAGE}"
-        if HAS_CONFIG_FILE:
-             cfg += f" {CONFIG_FILE_PATH}"
+        if _config_file:
+             cfg += f" {_config_file}"
         
-        data = pytesseract.image_to_data(image, output_type=Output.DICT, config=cfg)
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT, config=cfg)
         n_boxes = len(data['level'])
         
         min_x, min_y = float('inf'), float('inf')
@@ -4,13 +4,25 @@ from collections import Counter
 from typing import Tuple, List, Dict, Any
 import multiprocessing
 
-from app.ocr import preprocess_image, recognize_text
-from app.matcher import find_best_match, precompute_subtitles, MATCH_MODE_FULL, MATCH_MODE_STARTS, MATCH_MODE_PARTIAL
+from app.ocr import preprocess_image, recognize_text, OcrEngine, OcrCache
+from app.matcher import find_best_match, MATCH_MODE_FULL, MATCH_MODE_STARTS, MATCH_MODE_PARTIAL
 from app.config_manager import ConfigManager, PresetConfig
+from app.subtitle_cache import get_precomputed
 
 # Global variables for worker processes to avoid repeated serialization
 _worker_crop = None
 _worker_db = None
+# Uchwyt Tesseracta współdzielony przez wszystkie zadania w danym procesie
+_worker_engine = None
+# Wiele kombinacji ustawień daje identyczny obraz po preprocessingu - OCR liczymy raz
+_worker_ocr_cache = OcrCache(512)
+
+
+def _get_worker_engine() -> OcrEngine:
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = OcrEngine()
+    return _worker_engine
 
 def _init_worker(crop, db):
     global _worker_crop, _worker_db
@@ -38,7 +50,7 @@ def _evaluate_worker(args, crop=None, db=None):
         if not has_content:
             return 0, None
 
-        ocr_text = recognize_text(processed_img, mock_cfg)
+        ocr_text = recognize_text(processed_img, mock_cfg, engine=_get_worker_engine(), cache=_worker_ocr_cache)
         if not ocr_text or len(ocr_text.strip()) < 2:
             return 0, None
 
@@ -125,10 +137,24 @@ class OptimizerConfigManager(ConfigManager):
             return self.preset_cache.match_len_diff_ratio
         return 0.30
 
+    @property
+    def matcher_use_index(self):
+        if hasattr(self.preset_cache, 'matcher_use_index'):
+            return self.preset_cache.matcher_use_index
+        return True
+
+    @property
+    def matcher_index_top_n(self):
+        if hasattr(self.preset_cache, 'matcher_index_top_n'):
+            return self.preset_cache.matcher_index_top_n
+        return 200
+
 class SettingsOptimizer:
     def __init__(self, original_config_manager: ConfigManager = None):
         self.base_preset = PresetConfig()
+        self.cache_dir = None
         if original_config_manager:
+            self.cache_dir = original_config_manager.subtitle_cache_dir
             loaded_preset = original_config_manager.load_preset()
             import copy
             self.base_preset = copy.deepcopy(loaded_preset)
@@ -182,7 +208,7 @@ class SettingsOptimizer:
         crop0 = create_crop(first_image)
         if not crop0: return {"score": 0, "settings": {}, "optimized_area": rough_area, "error": "Invalid area or empty crop"}
 
-        precomputed_db = precompute_subtitles(subtitle_db)
+        precomputed_db = get_precomputed(subtitle_db, 0, self.cache_dir)
         candidate_colors = [initial_color] if initial_color else sorted(list(set(self._extract_dominant_colors(crop0)) | {"#FFFFFF"}))
             
         candidates = []
@@ -403,7 +429,7 @@ class SettingsOptimizer:
         try:
             processed, has, bbox = preprocess_image(crop.copy(), mock, area_config=preset)
             if not has: return 0, None
-            text = recognize_text(processed, mock)
+            text = recognize_text(processed, mock, engine=_get_worker_engine(), cache=_worker_ocr_cache)
             if not text or len(text.strip()) < 2: return 0, None
             res = find_best_match(text, db, mode=match_mode, matcher_config=mock)
             return (res[1] if res else 0), bbox
@@ -0,0 +1,113 @@
+"""
+Kolejka odtwarzania z priorytetami i wywłaszczaniem.
+
+Zwykłe FIFO odtwarzało do końca linie z dialogu, który gracz już
+przewinął. Tutaj każda pozycja niesie czas przechwycenia klatki i obszar:
+- linie z obszaru głównego mają pierwszeństwo przed pozostałymi,
+- pozycje starsze niż `max_age` (od przechwycenia) są pomijane przy pobraniu,
+- `preempt()` usuwa oczekujące linie, gdy nowe dopasowanie z obszaru
+  głównego ma przerwać bieżący dialog, i zwiększa numer generacji - linia
+  pobrana już przez odtwarzacz, ale jeszcze nie rozpoczęta, jest rozpoznawana
+  po starszej generacji (`is_current`) i nie zostanie odtworzona.
+"""
+import heapq
+import itertools
+import queue
+import time
+from typing import Any, NamedTuple, Optional
+
+PRIORITY_MAIN = 0
+PRIORITY_OTHER = 1
+
+
+class PlaybackItem(NamedTuple):
+    audio_file: str
+    speed_multiplier: float
+    enqueued_at: float  # time.perf_counter() w chwili dodania do kolejki
+    predicted_wait: Optional[float] = None  # przewidywanie TempoScheduler (s)
+    captured_at: Optional[float] = None  # time.perf_counter() przechwycenia klatki
+    area_id: Any = None
+    priority: int = PRIORITY_MAIN
+    line_idx: int = -1
+    generation: int = 0  # ustawiane przez PlaybackQueue.put (licznik preempt())
+
+
+class PlaybackQueue(queue.Queue):
+    """
+    queue.Queue z kopcem (priorytet, kolejność dodania). Zgodna z dotychczasowym
+    użyciem (`put`, `get`, `qsize`, czyszczenie `queue.clear()` pod `mutex`).
+    """
+
+    def __init__(self, maxsize: int = 0, max_age: float = 0.0):
+        super().__init__(maxsize)
+        self.max_age = max_age
+        self.dropped_stale = 0
+        self.dropped_preempted = 0
+
+    # --- Przechowywanie (wywoływane przez queue.Queue pod blokadą) ---
+
+    def _init(self, maxsize):
+        self.queue = []
+        self._counter = itertools.count()
+        self.generation = 0
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        priority = PRIORITY_MAIN
+        if isinstance(item, PlaybackItem):
+            priority = item.priority
+            item = item._replace(generation=self.generation)
+        heapq.heappush(self.queue, (priority, next(self._counter), item))
+
+    def _get(self):
+        return heapq.heappop(self.queue)[2]
+
+    # --- Rozszerzenia ---
+
+    def is_stale(self, item, now: Optional[float] = None) -> bool:
+        if not self.max_age or not isinstance(item, PlaybackItem):
+            return False
+        born = item.captured_at if item.captured_at is not None else item.enqueued_at
+        now = time.perf_counter() if now is None else now
+        return now - born > self.max_age
+
+    def get_fresh(self, timeout: Optional[float] = None):
+        """Jak `get`, ale pomija (i liczy) pozycje starsze niż `max_age`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            item = self.get(timeout=remaining)
+            if not self.is_stale(item):
+                return item
+            with self.mutex:
+                self.dropped_stale += 1
+
+    def preempt(self, max_priority: int = PRIORITY_MAIN) -> int:
+        """
+        Usuwa oczekujące pozycje o priorytecie >= max_priority; zwraca ich
+        liczbę. Pozycje już pobrane stają się nieaktualne (patrz `is_current`).
+        """
+        with self.mutex:
+            self.generation += 1
+            kept = [entry for entry in self.queue if entry[0] < max_priority]
+            removed = len(self.queue) - len(kept)
+            if removed:
+                heapq.heapify(kept)
+                self.queue[:] = kept
+                self.dropped_preempted += removed
+                self.not_full.notify_all()
+            return removed
+
+    def is_current(self, item) -> bool:
+        """Czy pobrana pozycja nie została wywłaszczona przez późniejsze `preempt()`."""
+        if not isinstance(item, PlaybackItem):
+            return True
+        with self.mutex:
+            return item.generation == self.generation
+
+    def drop_preempted(self):
+        """Liczy pozycję pobraną, ale pominiętą po wywłaszczeniu."""
+        with self.mutex:
+            self.dropped_preempted += 1
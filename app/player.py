@@ -2,112 +2,271 @@ import threading
 import queue
 import subprocess
 import time
-import os
 import sys
-import platform
+import statistics
+import math
+from collections import deque
+
+from app.audio_engine import (
+    AudioEngine, AudioPrefetcher, PcmCache, build_filter_chain, find_ffmpeg_tool, startup_info,
+)
+from app.playback_queue import PlaybackItem
 
 
 class PlayerThread(threading.Thread):
     def __init__(
-        self, stop_event, audio_queue, base_speed_callback=None, volume_callback=None
+        self, stop_event, audio_queue, base_speed_callback=None, volume_callback=None,
+        log_queue=None, pcm_cache_mb: int = 64, use_engine: bool = True,
     ):
         super().__init__(daemon=True)
         self.stop_event = stop_event
         self.audio_queue = audio_queue
         self.base_speed_callback = base_speed_callback
         self.volume_callback = volume_callback
+        self.log_queue = log_queue
         self.current_process = None
+        self.use_engine = use_engine
+        # Ustawiane przez wątek czekający na proces (waitpid) - bez odpytywania co 100 ms
+        self._clip_done = threading.Event()
+        self._clip_done.set()
+        # Przerwa między końcem klipu a startem kolejnego (ms), gdy ten już czekał
+        self.clip_gaps = deque(maxlen=50)
+        self._clip_ended_at = None
+        # Trwały silnik audio (tworzony w run(), ffplay jako zapas)
+        self.engine: AudioEngine = None
+        # Cache zdekodowanych klipów i dekodowanie z wyprzedzeniem (tylko z silnikiem)
+        self.pcm_cache = PcmCache(max(0, pcm_cache_mb) * 1024 * 1024)
+        self.prefetcher: AudioPrefetcher = None
+        # Gotowe warianty tempa (TempoCache, ustawiany przez czytnik po wczytaniu indeksu audio)
+        self.tempo_cache = None
+        # Analiza głośności z indeksu audio: stałe wzmocnienie pliku zamiast alimiter
+        self.audio_index = None
+        self.target_lufs = None  # None = normalizacja wyłączona
+        # Opóźnienia przechwycenie klatki -> start dźwięku (ms), do logu
+        self.capture_latencies = deque(maxlen=50)
 
-        self.ffplay_cmd = "ffplay"
-        if platform.system() == "Linux":
-            # Sprawdzenie czy w głównym katalogu znajduje się plik ffplay
-            local_ffplay = os.path.abspath(os.path.join("lib", "ffplay"))
-            if os.path.exists(local_ffplay):
-                self.ffplay_cmd = local_ffplay
+        self.ffplay_cmd = find_ffmpeg_tool("ffplay")
 
     def _get_startup_info(self):
         """
         Zwraca strukturę STARTUPINFO dla Windows, aby ukryć okno terminala
         procesu potomnego (ffplay).
         """
-        if platform.system() == "Windows":
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = 0  # SW_HIDE
-            return startupinfo
-        return None
+        return startup_info()
 
-    def run(self):
-        while not self.stop_event.is_set():
-            try:
-                # Czekamy na dane w kolejce
-                data = self.audio_queue.get(timeout=0.5)
-            except queue.Empty:
-                continue
+    def _report_latency(self, item: PlaybackItem, latency_ms, backend):
+        if latency_ms is None:
+            return
+        text = f"Audio ({backend}): start po {latency_ms:.0f} ms od dopasowania"
+        ended_at = self._clip_ended_at
+        if ended_at is not None and item.enqueued_at <= ended_at:
+            # Linia czekała na koniec poprzedniej - ile trwało przejście
+            gap_ms = (item.enqueued_at + latency_ms / 1000 - ended_at) * 1000
+            self.clip_gaps.append(gap_ms)
+            text += f" | przerwa po poprzedniej {gap_ms:.0f} ms"
+        if item.predicted_wait is not None:
+            # Zaległość przewidziana przez TempoScheduler vs faktyczne oczekiwanie
+            text += f" (przewidywano {item.predicted_wait * 1000:.0f} ms)"
+        if item.captured_at is not None:
+            end_to_end = latency_ms + (item.enqueued_at - item.captured_at) * 1000
+            self.capture_latencies.append(end_to_end)
+            text += (f" | od zrzutu {end_to_end:.0f} ms"
+                     f" (mediana {statistics.median(self.capture_latencies):.0f} ms)")
+        dropped_stale = getattr(self.audio_queue, "dropped_stale", 0)
+        dropped_preempted = getattr(self.audio_queue, "dropped_preempted", 0)
+        if dropped_stale or dropped_preempted:
+            text += f" | pominięte: przeterminowane {dropped_stale}, wywłaszczone {dropped_preempted}"
+        if self.prefetcher is not None:
+            text += f" | {self.pcm_cache.stats_text()}"
+        if self.log_queue:
+            self.log_queue.put({"time": "INFO", "line_text": text})
 
-            # Obsługa formatu danych (Tuple vs String dla kompatybilności)
-            if isinstance(data, tuple):
-                audio_file, dynamic_multiplier = data
-            else:
-                audio_file = data
-                dynamic_multiplier = 1.0
+    @staticmethod
+    def _as_item(data) -> PlaybackItem:
+        """Obsługa formatu danych (PlaybackItem / krotka / sama ścieżka dla kompatybilności)."""
+        if isinstance(data, PlaybackItem):
+            return data
+        if isinstance(data, tuple):
+            return PlaybackItem(*data)
+        return PlaybackItem(data, 1.0, time.perf_counter())
 
-            if not os.path.exists(audio_file):
-                print(f"Błąd: Plik audio nie istnieje: {audio_file}")
-                continue
+    def _resolve(self, audio_file, dynamic_multiplier=1.0):
+        """
+        Zwraca (klucz PCM, plik, łańcuch filtrów) dla linii - bez skutków
+        ubocznych (wywoływane także przez AudioPrefetcher). Gdy istnieje
+        wariant wyrenderowany w docelowym tempie, atempo nie jest liczone na
+        żywo. Klucz to (źródło, tempo, wzmocnienie), więc ten sam dźwięk
+        z wariantu i z atempo trafia w jeden wpis PcmCache.
+        """
+        speed = self._final_speed(dynamic_multiplier)
+        volume, limiter = self._gain(audio_file)
+        gain_chain = build_filter_chain(1.0, volume, limiter)
+        key = (audio_file, f"{speed:.2f}", gain_chain)
+        tempo_cache = self.tempo_cache
+        if tempo_cache is not None and f"{speed:.2f}" != "1.00":
+            variant = tempo_cache.lookup(audio_file, speed)
+            if variant:
+                return key, variant, gain_chain
+        return key, audio_file, build_filter_chain(speed, volume, limiter)
 
-            # Pobieramy bazowe ustawienia z GUI
-            base_speed = self.base_speed_callback() if self.base_speed_callback else 1.0
-            base_volume = self.volume_callback() if self.volume_callback else 1.0
+    def _gain(self, audio_file):
+        """
+        Głośność z GUI razy stałe wzmocnienie pliku z analizy głośności.
+        Limiter zostaje tylko, gdy plik nie był analizowany albo jego szczyt
+        po wzmocnieniu przekroczyłby -1 dBTP.
+        """
+        base_volume = self.volume_callback() if self.volume_callback else 1.0
+        index = self.audio_index
+        if index is None or self.target_lufs is None:
+            return base_volume, True
+        entry = index.entry_for_path(audio_file)
+        gain_db = entry.gain_db(self.target_lufs) if entry else None
+        if gain_db is None:
+            return base_volume, True
+        volume = base_volume * 10 ** (gain_db / 20)
+        if volume <= 0:
+            return volume, False
+        return volume, entry.true_peak + 20 * math.log10(volume) > -1.0
 
-            # Wyliczamy ostateczną prędkość
-            final_speed = base_speed * dynamic_multiplier
+    def _final_speed(self, dynamic_multiplier=1.0):
+        # Pobieramy bazowe ustawienia z GUI
+        base_speed = self.base_speed_callback() if self.base_speed_callback else 1.0
 
-            # Zabezpieczenie dla filtra atempo (limit ffplay to 0.5 - 100.0)
-            final_speed = max(0.5, min(final_speed, 100.0))
+        # Wyliczamy ostateczną prędkość
+        final_speed = base_speed * dynamic_multiplier
 
-            # Budowanie komendy dla ffplay
-            # Używamy final_speed w filtrze atempo
-            filter_complex = (
-                f"atempo={final_speed:.2f},volume={base_volume:.2f},alimiter=limit=0.95"
-            )
+        # Zabezpieczenie dla filtra atempo (limit ffplay to 0.5 - 100.0)
+        return max(0.5, min(final_speed, 100.0))
 
-            cmd = [
-                self.ffplay_cmd,
-                "-nodisp",
-                "-autoexit",
-                "-af",
-                filter_complex,
-                audio_file,
-            ]
+    def prefetch(self, audio_files):
+        """Zleca dekodowanie w tle plików linii, które prawdopodobnie padną jako następne."""
+        if self.prefetcher is not None:
+            self.prefetcher.request(audio_files)
+
+    def run(self):
+        self.engine = AudioEngine(enabled=self.use_engine)
+        if self.engine.available and self.pcm_cache.max_bytes > 0:
+            # Linie przewidywane są odtwarzane zwykle bez przyspieszenia (mnożnik 1.0)
+            self.prefetcher = AudioPrefetcher(
+                self.engine, self.pcm_cache, self.stop_event, self._resolve
+            )
+            self.prefetcher.start()
+        try:
+            self._run_loop()
+        finally:
+            self.engine.close()
+            self.pcm_cache.clear()
+            if self.tempo_cache is not None:
+                self.tempo_cache.close()
 
+    def _run_loop(self):
+        while not self.stop_event.is_set():
             try:
-                # Uruchomienie procesu z ukrytym oknem
-                pass  # Player log removed
-                self.current_process = subprocess.Popen(
-                    cmd,
-                    startupinfo=self._get_startup_info(),
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                )
-
-                # Czekamy na zakończenie odtwarzania lub sygnał stop
-                while self.current_process.poll() is None:
-                    if self.stop_event.is_set():
-                        self.current_process.terminate()
-                        break
-                    time.sleep(0.1)
+                # Czekamy na dane w kolejce (przeterminowane linie są pomijane)
+                data = self.audio_queue.get_fresh(timeout=0.5)
+            except queue.Empty:
+                continue
+            item = self._as_item(data)
+            # Wywłaszczenie między pobraniem a startem dźwięku (patrz PlaybackQueue.is_current)
+            is_current = lambda data=data: self.audio_queue.is_current(data)
+            if not is_current():
+                self.audio_queue.drop_preempted()
+                continue
 
+            key, audio_file, filter_complex = self._resolve(item.audio_file, item.speed_multiplier)
+            if self.tempo_cache is not None and audio_file == item.audio_file and key[1] != "1.00":
+                # Brakujący wariant (tylko gdy preset pozwala renderować w tle)
+                self.tempo_cache.request(item.audio_file, float(key[1]))
+
+            try:
+                if self.engine.available:
+                    pcm = None
+                    if self.prefetcher is not None:
+                        pcm = self.pcm_cache.get(key)
+                    self.engine.play(audio_file, filter_complex, enqueued_at=item.enqueued_at,
+                                     stop_event=self.stop_event, pcm=pcm, is_current=is_current)
+                    if self.engine.last_latency_ms is None and not is_current():
+                        self.audio_queue.drop_preempted()
+                        continue
+                    self._report_latency(item, self.engine.last_latency_ms,
+                                         "silnik, cache" if pcm is not None else "silnik")
+                else:
+                    self._play_ffplay(audio_file, filter_complex, item, is_current)
             except Exception as e:
                 print(f"Błąd odtwarzacza: {e}", file=sys.stderr)
             finally:
-                self.current_process = None
+                self._clip_ended_at = time.perf_counter()
+
+    def _play_ffplay(self, audio_file, filter_complex, item: PlaybackItem, is_current=None):
+        """Ścieżka zapasowa: osobny proces ffplay dla każdej linii."""
+        cmd = [
+            self.ffplay_cmd,
+            "-nodisp",
+            "-autoexit",
+            "-af",
+            filter_complex,
+            audio_file,
+        ]
+
+        done = threading.Event()
+        self._clip_done = done
+        try:
+            # Uruchomienie procesu z ukrytym oknem
+            process = subprocess.Popen(
+                cmd,
+                startupinfo=self._get_startup_info(),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            self.current_process = process
+            if is_current is not None and not is_current():
+                # preempt() mógł nie zobaczyć jeszcze tego procesu
+                process.terminate()
+                self.audio_queue.drop_preempted()
+                process.wait()
+                return
+            # Koniec procesu sygnalizuje wątek pomocniczy (waitpid), nie odpytywanie
+            threading.Thread(target=self._wait_process, args=(process, done), daemon=True).start()
+            # ffplay nie zgłasza momentu startu dźwięku - mierzymy do uruchomienia procesu
+            self._report_latency(item, (time.perf_counter() - item.enqueued_at) * 1000, "ffplay")
+
+            # Czekamy na zakończenie odtwarzania; stop_event sprawdzamy przy okazji
+            while not done.wait(0.25):
+                if self.stop_event.is_set():
+                    process.terminate()
+                    done.wait(1.0)
+                    break
+        finally:
+            self.current_process = None
+            done.set()
+
+    @staticmethod
+    def _wait_process(process, done):
+        try:
+            process.wait()
+        finally:
+            done.set()
 
     def is_playing(self):
-        return self.current_process is not None and self.current_process.poll() is None
+        if self.engine is not None and self.engine.is_playing():
+            return True
+        return not self._clip_done.is_set()
+
+    def preempt(self, fade_ms: int = 0):
+        """Przerywa bieżącą linię (z krótkim wyciszeniem w silniku) na rzecz nowej."""
+        if self.engine is not None and self.engine.is_playing():
+            self.engine.interrupt(fade_ms)
+        process = self.current_process
+        if process is not None:
+            try:
+                process.terminate()
+            except OSError:
+                pass
 
     def stop(self):
         self.stop_event.set()
+        if self.engine is not None:
+            self.engine.interrupt()
         if self.current_process:
             try:
                 self.current_process.terminate()
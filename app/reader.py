@@ -1,19 +1,53 @@
+import os
 import threading
 import time
-import os
 import queue
-import copy
 from collections import deque
 from datetime import datetime
-from typing import Any, Optional, Tuple, Dict
-
-# ImageChops jest wykorzystywany w funkcji _images_are_similar, a ImageStat w tej samej funkcji.
-from PIL import Image, ImageChops, ImageStat
-
-from app.capture import capture_region
-from app.ocr import preprocess_image, recognize_text
-from app.matcher import find_best_match, precompute_subtitles
+from typing import Any, Callable, Optional, Tuple, Dict, NamedTuple
+
+from app.capture import capture_region, close_thread_capture
+from app.ocr import preprocess_image, recognize_text, OcrEngine, OcrCache
+from app.change_detector import TileChangeDetector
+from app.matcher import find_best_match, update_precomputed
+from app.subtitle_cache import get_subtitle_db, store_subtitle_db
+from app.subtitle_store import SubtitleStore
+from app.file_watcher import FileWatcher
 from app.config_manager import ConfigManager
+from app.runtime_config import RuntimeConfig
+from app.audio_index import AudioIndex
+from app.tempo_cache import TempoCache
+from app.tempo_scheduler import TempoScheduler
+from app.playback_queue import PlaybackItem, PRIORITY_MAIN, PRIORITY_OTHER
+
+
+class OcrJob(NamedTuple):
+    """Zadanie dla etapu OCR: przetworzony wycinek obszaru `area_idx`."""
+    area_idx: int
+    seq: int
+    processed: Any
+    crop_bbox: Optional[Tuple[int, int, int, int]]
+    changed_tiles: Any
+    t_cap: float
+    t_pre: float
+    captured_at: float  # time.perf_counter() zrzutu (opóźnienie zrzut -> audio)
+
+
+class OcrResult(NamedTuple):
+    area_idx: int
+    seq: int
+    text: str
+    crop_bbox: Optional[Tuple[int, int, int, int]]
+    changed_tiles: Any
+    t_cap: float
+    t_pre: float
+    t_ocr: float
+    captured_at: float
+    failed: bool = False  # wyjątek OCR - pusty tekst, żeby nie blokować kolejności seq
+
+
+# Jak długo (s) etap dopasowania czeka na brakujący numer seq obszaru, zanim go pominie
+OCR_REORDER_TIMEOUT = 2.0
 
 
 class CaptureWorker(threading.Thread):
@@ -24,17 +58,19 @@ class CaptureWorker(threading.Thread):
         stop_event: threading.Event,
         img_queue: queue.Queue,
         unified_area: Dict[str, int],
-        config_manager: ConfigManager,
+        runtime: RuntimeConfig,
         log_queue=None,
     ):
         super().__init__(daemon=True)
         self.stop_event = stop_event
         self.img_queue = img_queue
         self.unified_area = unified_area
-        self.config_manager = config_manager
+        # Podmieniany w całości przez ReaderThread.update_runtime()
+        self.runtime = runtime
         self.log_queue = log_queue
         self.first_capture_done = False
         self._logged_fail = False
+        self.dropped_frames = 0
 
     def run(self):
         while not self.stop_event.is_set():
@@ -42,8 +78,9 @@ class CaptureWorker(threading.Thread):
 
             self.capture()
             elapsed = time.monotonic() - loop_start
-            current_interval = self.config_manager.capture_interval
+            current_interval = self.runtime.capture_interval
             time.sleep(max(0.01, current_interval - elapsed))
+        close_thread_capture()
 
     def capture(self):
         t0 = time.perf_counter()
@@ -62,9 +99,10 @@ class CaptureWorker(threading.Thread):
                 if self.img_queue.full():
                     try:
                         self.img_queue.get_nowait()
+                        self.dropped_frames += 1
                     except queue.Empty:
                         pass
-                self.img_queue.put((full_img, t_cap), block=False)
+                self.img_queue.put((full_img, t_cap, t0), block=False)
             except queue.Full:
                 pass
         else:
@@ -76,6 +114,75 @@ class CaptureWorker(threading.Thread):
                     self.log_queue.put({"time": "ERROR", "line_text": msg})
 
 
+class OcrWorker(threading.Thread):
+    """
+    Etap 2 potoku: OCR. Każdy worker ma własny uchwyt Tesseracta (OcrEngine
+    nie jest bezpieczny wątkowo); cache wyników jest współdzielony.
+    """
+
+    def __init__(
+        self,
+        worker_id: int,
+        stop_event: threading.Event,
+        job_queue: queue.Queue,
+        result_queue: queue.Queue,
+        runtime: RuntimeConfig,
+        ocr_cache: Optional[OcrCache] = None,
+        log_queue=None,
+    ):
+        super().__init__(daemon=True)
+        self.worker_id = worker_id
+        self.stop_event = stop_event
+        self.job_queue = job_queue
+        self.result_queue = result_queue
+        self.runtime = runtime
+        self.ocr_cache = ocr_cache
+        self.log_queue = log_queue
+        self.failed_jobs = 0
+
+    def _recognize(self, job: OcrJob, engine: OcrEngine) -> OcrResult:
+        """OCR jednego zadania; błąd daje wynik z pustym tekstem dla tego samego seq."""
+        t_ocr_start = time.perf_counter()
+        failed = False
+        try:
+            text = recognize_text(job.processed, self.runtime, engine=engine,
+                                  cache=self.ocr_cache)
+        except Exception as e:
+            text, failed = "", True
+            self.failed_jobs += 1
+            if self.failed_jobs == 1:
+                msg = f"OCR worker #{self.worker_id}: błąd OCR ({e}) - kolejne błędy tylko zliczane"
+                print(msg)
+                if self.log_queue:
+                    self.log_queue.put({"time": "ERROR", "line_text": msg})
+        t_ocr = (time.perf_counter() - t_ocr_start) * 1000
+        return OcrResult(job.area_idx, job.seq, text, job.crop_bbox, job.changed_tiles,
+                         job.t_cap, job.t_pre, t_ocr, job.captured_at, failed)
+
+    def run(self):
+        engine = OcrEngine()
+        if self.log_queue:
+            backend = "in-process" if engine.in_process else "pytesseract"
+            self.log_queue.put({"time": "INFO", "line_text": f"OCR worker #{self.worker_id}: {backend}"})
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    job = self.job_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+                result = self._recognize(job, engine)
+                # Etap dopasowania może chwilowo nie nadążać - czekamy (backpressure)
+                while not self.stop_event.is_set():
+                    try:
+                        self.result_queue.put(result, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+        finally:
+            engine.close()
+
+
 class ReaderThread(threading.Thread):
     """Wątek KONSUMENTA: OCR i Matching."""
 
@@ -89,6 +196,8 @@ class ReaderThread(threading.Thread):
         log_queue=None,
         debug_queue: Optional[queue.Queue] = None,
         brightness_threshold: int = 200,
+        ui_dispatch: Optional[Callable[[Callable[[], None]], None]] = None,
+        on_preset_reload: Optional[Callable[[], None]] = None,
     ):
         super().__init__(daemon=True)
         self.config_manager = config_manager
@@ -99,12 +208,29 @@ class ReaderThread(threading.Thread):
         self.debug_queue = debug_queue
         self.target_resolution = target_resolution
         self.brightness_threshold = brightness_threshold
+        # Przeładowanie presetu wykonywane w wątku UI (np. root.after(0, fn)),
+        # bo odświeża zmienne Tk; bez GUI - w wątku obserwatora
+        self.ui_dispatch = ui_dispatch
+        self.on_preset_reload = on_preset_reload
+        self._reload_lock = threading.Lock()
 
         self.recent_match_indices = deque(maxlen=3)
         self.last_ocr_texts = deque(maxlen=5)
         self.last_matched_idx = -1
+        # Migawka ustawień dla gorących ścieżek (budowana w run(), patrz update_runtime)
+        self.runtime: Optional[RuntimeConfig] = None
+        # (linie napisów, dane dopasowania) - podmieniane w całości przy przeładowaniu
+        # PrecomputedData z SubtitleStore (oryginały dekodowane tylko do logu)
+        self.subtitle_db: Tuple[Any, Any, Any] = ([], {}, None)
+        self.file_watcher: Optional[FileWatcher] = None
+        self._text_path = ""
+        self._min_line_len = 0
+        self.audio_index: Optional[AudioIndex] = None
+        # Dobór tempa wg zaległości kolejki (None = stały audio_speed_inc)
+        self.tempo_scheduler: Optional[TempoScheduler] = None
         self.img_queue = None
-        self.last_monitor_crops: Dict[int, Image.Image] = {}
+        # Sygnatury kafelków ostatnio przetworzonych wycinków (zamiast pełnych kopii)
+        self.change_detector = TileChangeDetector()
 
         self.triggered_area_ids = set()
         self.enabled_continuous_areas = set()  # Dla stałych obszarów (poza 1)
@@ -114,9 +240,135 @@ class ReaderThread(threading.Thread):
         # config-managed values (access via ConfigManager when needed)
 
         self.ocr_binarize = True
+        # Cache LRU wyników OCR współdzielony przez workery (tworzony w run())
+        self.ocr_cache: Optional[OcrCache] = None
+
+        # Potok: preprocessing (ten wątek) -> OCR (OcrWorker x N) -> dopasowanie
+        self.capture_worker: Optional[CaptureWorker] = None
+        self.ocr_workers = []
+        self.ocr_queue: Optional[queue.Queue] = None
+        self.result_queue: Optional[queue.Queue] = None
+        self.dropped_frames = 0
+        self.dropped_ocr_jobs = 0
+        self.skipped_ocr_seqs = 0
 
         self.current_unified_area = {"left": 0, "top": 0, "width": 0, "height": 0}
 
+    def update_runtime(self, areas=None):
+        """
+        Buduje nową migawkę ustawień z ConfigManager i podmienia ją we wszystkich
+        wątkach potoku. Bez `areas` obszary zostają z bieżącej migawki (zmiana
+        geometrii wymaga restartu czytnika). Wywoływane z wątku UI po zmianie
+        ustawień i z obserwatora plików po edycji presetu.
+        """
+        if self.runtime is None:
+            return
+        runtime = RuntimeConfig.from_config(
+            self.config_manager, areas=self.runtime.areas if areas is None else areas
+        )
+        self.runtime = runtime
+        if self.capture_worker is not None:
+            self.capture_worker.runtime = runtime
+        for worker in self.ocr_workers:
+            worker.runtime = runtime
+
+    # --- Przeładowanie plików w trakcie czytania ---
+
+    def _log_info(self, msg: str):
+        print(msg)
+        if self.log_queue:
+            self.log_queue.put({"time": "INFO", "line_text": msg})
+
+    def _on_file_changed(self, path: str):
+        """Wywoływane z wątku FileWatcher po zakończonej zmianie pliku."""
+        if path == os.path.abspath(self._text_path):
+            self.reload_subtitles()
+        elif self.config_manager.preset_path and path == os.path.abspath(self.config_manager.preset_path):
+            if self.config_manager.is_own_write(path):
+                return  # zapis odroczony z tej aplikacji - ustawienia już w migawce
+            if self.ui_dispatch is not None:
+                self.ui_dispatch(self.reload_preset)
+            else:
+                self.reload_preset()
+
+    def reload_subtitles(self, full: bool = False):
+        """
+        Wczytuje plik napisów ponownie i aktualizuje dane dopasowania
+        przyrostowo (tylko zmienione linie). Przechwytywanie i OCR działają
+        dalej; wątek dopasowania bierze nowe dane przy kolejnym wyniku.
+        """
+        with self._reload_lock:
+            self._reload_subtitles(full)
+
+    def _reload_subtitles(self, full: bool):
+        t0 = time.perf_counter()
+        old_store = self.subtitle_db[0]
+        cache_dir = self.config_manager.subtitle_cache_dir
+        if full or not isinstance(old_store, SubtitleStore) or not len(old_store):
+            data = get_subtitle_db(self._text_path, self._min_line_len, cache_dir)
+            line_count = reprocessed = getattr(data[0], "line_count", 0)
+        else:
+            # Linie pliku tylko na czas diffu; stara wersja z oryginałów w magazynie
+            new_lines = self.config_manager.load_text_lines(self._text_path)
+            data, reprocessed = update_precomputed(
+                old_store.file_lines(), new_lines, self.subtitle_db, self._min_line_len
+            )
+            line_count = len(new_lines)
+            if reprocessed:
+                data = store_subtitle_db(self._text_path, self._min_line_len, cache_dir, data)
+        self.subtitle_db = data
+        self._log_info(
+            f"Napisy przeładowane: {line_count} linii, przetworzono {reprocessed} "
+            f"({(time.perf_counter() - t0) * 1000:.0f} ms)"
+        )
+
+    @staticmethod
+    def _area_layout(areas):
+        return [(a.id, a.type, dict(a.rect) if a.rect else None) for a in areas]
+
+    def reload_preset(self):
+        """
+        Wczytuje zmieniony lektor.json i przekazuje wątkom nową migawkę ustawień.
+        Parametry obszarów są podmieniane, jeśli ich położenie się nie zmieniło;
+        nowa geometria wymaga restartu (obszar przechwytywania jest stały).
+
+        Z GUI wywoływane w wątku UI (`ui_dispatch`): najpierw odświeżane są
+        zmienne Tk (`on_preset_reload`), dopiero potem podmieniana migawka
+        i - w tle - dane napisów, więc wątki potoku i GUI widzą ten sam preset.
+        """
+        path = self.config_manager.preset_path
+        if self.stop_event.is_set() or self.runtime is None:
+            return  # czytnik zatrzymany, zanim wątek UI obsłużył zmianę
+        if self.config_manager.is_own_write(path):
+            return  # zapis odroczony z tej aplikacji - ustawienia już w migawce
+        self.config_manager.reload_preset()
+        if self.on_preset_reload is not None:
+            try:
+                self.on_preset_reload()
+            except Exception as e:
+                print(f"Błąd odświeżania GUI po przeładowaniu presetu: {e}")
+
+        views = self.config_manager.get_area_views(self.target_resolution)
+        areas = None
+        if self._area_layout(views) == self._area_layout(self.runtime.areas):
+            areas = views
+        else:
+            self._log_info("Preset: zmiana położenia obszarów zostanie użyta po restarcie czytnika.")
+        self.update_runtime(areas=areas)
+        self._log_info("Preset przeładowany.")
+
+        text_path = self.config_manager.text_file_path
+        min_line_len = self.config_manager.min_line_length
+        if text_path != self._text_path or min_line_len != self._min_line_len:
+            self._text_path, self._min_line_len = text_path, min_line_len
+            if self.file_watcher is not None:
+                self.file_watcher.watch([path, text_path])
+            if self.ui_dispatch is not None:
+                # Pełne wczytanie napisów nie może blokować wątku UI
+                threading.Thread(target=self.reload_subtitles, kwargs={"full": True}, daemon=True).start()
+            else:
+                self.reload_subtitles(full=True)
+
     def trigger_area(self, area_id: Any):
         """Aktywuje jednorazowe pobranie i przetworzenie Obszaru o danym ID (manual/triggered)."""
         self.triggered_area_ids.add(area_id)
@@ -153,19 +405,6 @@ class ReaderThread(threading.Thread):
     # (Area-specific overrides handled explicitly during processing;
     # no helper methods for applying/restoring are used here.)
 
-    def _images_are_similar(
-        self, img1: Image.Image, img2: Image.Image, similarity: float
-    ) -> bool:
-        if similarity == 0:
-            return False
-        if img1 is None or img2 is None:
-            return False
-        if img1.size != img2.size:
-            return False
-        diff = ImageChops.difference(img1, img2)
-        stat = ImageStat.Stat(diff)
-        return sum(stat.mean) < similarity
-
     def run(self):
         if self.target_resolution:
             self.config_manager.display_resolution = self.target_resolution
@@ -175,22 +414,23 @@ class ReaderThread(threading.Thread):
             return
 
         # Ładowanie parametrów z ConfigManager (zawiera domyślne)
-        interval = self.config_manager.capture_interval
-        similarity = self.config_manager.similarity
         min_line_len = self.config_manager.min_line_length
 
         audio_speed = self.config_manager.audio_speed_inc
 
-        raw_subtitles = self.config_manager.load_text_lines()
-        precomputed_data = (
-            precompute_subtitles(raw_subtitles, min_line_len)
-            if raw_subtitles
-            else ([], {})
+        self._text_path = self.config_manager.text_file_path
+        self._min_line_len = min_line_len
+        # Strumieniowo z pliku albo zmapowane z cache - bez listy wszystkich linii
+        self.subtitle_db = get_subtitle_db(
+            self._text_path, min_line_len, self.config_manager.subtitle_cache_dir
         )
 
         # Get areas already scaled to the manager's display resolution
-        areas_config = copy.deepcopy(self.config_manager.get_areas() or [])
-        valid_areas = areas_config
+        # (widoki tylko do odczytu - migawka trzyma je na całą sesję)
+        self.runtime = RuntimeConfig.from_config(
+            self.config_manager, areas=self.config_manager.get_area_views(self.target_resolution)
+        )
+        valid_areas = self.runtime.areas
 
         if not valid_areas:
             if self.log_queue:
@@ -234,17 +474,36 @@ class ReaderThread(threading.Thread):
 
         queue_size = 4
         self.img_queue = queue.Queue(maxsize=queue_size)
-        audio_dir = self.config_manager.audio_dir
-        audio_ext = self.config_manager.audio_ext
+        # Mapa linia -> plik audio (zamiast os.path.exists przy każdym dopasowaniu)
+        self.audio_index = self.config_manager.load_audio_index()
+        self.audio_queue.max_age = self.config_manager.audio_max_age
+        if self.player_thread:
+            self.player_thread.audio_index = self.audio_index
+            if self.config_manager.audio_normalize:
+                self.player_thread.target_lufs = self.config_manager.audio_target_lufs
+        if self.player_thread and self.config_manager.tempo_cache_dir:
+            self.player_thread.tempo_cache = TempoCache(
+                self.config_manager.tempo_cache_dir, self.audio_index,
+                render_missing=self.config_manager.audio_tempo_cache,
+                max_bytes=self.config_manager.audio_tempo_cache_mb * 1024 * 1024,
+            )
+        if self.config_manager.audio_latency_budget > 0:
+            base_speed = (self.player_thread.base_speed_callback if self.player_thread
+                          and self.player_thread.base_speed_callback else lambda: self.config_manager.audio_speed)
+            self.tempo_scheduler = TempoScheduler(
+                self.config_manager.audio_latency_budget,
+                self.config_manager.audio_speed_multipliers(),
+                base_speed,
+            )
 
-        capture_worker = CaptureWorker(
+        self.capture_worker = CaptureWorker(
             self.stop_event,
             self.img_queue,
             unified_area,
-            self.config_manager,
+            self.runtime,
             log_queue=self.log_queue,
         )
-        capture_worker.start()
+        self.capture_worker.start()
 
         if self.log_queue:
             self.log_queue.put(
@@ -254,7 +513,7 @@ class ReaderThread(threading.Thread):
                 }
             )
 
-        if self.config_manager.save_logs:
+        if self.runtime.save_logs:
             if self.log_queue:
                 self.log_queue.put(
                     {"time": "INFO", "line_text": f"Saving logs to session_log.txt"}
@@ -265,20 +524,67 @@ class ReaderThread(threading.Thread):
                     "Time | Monitor | Capture(ms) | Pre(ms) | OCR(ms) | Match(ms) | Text | MatchResult\n"
                 )
 
+        ocr_workers = max(1, int(self.config_manager.ocr_workers))
+        self.ocr_cache = OcrCache(self.config_manager.ocr_cache_size)
+        self.ocr_queue = queue.Queue(maxsize=ocr_workers * 2)
+        self.result_queue = queue.Queue(maxsize=ocr_workers * 4)
+        workers = [
+            OcrWorker(i + 1, self.stop_event, self.ocr_queue, self.result_queue,
+                      self.runtime, self.ocr_cache, log_queue=self.log_queue)
+            for i in range(ocr_workers)
+        ]
+        self.ocr_workers = workers
+        for worker in workers:
+            worker.start()
+
+        match_thread = threading.Thread(
+            target=self._match_loop,
+            args=(audio_speed,),
+            daemon=True,
+        )
+        match_thread.start()
+
+        if self.config_manager.hot_reload and self.config_manager.preset_path:
+            self.file_watcher = FileWatcher(
+                [self.config_manager.preset_path, self._text_path],
+                self._on_file_changed,
+                self.stop_event,
+            )
+            self.file_watcher.start()
+            self._log_info(f"Obserwacja zmian presetu i napisów ({self.file_watcher.backend}).")
+
+        self._dispatch_loop(min_l, min_t)
+
+        for worker in workers:
+            worker.join()
+        match_thread.join()
+        self.capture_worker.join()
+        if self.file_watcher is not None:
+            self.file_watcher.join(2.0)
+
+    def _dispatch_loop(self, min_l, min_t):
+        """
+        Etap 1 potoku: wycinanie obszarów, wykrywanie zmian i preprocessing.
+        Zadania OCR trafiają do ograniczonej kolejki; gdy jest pełna, najnowsze
+        zadanie jest porzucane, a stan detektora zmian obszaru czyszczony -
+        kolejna klatka zostanie więc przetworzona ponownie.
+        """
+        next_seq: Dict[int, int] = {}
         while not self.stop_event.is_set():
             try:
-                full_img, t_cap = self.img_queue.get(timeout=2.0)
+                full_img, t_cap, captured_at = self.img_queue.get(timeout=2.0)
             except queue.Empty:
                 continue
 
             if self.img_queue.qsize() > 0:
                 try:
-                    self.img_queue.get_nowait()
+                    full_img, t_cap, captured_at = self.img_queue.get_nowait()
+                    self.dropped_frames += 1
                 except queue.Empty:
                     pass
 
-            for idx, area_obj in enumerate(valid_areas):
-                t_start_proc = time.perf_counter()
+            runtime = self.runtime  # jedna migawka na klatkę
+            for idx, area_obj in enumerate(runtime.areas):
                 area_id = area_obj.id
                 area_rect = area_obj.rect
                 area_type = area_obj.type
@@ -287,7 +593,7 @@ class ReaderThread(threading.Thread):
                     if area_id not in self.triggered_area_ids:
                         continue
                     self.triggered_area_ids.remove(area_id)
-                    self.last_monitor_crops.pop(idx, None)
+                    self.change_detector.reset(idx)
                 elif area_type == "continuous":
                     # First slot (Area 0 or 1 depending on slot naming) is always active.
                     if (
@@ -306,17 +612,17 @@ class ReaderThread(threading.Thread):
                     )
                 )
 
-                last_crop = self.last_monitor_crops.get(idx)
-                if self._images_are_similar(crop, last_crop, similarity):
+                changed_tiles = self.change_detector.changed_tiles(
+                    idx, crop, runtime.similarity, runtime.tile_similarity
+                )
+                if not changed_tiles.any():
                     continue
 
-                self.last_monitor_crops[idx] = crop.copy()
-
                 t_pre_start = time.perf_counter()
 
                 # Use explicit area object for preprocessing (no mutation of global config)
                 processed, has_content, crop_bbox = preprocess_image(
-                    crop, self.config_manager, area_config=area_obj
+                    crop, runtime, area_config=area_obj
                 )
 
                 if not has_content:
@@ -324,115 +630,203 @@ class ReaderThread(threading.Thread):
 
                 t_pre = (time.perf_counter() - t_pre_start) * 1000
 
-                t_ocr_start = time.perf_counter()
-                text = recognize_text(processed, self.config_manager)
-
-                t_ocr = (time.perf_counter() - t_ocr_start) * 1000
-
-                # Matching: log debug info, then use global ConfigManager and area-specific subtitle mode
-                current_subtitle_mode = area_obj.subtitle_mode
+                seq = next_seq.get(idx, 0)
+                job = OcrJob(idx, seq, processed, crop_bbox, changed_tiles, t_cap, t_pre, captured_at)
                 try:
-                    pre_lines_count = (
-                        len(precomputed_data[0])
-                        if precomputed_data and isinstance(precomputed_data, tuple)
-                        else 0
-                    )
-                except Exception:
-                    pre_lines_count = 0
-
-                dbg_msg = (
-                    f"MATCH DEBUG: text='{text}' | pre_lines={pre_lines_count} | "
-                    f"mode={current_subtitle_mode} | partial_min_len={self.config_manager.partial_mode_min_len} | "
-                    f"match_score_short={self.config_manager.match_score_short} | match_score_long={self.config_manager.match_score_long} | "
-                    f"match_len_diff_ratio={self.config_manager.match_len_diff_ratio}"
-                )
-                if self.log_queue:
-                    self.log_queue.put(
-                        {
-                            "time": datetime.now().strftime("%H:%M:%S.%f")[:-3],
-                            "line_text": dbg_msg,
-                        }
-                    )
-
-                t_match_start = time.perf_counter()
-                match = find_best_match(
-                    text,
-                    precomputed_data,
-                    current_subtitle_mode,
-                    last_index=self.last_matched_idx,
-                    matcher_config=self.config_manager,
-                )
-                t_match = (time.perf_counter() - t_match_start) * 1000
-
-                if not text:
+                    self.ocr_queue.put_nowait(job)
+                except queue.Full:
+                    self.dropped_ocr_jobs += 1
+                    self.change_detector.reset(idx)
                     continue
+                next_seq[idx] = seq + 1
 
-                if len(text) < 2 or text in self.last_ocr_texts:
+    def _match_loop(self, audio_speed):
+        """
+        Etap 3 potoku: dopasowanie, logi i kolejka audio (jeden wątek).
+        Wyniki OCR mogą wracać z workerów w dowolnej kolejności - dla każdego
+        obszaru są wstrzymywane do czasu nadejścia poprzednich numerów `seq`.
+        Brakujący numer, na który czekamy dłużej niż OCR_REORDER_TIMEOUT, jest
+        pomijany, żeby zgubiony wynik nie zatrzymał obszaru na stałe.
+        """
+        pending: Dict[int, Dict[int, OcrResult]] = {}
+        next_seq: Dict[int, int] = {}
+        stalled_since: Dict[int, float] = {}
+        while not self.stop_event.is_set():
+            try:
+                result = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                result = None
+            if result is not None:
+                if result.failed:
+                    # Klatka nie została odczytana - następna ma przejść przez OCR
+                    self.change_detector.reset(result.area_idx)
+                pending.setdefault(result.area_idx, {})[result.seq] = result
+
+            now = time.monotonic()
+            for area_idx, waiting in pending.items():
+                if not waiting:
                     continue
+                expected = next_seq.get(area_idx, 0)
+                if expected not in waiting:
+                    if now - stalled_since.setdefault(area_idx, now) < OCR_REORDER_TIMEOUT:
+                        continue
+                    first = min(waiting)
+                    self.skipped_ocr_seqs += first - expected
+                    expected = first
+                while expected in waiting:
+                    self._handle_ocr_result(waiting.pop(expected), audio_speed)
+                    expected += 1
+                next_seq[area_idx] = expected
+                stalled_since.pop(area_idx, None)
+
+    def _handle_ocr_result(self, result, audio_speed):
+        runtime = self.runtime  # jedna migawka na wynik
+        precomputed_data = self.subtitle_db
+        area_obj = runtime.areas[result.area_idx]
+        area_id = area_obj.id
+        area_rect = area_obj.rect
+        text = result.text
+        crop_bbox = result.crop_bbox
+        changed_tiles = result.changed_tiles
+        t_cap, t_pre, t_ocr = result.t_cap, result.t_pre, result.t_ocr
+
+        # Matching: log debug info, then use the runtime snapshot and area-specific subtitle mode
+        current_subtitle_mode = area_obj.subtitle_mode
+        try:
+            pre_lines_count = (
+                len(precomputed_data[0])
+                if precomputed_data and isinstance(precomputed_data, tuple)
+                else 0
+            )
+        except Exception:
+            pre_lines_count = 0
+
+        dbg_msg = (
+            f"MATCH DEBUG: text='{text}' | pre_lines={pre_lines_count} | "
+            f"mode={current_subtitle_mode} | partial_min_len={runtime.partial_mode_min_len} | "
+            f"match_score_short={runtime.match_score_short} | match_score_long={runtime.match_score_long} | "
+            f"match_len_diff_ratio={runtime.match_len_diff_ratio}"
+        )
+        if self.log_queue:
+            self.log_queue.put(
+                {
+                    "time": datetime.now().strftime("%H:%M:%S.%f")[:-3],
+                    "line_text": dbg_msg,
+                }
+            )
+
+        t_match_start = time.perf_counter()
+        match = find_best_match(
+            text,
+            precomputed_data,
+            current_subtitle_mode,
+            last_index=self.last_matched_idx,
+            matcher_config=runtime,
+        )
+        t_match = (time.perf_counter() - t_match_start) * 1000
 
-                if has_content and crop_bbox and self.debug_queue:
-                    abs_x = area_rect["left"] + crop_bbox[0]
-                    abs_y = area_rect["top"] + crop_bbox[1]
+        if not text:
+            return
 
-                    abs_w = crop_bbox[2] - crop_bbox[0]
-                    abs_h = crop_bbox[3] - crop_bbox[1]
-                    self.debug_queue.put(("overlay", (abs_x, abs_y, abs_w, abs_h)))
+        if len(text) < 2 or text in self.last_ocr_texts:
+            return
 
-                self.last_ocr_texts.append(text)
+        if crop_bbox and self.debug_queue:
+            abs_x = area_rect["left"] + crop_bbox[0]
+            abs_y = area_rect["top"] + crop_bbox[1]
 
-                # `match` and `t_match` already computed while overrides were active
+            abs_w = crop_bbox[2] - crop_bbox[0]
+            abs_h = crop_bbox[3] - crop_bbox[1]
+            self.debug_queue.put(("overlay", (abs_x, abs_y, abs_w, abs_h)))
 
-                if self.log_queue:
-                    line_txt = raw_subtitles[match[0]] if match else ""
-                    log_entry = {
-                        "time": datetime.now().strftime("%H:%M:%S.%f")[:-3],
-                        "ocr": text,
-                        "match": match,
-                        "line_text": line_txt,
-                        "stats": {
-                            "monitor": f"#{area_id}",
-                            "cap_ms": t_cap,
-                            "pre_ms": t_pre,
-                            "ocr_ms": t_ocr,
-                            "match_ms": t_match,
-                        },
-                    }
-                    self.log_queue.put(log_entry)
-                    if self.config_manager.save_logs:
-                        with open("session_log.txt", "a", encoding="utf-8") as f:
-                            match_str = (
-                                f"MATCH({match[1]}%): {line_txt}"
-                                if match
-                                else "NO MATCH"
-                            )
-                            log_line = (
-                                f"{log_entry['time']} | A{area_id} | "
-                                f"Cap:{t_cap:.0f}ms | Pre:{t_pre:.0f}ms | OCR:{t_ocr:.0f}ms | Match:{t_match:.0f}ms | "
-                                f"'{text}' | {match_str}\n"
-                            )
-                            f.write(log_line)
-
-                if match:
-                    idx_match, score = match
-                    self.last_matched_idx = idx_match
-                    if idx_match not in self.recent_match_indices:
-                        pass  # Match log removed
-                        self.recent_match_indices.append(idx_match)
-
-                        audio_path = os.path.join(
-                            audio_dir, f"output1 ({idx_match + 1}){audio_ext}"
-                        )
-                        if not os.path.exists(audio_path):
-                            print(f"Audio file not found: {audio_path}")
-
-                        q_size = self.audio_queue.qsize()
-                        speed_multiplier = 1.0
-
-                        if q_size > 0 or (
-                            self.player_thread and self.player_thread.is_playing()
-                        ):
-                            speed_multiplier = audio_speed
-
-                        self.audio_queue.put((audio_path, speed_multiplier))
-
-        capture_worker.join()
+        self.last_ocr_texts.append(text)
+
+        # `match` and `t_match` already computed while overrides were active
+
+        if self.log_queue:
+            line_txt = precomputed_data[0].original_for_line(match[0]) if match else ""
+            log_entry = {
+                "time": datetime.now().strftime("%H:%M:%S.%f")[:-3],
+                "ocr": text,
+                "match": match,
+                "line_text": line_txt,
+                "stats": {
+                    "monitor": f"#{area_id}",
+                    "cap_ms": t_cap,
+                    "pre_ms": t_pre,
+                    "ocr_ms": t_ocr,
+                    "match_ms": t_match,
+                    "tiles": f"{int(changed_tiles.sum())}/{changed_tiles.size}",
+                    "skip_ratio": self.change_detector.skip_ratio,
+                    "ocr_cache_hits": self.ocr_cache.hits,
+                    "ocr_cache_misses": self.ocr_cache.misses,
+                    "frame_queue": self.img_queue.qsize(),
+                    "ocr_queue": self.ocr_queue.qsize(),
+                    "result_queue": self.result_queue.qsize(),
+                    "dropped_frames": self.dropped_frames + self.capture_worker.dropped_frames,
+                    "dropped_ocr_jobs": self.dropped_ocr_jobs,
+                    "skipped_ocr_seqs": self.skipped_ocr_seqs,
+                },
+            }
+            self.log_queue.put(log_entry)
+            if runtime.save_logs:
+                with open("session_log.txt", "a", encoding="utf-8") as f:
+                    match_str = (
+                        f"MATCH({match[1]}%): {line_txt}"
+                        if match
+                        else "NO MATCH"
+                    )
+                    log_line = (
+                        f"{log_entry['time']} | A{area_id} | "
+                        f"Cap:{t_cap:.0f}ms | Pre:{t_pre:.0f}ms | OCR:{t_ocr:.0f}ms | Match:{t_match:.0f}ms | "
+                        f"'{text}' | {match_str}\n"
+                    )
+                    f.write(log_line)
+
+        if match:
+            idx_match, score = match
+            self.last_matched_idx = idx_match
+            if idx_match not in self.recent_match_indices:
+                pass  # Match log removed
+                self.recent_match_indices.append(idx_match)
+
+                audio_path = self.audio_index.path_for(idx_match)
+                if audio_path is None:
+                    print(f"Audio file not found for line {idx_match + 1} in {self.audio_index.audio_dir}")
+                    return
+
+                q_size = self.audio_queue.qsize()
+                speed_multiplier = 1.0
+                busy = q_size > 0 or (
+                    self.player_thread and self.player_thread.is_playing()
+                )
+                is_main = self._is_main_area(area_id, result.area_idx)
+                if busy and is_main and runtime.audio_preempt:
+                    # Nowa linia z obszaru głównego: stary dialog nie jest już aktualny
+                    self.audio_queue.preempt()
+                    if self.player_thread:
+                        self.player_thread.preempt(runtime.audio_fade_ms)
+                    busy = False
+
+                predicted_wait = None
+                if self.tempo_scheduler is not None:
+                    speed_multiplier, predicted_wait = self.tempo_scheduler.plan(
+                        self.audio_index.duration_for(idx_match), busy
+                    )
+                elif busy:
+                    speed_multiplier = audio_speed
+
+                self.audio_queue.put(PlaybackItem(
+                    audio_path, speed_multiplier, time.perf_counter(), predicted_wait,
+                    captured_at=result.captured_at, area_id=area_id,
+                    priority=PRIORITY_MAIN if is_main else PRIORITY_OTHER, line_idx=idx_match,
+                ))
+                self._prefetch_following(idx_match)
+
+    def _prefetch_following(self, idx_match):
+        """Zleca dekodowanie plików kolejnych linii (dialog zwykle idzie do przodu)."""
+        count = self.runtime.audio_prefetch_count
+        if count <= 0 or not self.player_thread:
+            return
+        paths = (self.audio_index.path_for(idx) for idx in range(idx_match + 1, idx_match + 1 + count))
+        self.player_thread.prefetch([p for p in paths if p])
@@ -0,0 +1,80 @@
+"""
+Niezmienna migawka parametrów czytnika używanych w gorących ścieżkach.
+
+Każdy odczyt właściwości `ConfigManager` przechodzi przez `_get_preset_obj()`,
+a `find_best_match` bez konfiguracji tworzył nowy `ConfigManager()` (odczyt
+`app_config.json` z dysku). Wątki potoku czytają teraz wyłącznie z
+`RuntimeConfig`: obiekt budowany raz przy starcie czytnika i podmieniany
+w całości (jedno przypisanie atrybutu), gdy użytkownik zmieni ustawienia.
+"""
+from typing import Any, Optional, Sequence
+
+# Pola kopiowane 1:1 z ConfigManager / PresetConfig (odczyt przez getattr,
+# więc źródłem może być też OptimizerConfigManager albo sam PresetConfig)
+_FIELDS = (
+    # przechwytywanie i preprocessing
+    "capture_interval",
+    "similarity",
+    "tile_similarity",
+    "show_debug",
+    # dopasowanie
+    "auto_remove_names",
+    "partial_mode_min_len",
+    "match_score_short",
+    "match_score_long",
+    "match_len_diff_ratio",
+    "matcher_use_index",
+    "matcher_index_top_n",
+    # obsługa dopasowania i audio
+    "save_logs",
+    "audio_preempt",
+    "audio_fade_ms",
+    "audio_prefetch_count",
+)
+
+
+class RuntimeConfig:
+    """
+    Migawka ustawień (tylko do odczytu). `areas` to krotka obszarów już
+    przeskalowanych do rozdzielczości czytnika - geometria obszarów jest
+    stała w sesji (zmiana obszaru restartuje czytnik).
+    """
+
+    __slots__ = _FIELDS + ("areas",)
+
+    def __init__(self, areas: Sequence[Any] = (), **values: Any):
+        missing = [name for name in _FIELDS if name not in values]
+        if missing:
+            raise TypeError(f"RuntimeConfig: brak pól {missing}")
+        for name in _FIELDS:
+            object.__setattr__(self, name, values[name])
+        object.__setattr__(self, "areas", tuple(areas))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RuntimeConfig jest niezmienny - zbuduj nową migawkę")
+
+    def __delattr__(self, name):
+        raise AttributeError("RuntimeConfig jest niezmienny - zbuduj nową migawkę")
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in _FIELDS)
+        return f"RuntimeConfig({values}, areas={len(self.areas)})"
+
+    @classmethod
+    def from_config(cls, source: Any, areas: Optional[Sequence[Any]] = None) -> "RuntimeConfig":
+        """Buduje migawkę z obiektu o właściwościach ConfigManager (jeden odczyt na pole)."""
+        values = {name: getattr(source, name) for name in _FIELDS}
+        return cls(areas=areas or (), **values)
+
+
+_DEFAULT: Optional[RuntimeConfig] = None
+
+
+def default_runtime_config() -> RuntimeConfig:
+    """Migawka z domyślnych wartości PresetConfig (bez odczytu plików)."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        from app.config_manager import PresetConfig
+
+        _DEFAULT = RuntimeConfig.from_config(PresetConfig())
+    return _DEFAULT
@@ -127,7 +127,7 @@ class SettingsDialog(CTkToplevel):
                          "similarity", fmt="{:.0f}%", resolution=1)
 
         make_checkbutton(grp_ocr, text="DEBUG: Pokaż obszar wykrytych napisów", variable=self.app.var_show_debug,
-                        command=lambda: setattr(self.app.config_mgr, "show_debug", self.app.var_show_debug.get())).pack(
+                        command=lambda: self._set_config("show_debug", self.app.var_show_debug.get())).pack(
             anchor=tk.W, pady=2)
 
         # 3. Optymalizacja
@@ -171,11 +171,11 @@ class SettingsDialog(CTkToplevel):
 
         ent_regex.bind("<FocusOut>", _save_last_custom_regex)
         make_checkbutton(grp_flt, text="Usuwaj imiona (Smart)", variable=self.app.var_auto_names,
-                        command=lambda: setattr(self.app.config_mgr, "auto_remove_names",
+                        command=lambda: self._set_config("auto_remove_names",
                                                self.app.var_auto_names.get())).pack(anchor=tk.W,
                                                                                     pady=2)
         make_checkbutton(grp_flt, text="Zapisuj logi do pliku", variable=self.app.var_save_logs,
-                        command=lambda: setattr(self.app.config_mgr, "save_logs",
+                        command=lambda: self._set_config("save_logs",
                                                self.app.var_save_logs.get())).pack(
             anchor=tk.W, pady=2)
 
@@ -207,11 +207,11 @@ class SettingsDialog(CTkToplevel):
         self.app.ent_regex = ent_regex
 
         make_checkbutton(grp_flt, text="Usuwaj imiona (Smart)", variable=self.app.var_auto_names,
-                        command=lambda: setattr(self.app.config_mgr, "auto_remove_names",
+                        command=lambda: self._set_config("auto_remove_names",
                                                self.app.var_auto_names.get())).pack(anchor=tk.W,
                                                                                     pady=2)
         make_checkbutton(grp_flt, text="Zapisuj logi do pliku", variable=self.app.var_save_logs,
-                        command=lambda: setattr(self.app.config_mgr, "save_logs",
+                        command=lambda: self._set_config("save_logs",
                                                self.app.var_save_logs.get())).pack(
             anchor=tk.W, pady=2)
 
@@ -262,6 +262,11 @@ class SettingsDialog(CTkToplevel):
         setup_hotkey_row(lf_hk, "Przełącz (Start / Stop):", self.var_hk_start)
 
 
+    def _set_config(self, key, value):
+        """Zapisuje ustawienie i przekazuje nową migawkę działającemu czytnikowi."""
+        setattr(self.app.config_mgr, key, value)
+        self.app.refresh_runtime_config()
+
     def _add_slider(self, parent, label, variable, from_, to, config_key, fmt="{:.2f}", resolution=None):
         f = make_frame(parent)
         f.pack(fill=tk.X, pady=5)
@@ -288,7 +293,7 @@ class SettingsDialog(CTkToplevel):
 
             variable.set(val)
             val_lbl.configure(text=fmt.format(val))
-            setattr(self.app.config_mgr, config_key, val)
+            self._set_config(config_key, val)
 
         scale.bind("<ButtonRelease-1>", on_release)
 
@@ -0,0 +1,116 @@
+"""
+Profil czasu startu aplikacji (import `lektor`).
+
+Import jest mierzony w osobnym, świeżym procesie (`python -X importtime`),
+więc wynik odpowiada zimnemu startowi niezależnie od tego, co zdążył już
+załadować proces wywołujący. Wypisywany jest rozkład czasu na moduły
+importowane bezpośrednio przez `lektor` oraz lista modułów, które powinny
+ładować się dopiero przy pierwszym użyciu (START, kreator, pierwszy OCR).
+
+Kod wyjścia (do użycia w CI / skryptach):
+    0 - start w budżecie, 1 - przekroczony budżet lub moduł leniwy
+    załadowany przy starcie, 2 - pomiar niemożliwy (błąd importu).
+
+Użycie:
+    python lektor.py --profile-startup [--startup-budget 600]
+    python -m app.benchmark startup [--budget 600] [--top 15]
+"""
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+from app.path_utils import get_base_dir
+
+# Budżet importu `lektor` (cumulative z -X importtime) w milisekundach
+STARTUP_BUDGET_MS = 600
+
+# Moduły, które nie mogą być ładowane przy starcie aplikacji
+LAZY_MODULES = (
+    "app.reader",
+    "app.player",
+    "app.ocr",
+    "app.optimizer",
+    "app.area_manager",
+    "app.optimization_wizard",
+    "pytesseract",
+    "pipewire_capture",
+    "multiprocessing.pool",
+    "numpy",
+)
+
+
+class ImportTiming(NamedTuple):
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Parsuje wyjście `-X importtime` (kolejność jak w wyjściu: dzieci przed rodzicem)."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # nagłówek tabeli
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        timings.append(ImportTiming(name.strip(), depth, int(parts[0]), int(parts[1])))
+    return timings
+
+
+def measure_startup(module: str = "lektor") -> Optional[List[ImportTiming]]:
+    """Import `module` w świeżym interpreterze; None, gdy import się nie powiódł."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=get_base_dir(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(f"Import {module} nie powiódł się:\n{result.stderr.splitlines()[-1] if result.stderr else ''}")
+        return None
+    return parse_importtime(result.stderr)
+
+
+def profile_startup(budget_ms: float = STARTUP_BUDGET_MS, top: int = 15, module: str = "lektor") -> int:
+    """Wypisuje rozkład czasu importu i zwraca kod wyjścia (patrz opis modułu)."""
+    if getattr(sys, "frozen", False):
+        print("Profil startu wymaga uruchomienia ze źródeł (python lektor.py).")
+        return 2
+    timings = measure_startup(module)
+    if not timings:
+        return 2
+
+    root = next((t for t in reversed(timings) if t.name == module and t.depth == 0), None)
+    if root is None:
+        print(f"Brak modułu {module} w wyniku -X importtime.")
+        return 2
+    total_ms = root.cumulative_us / 1000
+
+    # Bezpośrednie importy modułu głównego: głębokość 1 przed jego wierszem
+    end = timings.index(root)
+    start = end
+    while start > 0 and timings[start - 1].depth > 0:
+        start -= 1
+    direct = sorted((t for t in timings[start:end] if t.depth == 1),
+                    key=lambda t: t.cumulative_us, reverse=True)
+
+    print(f"Import {module}: {total_ms:.0f} ms (własny {root.self_us / 1000:.0f} ms), budżet {budget_ms:.0f} ms")
+    print(f"{'moduł':32s} {'łącznie':>10s} {'własny':>10s}")
+    for t in direct[:top]:
+        print(f"{t.name:32s} {t.cumulative_us / 1000:8.1f} ms {t.self_us / 1000:8.1f} ms")
+
+    loaded: Dict[str, ImportTiming] = {t.name: t for t in timings}
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    if eager:
+        print("Moduły ładowane przy starcie mimo leniwego importu: " + ", ".join(eager))
+
+    over = total_ms > budget_ms
+    if over:
+        print(f"PRZEKROCZONY budżet startu o {total_ms - budget_ms:.0f} ms")
+    return 1 if over or eager else 0
+
+
+if __name__ == "__main__":
+    sys.exit(profile_startup())
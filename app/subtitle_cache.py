@@ -0,0 +1,262 @@
+"""
+Trwały cache przetworzonej bazy napisów (wynik `precompute_subtitles`).
+
+Plik cache leży w katalogu `.lektor_cache` obok presetu (lektor.json,
+patrz `ConfigManager.subtitle_cache_dir`).
+Klucz to skrót treści napisów + `min_line_length` + wersja normalizacji
+tekstu, więc zmiana pliku lub `clean_text` unieważnia cache automatycznie.
+
+Układ pliku:
+    MAGIC (8 B) | długość nagłówka (8 B, LE) | nagłówek (JSON) | tablice
+Nagłówek (JSON, bez wykonywalnej treści) to liczba linii pliku i opis
+tablic (nazwa, typ liczbowy, kształt, offset) - sprawdzany przy wczytaniu. Tablice (indeks trigramów,
+bufory UTF-8 oryginałów i linii oczyszczonych z offsetami, sumy CRC32 mapy
+dokładnych trafień) leżą pod wyrównanymi offsetami i są ładowane przez
+`np.memmap`, bez kopiowania - baza po wczytaniu to `SubtitleStore`
+zmapowany z pliku. Pliki są podmieniane przez os.replace, więc otwarta
+mapa starej wersji pozostaje ważna.
+"""
+import hashlib
+import os
+import json
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+from app.matcher import (NgramIndex, PrecomputedData, compact_precomputed, precompute_subtitle_file,
+                         precompute_subtitles)
+from app.subtitle_store import ExactIndex, SubtitleStore
+from app.text_processing import NORMALIZER_VERSION
+
+CACHE_FORMAT_VERSION = 2
+MAX_CACHE_FILES = 8
+
+_MAGIC = b"LKSUBDB\x01"
+_ALIGN = 64
+_INDEX_FIELDS = ("alphabet", "gram_ids", "offsets", "postings", "lengths", "line_indices")
+_STORE_FIELDS = ("originals", "original_offsets", "cleaned", "cleaned_offsets")
+_EXACT_FIELDS = ("hashes", "order")
+_ARRAY_NAMES = frozenset(_INDEX_FIELDS + _STORE_FIELDS + tuple(f"exact_{n}" for n in _EXACT_FIELDS))
+
+
+def cache_key(raw_lines: List[str], min_length: int) -> str:
+    """Skrót treści napisów i parametrów wpływających na wynik przetwarzania."""
+    h = hashlib.sha1()
+    h.update(f"{CACHE_FORMAT_VERSION}:{NORMALIZER_VERSION}:{min_length}:{len(raw_lines)}\n".encode("utf-8"))
+    h.update("\n".join(raw_lines).encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def file_cache_key(path: str, min_length: int) -> str:
+    """Skrót pliku napisów (surowe bajty, czytane blokami) i parametrów przetwarzania."""
+    h = hashlib.sha1()
+    h.update(f"{CACHE_FORMAT_VERSION}:{NORMALIZER_VERSION}:{min_length}:file\n".encode("utf-8"))
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"subtitles-{key}.bin")
+
+
+def _aligned(pos: int) -> int:
+    return (pos + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _as_array(buf) -> np.ndarray:
+    if isinstance(buf, np.ndarray):
+        return buf
+    return np.frombuffer(buf, dtype=np.uint8)
+
+
+def save_precomputed(path: str, data: PrecomputedData, line_count: Optional[int] = None):
+    """
+    Zapisuje bazę atomowo (plik tymczasowy + os.replace). Wpisy w postaci
+    listy są najpierw przenoszone do SubtitleStore (`line_count` - liczba
+    linii pliku; domyślnie ostatni numer linii + 1).
+    """
+    entries = data[0]
+    if not isinstance(entries, SubtitleStore) or not isinstance(data[1], ExactIndex):
+        if line_count is None:
+            line_count = entries[-1][2] + 1 if len(entries) else 0
+        data = compact_precomputed(data, line_count)
+    store, exact, index = data
+
+    arrays = [(name, np.ascontiguousarray(getattr(index, name))) for name in _INDEX_FIELDS]
+    arrays += [(name, np.ascontiguousarray(_as_array(getattr(store, name)))) for name in _STORE_FIELDS]
+    arrays += [(f"exact_{name}", np.ascontiguousarray(getattr(exact, name))) for name in _EXACT_FIELDS]
+    header = {"line_count": store.line_count, "arrays": []}
+    # Offsety tablic zależą od długości nagłówka - liczymy je względem początku danych
+    pos = 0
+    for name, arr in arrays:
+        pos = _aligned(pos)
+        header["arrays"].append([name, arr.dtype.str, list(arr.shape), pos])
+        pos += arr.nbytes
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("ascii")
+    data_start = _aligned(len(_MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<Q", len(header_bytes)))
+            f.write(header_bytes)
+            for (name, arr), (_, _, _, offset) in zip(arrays, header["arrays"]):
+                f.seek(data_start + offset)
+                f.write(arr.tobytes())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _parse_header(raw: bytes, data_size: int):
+    """
+    Sprawdza nagłówek JSON: znane nazwy tablic, wyłącznie typy liczbowe,
+    kształty i offsety mieszczące się w pliku. Zwraca (liczba_linii, tablice)
+    albo None dla nagłówka niepoprawnego.
+    """
+    try:
+        header = json.loads(raw.decode("ascii"))
+        line_count = header["line_count"]
+        specs = []
+        for name, dtype, shape, offset in header["arrays"]:
+            dtype = np.dtype(dtype)
+            shape = tuple(shape)
+            if (name not in _ARRAY_NAMES or dtype.kind not in "iuf"
+                    or not all(isinstance(d, int) and d >= 0 for d in shape)
+                    or not isinstance(offset, int) or offset < 0
+                    or offset + int(np.prod(shape)) * dtype.itemsize > data_size):
+                return None
+            specs.append((name, dtype, shape, offset))
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+        return None
+    if not isinstance(line_count, int) or {s[0] for s in specs} != _ARRAY_NAMES:
+        return None
+    return line_count, specs
+
+
+def load_precomputed(path: str) -> Optional[PrecomputedData]:
+    """Wczytuje bazę z pliku cache; wszystkie tablice są mapowane z pamięci."""
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            return None  # inny lub starszy format
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        raw_header = f.read(header_len)
+    data_start = _aligned(len(_MAGIC) + 8 + header_len)
+    parsed = _parse_header(raw_header, os.path.getsize(path) - data_start)
+    if parsed is None:
+        return None
+    line_count, specs = parsed
+
+    arrays = {}
+    for name, dtype, shape, offset in specs:
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + offset, shape=shape)
+    index = NgramIndex(**{name: arrays[name] for name in _INDEX_FIELDS})
+    store = SubtitleStore(*(arrays[name] for name in _STORE_FIELDS),
+                          lengths=index.lengths, line_indices=index.line_indices,
+                          line_count=line_count)
+    exact = ExactIndex(store, *(arrays[f"exact_{name}"] for name in _EXACT_FIELDS))
+    return store, exact, index
+
+
+def _prune(cache_dir: str, keep: str):
+    """Usuwa najstarsze pliki cache ponad limit MAX_CACHE_FILES."""
+    try:
+        files = [os.path.join(cache_dir, n) for n in os.listdir(cache_dir)
+                 if n.startswith("subtitles-") and n.endswith(".bin")]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for stale in files[MAX_CACHE_FILES:]:
+            if stale != keep:
+                os.remove(stale)
+    except OSError:
+        pass
+
+
+def _save_and_map(path: str, data: PrecomputedData, line_count: int) -> PrecomputedData:
+    """Zapisuje bazę do cache i zwraca ją zmapowaną z pliku (przy błędzie - `data`)."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save_precomputed(path, data, line_count)
+        _prune(os.path.dirname(path), path)
+        return load_precomputed(path) or data
+    except Exception as e:
+        print(f"Nie udało się zapisać cache napisów: {e}")
+        return data
+
+
+def _load_cached(path: str) -> Optional[PrecomputedData]:
+    if not os.path.exists(path):
+        return None
+    try:
+        return load_precomputed(path)
+    except Exception as e:
+        print(f"Uszkodzony cache napisów ({path}): {e}")
+        return None
+
+
+def store_precomputed(raw_lines: List[str], min_length: int, cache_dir: Optional[str],
+                      data: PrecomputedData):
+    """Zapisuje gotowy wynik (np. z `update_precomputed`) pod kluczem treści `raw_lines`."""
+    if cache_dir:
+        _save_and_map(_cache_path(cache_dir, cache_key(raw_lines, min_length)), data, len(raw_lines))
+
+
+def get_precomputed(raw_lines: List[str], min_length: int = 0,
+                    cache_dir: Optional[str] = None) -> PrecomputedData:
+    """
+    Zwraca wynik `precompute_subtitles(raw_lines, min_length)`, korzystając
+    z cache na dysku (wtedy wpisy to SubtitleStore zmapowany z pliku). Bez
+    `cache_dir` zachowuje się jak zwykłe `precompute_subtitles`.
+    """
+    if not cache_dir:
+        return precompute_subtitles(raw_lines, min_length)
+
+    path = _cache_path(cache_dir, cache_key(raw_lines, min_length))
+    data = _load_cached(path)
+    if data is None:
+        data = _save_and_map(path, precompute_subtitles(raw_lines, min_length), len(raw_lines))
+    return data
+
+
+def get_subtitle_db(text_path: Optional[str], min_length: int = 0,
+                    cache_dir: Optional[str] = None) -> PrecomputedData:
+    """
+    Baza napisów czytnika prosto z pliku: przy trafieniu w cache tylko
+    mapowanie tablic, w przeciwnym razie strumieniowe przetwarzanie
+    (`precompute_subtitle_file`) i zapis do cache. Wpisy to zawsze
+    SubtitleStore; brak pliku daje pustą bazę.
+    """
+    if not text_path or not os.path.exists(text_path):
+        return [], {}, None
+    try:
+        path = _cache_path(cache_dir, file_cache_key(text_path, min_length)) if cache_dir else None
+        data = _load_cached(path) if path else None
+        if data is None:
+            data = precompute_subtitle_file(text_path, min_length)
+            if path:
+                data = _save_and_map(path, data, data[0].line_count)
+        return data
+    except Exception as e:
+        print(f"Nie udało się wczytać napisów ({text_path}): {e}")
+        return [], {}, None
+
+
+def store_subtitle_db(text_path: str, min_length: int, cache_dir: Optional[str],
+                      data: PrecomputedData) -> PrecomputedData:
+    """Zapisuje bazę (np. z `update_precomputed`) pod kluczem bieżącej treści pliku."""
+    if not cache_dir:
+        return data
+    try:
+        path = _cache_path(cache_dir, file_cache_key(text_path, min_length))
+    except OSError as e:
+        print(f"Nie udało się zapisać cache napisów: {e}")
+        return data
+    return _save_and_map(path, data, data[0].line_count)
@@ -0,0 +1,181 @@
+"""
+Zwarta reprezentacja bazy napisów dla dużych skryptów (200k+ linii).
+
+Zamiast listy krotek (oryginał, oczyszczona, indeks, długość) i słownika
+wszystkich oczyszczonych linii:
+- oryginały i linie oczyszczone leżą w dwóch buforach UTF-8 z tablicami
+  offsetów (przy wczytaniu z cache - mapowane z pliku, poza stertą Pythona),
+- długości i numery linii to tablice NumPy (współdzielone z NgramIndex),
+- dokładne trafienia wyszukiwane są po posortowanych sumach CRC32.
+
+Oryginał linii jest dekodowany tylko na żądanie (`original_for_line`, log).
+"""
+import zlib
+from itertools import repeat
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Wpis zwracany przez SubtitleStore: (None, oczyszczona, indeks_wiersza, długość).
+# Oryginał nie jest dekodowany w gorącej ścieżce - patrz original_for_line().
+StoreEntry = Tuple[None, str, int, int]
+
+
+def _offsets(parts: Sequence[bytes]) -> np.ndarray:
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in parts], out=offsets[1:])
+    return offsets
+
+
+def _crc32_array(parts: Sequence[bytes]) -> np.ndarray:
+    return np.fromiter((zlib.crc32(p) for p in parts), dtype=np.uint32, count=len(parts))
+
+
+class SubtitleStore:
+    """
+    Sekwencja wpisów bazy napisów (len, indeks, wycinek) - zgodna z listą
+    `SubtitleEntry` tam, gdzie matcher czyta tekst oczyszczony, numer linii
+    i długość. Wycinki zwracają listy krotek (okno lokalne, top-N indeksu).
+    """
+
+    def __init__(self, originals, original_offsets: np.ndarray, cleaned, cleaned_offsets: np.ndarray,
+                 lengths: np.ndarray, line_indices: np.ndarray, line_count: int):
+        self.originals = originals
+        self.original_offsets = original_offsets
+        self.cleaned = cleaned
+        self.cleaned_offsets = cleaned_offsets
+        self.lengths = lengths
+        self.line_indices = line_indices
+        # Liczba wszystkich linii pliku (także odfiltrowanych)
+        self.line_count = line_count
+
+    @classmethod
+    def from_entries(cls, entries: Sequence[tuple], line_count: int) -> 'SubtitleStore':
+        """Buduje magazyn z listy `SubtitleEntry` (oryginał, oczyszczona, indeks, długość)."""
+        columns = list(zip(*entries)) or [(), (), (), ()]
+        originals = [t.encode("utf-8", "surrogatepass") for t in columns[0]]
+        cleaned = [t.encode("utf-8", "surrogatepass") for t in columns[1]]
+        return cls(
+            b"".join(originals), _offsets(originals),
+            b"".join(cleaned), _offsets(cleaned),
+            np.array(columns[3], dtype=np.int32), np.array(columns[2], dtype=np.int32),
+            line_count,
+        )
+
+    @staticmethod
+    def _text(buf, offsets: np.ndarray, pos: int) -> str:
+        return bytes(buf[offsets[pos]:offsets[pos + 1]]).decode("utf-8", "surrogatepass")
+
+    def cleaned_at(self, pos: int) -> str:
+        return self._text(self.cleaned, self.cleaned_offsets, pos)
+
+    def original_at(self, pos: int) -> str:
+        return self._text(self.originals, self.original_offsets, pos)
+
+    def position_of_line(self, line_idx: int) -> Optional[int]:
+        pos = int(np.searchsorted(self.line_indices, line_idx))
+        if pos < len(self.line_indices) and self.line_indices[pos] == line_idx:
+            return pos
+        return None
+
+    def original_for_line(self, line_idx: int) -> str:
+        """Oryginalny tekst linii o numerze `line_idx` ("" dla linii odfiltrowanej)."""
+        pos = self.position_of_line(line_idx)
+        return "" if pos is None else self.original_at(pos)
+
+    def cleaned_list(self) -> List[str]:
+        """Wszystkie linie oczyszczone (tymczasowo - np. do budowy indeksu)."""
+        return self._split(self.cleaned, self.cleaned_offsets, 0, len(self))
+
+    def file_lines(self) -> List[Optional[str]]:
+        """
+        Linie pliku w wersji z magazynu: oryginał dla wpisów, None dla linii
+        odfiltrowanych (ich treść nie jest przechowywana). Do diffu przy
+        przeładowaniu - None nigdy nie jest równe nowej linii.
+        """
+        lines: List[Optional[str]] = [None] * self.line_count
+        originals = self._split(self.originals, self.original_offsets, 0, len(self))
+        for idx, text in zip(self.line_indices.tolist(), originals):
+            lines[idx] = text
+        return lines
+
+    @staticmethod
+    def _split(buf, offsets: np.ndarray, lo: int, hi: int) -> List[str]:
+        """Teksty wpisów lo..hi-1: jedna kopia zakresu bufora zamiast kopii na wpis."""
+        if hi <= lo:
+            return []
+        base = int(offsets[lo])
+        data = bytes(buf[base:int(offsets[hi])])
+        bounds = (offsets[lo:hi + 1] - base).tolist()
+        return [data[a:b].decode("utf-8", "surrogatepass") for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def _entry(self, pos: int) -> StoreEntry:
+        return None, self.cleaned_at(pos), int(self.line_indices[pos]), int(self.lengths[pos])
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            lo, hi, step = key.indices(len(self))
+            if step != 1:
+                return [self._entry(p) for p in range(lo, hi, step)]
+            hi = max(lo, hi)
+            return list(zip(repeat(None), self._split(self.cleaned, self.cleaned_offsets, lo, hi),
+                            self.line_indices[lo:hi].tolist(), self.lengths[lo:hi].tolist()))
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError(key)
+        return self._entry(key)
+
+    def __iter__(self) -> Iterator[StoreEntry]:
+        return iter(self[:])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.original_offsets, self.cleaned_offsets, self.lengths, self.line_indices)
+        return len(self.originals) + len(self.cleaned) + sum(a.nbytes for a in arrays)
+
+
+class ExactIndex:
+    """
+    Odpowiednik słownika {oczyszczona: numer_linii} (pierwsze wystąpienie
+    wygrywa) bez trzymania wszystkich napisów: posortowane CRC32 linii
+    oczyszczonych + pozycje wpisów, weryfikacja przez porównanie tekstu.
+    """
+
+    def __init__(self, store: SubtitleStore, hashes: np.ndarray, order: np.ndarray):
+        self.store = store
+        self.hashes = hashes  # posortowane CRC32
+        self.order = order    # pozycje wpisów w kolejności `hashes`
+
+    @classmethod
+    def build(cls, store: SubtitleStore) -> 'ExactIndex':
+        data = bytes(store.cleaned)
+        bounds = store.cleaned_offsets.tolist()
+        crc = _crc32_array([data[a:b] for a, b in zip(bounds[:-1], bounds[1:])])
+        # Stabilne sortowanie: przy równych sumach mniejsza pozycja (wcześniejsza linia) pierwsza
+        order = np.argsort(crc, kind="stable").astype(np.int32)
+        return cls(store, crc[order], order)
+
+    def get(self, text: str, default=None):
+        h = zlib.crc32(text.encode("utf-8", "surrogatepass"))
+        lo = int(np.searchsorted(self.hashes, h, side="left"))
+        hi = int(np.searchsorted(self.hashes, h, side="right"))
+        for pos in self.order[lo:hi]:
+            if self.store.cleaned_at(int(pos)) == text:
+                return int(self.store.line_indices[pos])
+        return default
+
+    def __contains__(self, text: str) -> bool:
+        return self.get(text) is not None
+
+    def __getitem__(self, text: str) -> int:
+        idx = self.get(text)
+        if idx is None:
+            raise KeyError(text)
+        return idx
+
+    def __len__(self) -> int:
+        return len(self.order)
@@ -0,0 +1,278 @@
+"""
+Cache plików audio wyrenderowanych z góry w przyspieszonym tempie.
+
+Gdy linie czekają w kolejce, odtwarzacz przyspiesza je filtrem `atempo`
+liczonym na żywo (CPU + opóźnienie startu). Tutaj każdy plik może mieć
+gotowe warianty dla temp używanych przez preset (`tempo_steps`,
+mnożniki z `TempoScheduler`).
+Wariant leży w `.lektor_cache/tempo` jako FLAC (bezstratnie, tani
+dekoder), a nazwa pliku zawiera skrót ścieżki, mtime i rozmiaru źródła oraz
+tempo - zmiana pliku źródłowego unieważnia wariant bez żadnego manifestu.
+
+Sprawdzenie, czy wariant istnieje, to odczyt ze słownika (katalog cache
+jest listowany raz), więc nie dotyka dysku w gorącej ścieżce.
+
+Renderowanie w tle podczas gry jest opcjonalne (`audio_tempo_cache`),
+a bez niego czytnik korzysta tylko z wariantów przygotowanych poleceniem
+`audio_tools tempo`. Katalog ma limit rozmiaru (`audio_tempo_cache_mb`):
+po przekroczeniu usuwane są najdawniej używane warianty (LRU - kolejność
+z mtime plików, odświeżana przy zamknięciu dla wariantów użytych w sesji).
+"""
+import hashlib
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.audio_engine import find_ffmpeg_tool, startup_info
+from app.audio_index import AudioEntry, AudioIndex
+
+TEMPO_EXT = ".flac"
+
+
+def tempo_key(tempo: float) -> str:
+    """Tempo z dokładnością filtra (`build_filter_chain` formatuje je do 2 miejsc)."""
+    return f"{tempo:.2f}"
+
+
+def tempo_steps(base_speed: float, multipliers: Iterable[float]) -> List[float]:
+    """Tempa używane przez preset: bazowe razy każdy mnożnik kolejki (bez 1.00)."""
+    steps = {tempo_key(base_speed * m) for m in multipliers}
+    return sorted(float(s) for s in steps if tempo_key(float(s)) != tempo_key(1.0))
+
+
+def variant_name(entry: AudioEntry, tempo: float) -> str:
+    source = f"{os.path.abspath(entry.path)}|{entry.mtime_ns}|{entry.size}"
+    digest = hashlib.sha1(source.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+    return f"{digest}@{tempo_key(tempo)}{TEMPO_EXT}"
+
+
+def render_variant(source: str, target: str, tempo: float, ffmpeg_cmd: str) -> bool:
+    """
+    Renderuje `source` w tempie `tempo` do `target` (zapis atomowy).
+    Funkcja modułu - wywoływana w procesach puli.
+    """
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        result = subprocess.run(
+            [ffmpeg_cmd, "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+             "-i", source, "-af", f"atempo={tempo_key(tempo)}", "-c:a", "flac", "-f", "flac", tmp_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            startupinfo=startup_info(),
+        )
+        if result.returncode != 0:
+            return False
+        os.replace(tmp_path, target)
+        return True
+    except OSError:
+        return False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class TempoCache:
+    """
+    Warianty tempa dla plików z AudioIndex. `lookup()` zwraca gotowy plik,
+    `request()` zleca wyrenderowanie brakującego wariantu w tle (tylko przy
+    `render_missing`). `max_bytes` ogranicza rozmiar katalogu (0 = bez limitu).
+    """
+
+    def __init__(self, cache_dir: str, audio_index: AudioIndex, ffmpeg_cmd: Optional[str] = None,
+                 render_missing: bool = False, max_bytes: int = 0):
+        self.cache_dir = cache_dir
+        self.ffmpeg_cmd = ffmpeg_cmd or find_ffmpeg_tool("ffmpeg")
+        self.render_missing = render_missing
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: Dict[str, AudioEntry] = {e.path: e for e in audio_index.entries.values()}
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()  # bez ponawiania w tej sesji (np. brak ffmpeg)
+        self._used: Set[str] = set()
+        self._executor: Optional[Executor] = None
+        # nazwa wariantu -> rozmiar (B), od najdawniej używanego
+        self._available: "OrderedDict[str, int]" = OrderedDict()
+        self.nbytes = 0
+        try:
+            files = [e for e in os.scandir(cache_dir) if e.name.endswith(TEMPO_EXT) and e.is_file()]
+            for item in sorted(files, key=lambda e: e.stat().st_mtime):
+                self._available[item.name] = item.stat().st_size
+                self.nbytes += item.stat().st_size
+        except OSError:
+            pass
+        with self._lock:
+            self._evict()
+
+    def lookup(self, audio_file: str, tempo: float) -> Optional[str]:
+        entry = self._entries.get(audio_file)
+        if entry is None:
+            return None
+        name = variant_name(entry, tempo)
+        with self._lock:
+            if name not in self._available:
+                return None
+            self._available.move_to_end(name)
+            self._used.add(name)
+        return os.path.join(self.cache_dir, name)
+
+    def _add(self, name: str, protect: Iterable[str] = ()) -> bool:
+        """Rejestruje nowy plik wariantu (pod blokadą); False, gdy limit nie pozwala go zatrzymać."""
+        try:
+            size = os.path.getsize(os.path.join(self.cache_dir, name))
+        except OSError:
+            return True
+        self.nbytes += size - self._available.pop(name, 0)
+        self._available[name] = size
+        return self._evict(protect)
+
+    def _discard(self, name: str):
+        """Usuwa plik wariantu, który nie mieści się w limicie (pod blokadą)."""
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return
+        self.nbytes -= self._available.pop(name, 0)
+        self._used.discard(name)
+
+    def _evict(self, protect: Iterable[str] = ()) -> bool:
+        """
+        Usuwa najdawniej używane warianty ponad `max_bytes` (pod blokadą),
+        z pominięciem `protect`. Zwraca True, gdy katalog mieści się w limicie.
+        """
+        if not self.max_bytes:
+            return True
+        protect = set(protect)
+        for name in list(self._available):
+            if self.nbytes <= self.max_bytes:
+                break
+            if name in protect:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # np. plik właśnie odtwarzany (Windows)
+            self.nbytes -= self._available.pop(name)
+            self._used.discard(name)
+        return self.nbytes <= self.max_bytes
+
+    def request(self, audio_file: str, tempo: float):
+        """Renderuje brakujący wariant w tle (jeden wątek, proces ffmpeg)."""
+        if not self.render_missing:
+            return
+        entry = self._entries.get(audio_file)
+        if entry is None:
+            return
+        name = variant_name(entry, tempo)
+        with self._lock:
+            if name in self._available or name in self._pending or name in self._failed:
+                return
+            self._pending.add(name)
+            if self._executor is None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tempo")
+        future = self._executor.submit(
+            render_variant, entry.path, os.path.join(self.cache_dir, name), tempo, self.ffmpeg_cmd
+        )
+        future.add_done_callback(lambda f, n=name: self._finished(n, f))
+
+    def _finished(self, name: str, future):
+        with self._lock:
+            self._pending.discard(name)
+            if not future.cancelled() and future.exception() is None and future.result():
+                self._add(name)
+            else:
+                self._failed.add(name)
+
+    def missing(self, tempos: Iterable[float]) -> List[Tuple[AudioEntry, float, str]]:
+        """Lista (wpis, tempo, nazwa wariantu) do wyrenderowania."""
+        result = []
+        for entry in self._entries.values():
+            for tempo in tempos:
+                name = variant_name(entry, tempo)
+                if name not in self._available:
+                    result.append((entry, tempo, name))
+        return result
+
+    def fill(self, tempos: Iterable[float], workers: Optional[int] = None, progress=None) -> int:
+        """
+        Renderuje wszystkie brakujące warianty w puli procesów. Zwraca liczbę
+        wyrenderowanych plików; `progress(done, total)` raportuje postęp.
+        Starsze warianty ustępują nowym w granicach `max_bytes`; gdy limit
+        wypełnią same nowe pliki, renderowanie jest przerywane, a pliki ponad
+        limit (także z zadań, które zdążyły wystartować) są usuwane.
+        """
+        jobs = self.missing(list(tempos))
+        if not jobs:
+            return 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        rendered = []
+        limit_reached = False
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(render_variant, entry.path, os.path.join(self.cache_dir, name),
+                            tempo, self.ffmpeg_cmd): name
+                for entry, tempo, name in jobs
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                name = futures[future]
+                if limit_reached:
+                    # Zadanie uruchomione przed przerwaniem - jego plik się nie zmieści
+                    if not future.cancelled() and future.exception() is None and future.result():
+                        with self._lock:
+                            self._discard(name)
+                    continue
+                if future.result():
+                    rendered.append(name)
+                    with self._lock:
+                        within_limit = self._add(name, protect=rendered)
+                        if not within_limit:
+                            self._discard(name)
+                    if not within_limit:
+                        rendered.pop()
+                        print(f"Osiągnięto limit katalogu wariantów ({self.max_bytes / 1048576:.0f} MB) - "
+                              f"zwiększ audio_tempo_cache_mb, aby wyrenderować resztę.")
+                        limit_reached = True
+                        for pending in futures:
+                            pending.cancel()
+                        continue
+                if progress:
+                    progress(done, len(jobs))
+        return len(rendered)
+
+    def prune(self) -> int:
+        """Usuwa warianty, których źródło zniknęło lub się zmieniło."""
+        valid_prefixes = {variant_name(e, 1.0).split("@")[0] for e in self._entries.values()}
+        removed = 0
+        with self._lock:
+            for name in list(self._available):
+                if name.split("@")[0] not in valid_prefixes:
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+                    except OSError:
+                        continue  # plik zostaje, więc liczy się do rozmiaru katalogu
+                    self.nbytes -= self._available.pop(name)
+                    self._used.discard(name)
+        return removed
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        # Kolejność LRU między sesjami: mtime wariantów użytych w tej sesji
+        with self._lock:
+            used, self._used = self._used, set()
+        for name in used:
+            try:
+                os.utime(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,79 @@
+"""
+Dobór tempa kolejnych linii na podstawie znanej długości klipów.
+
+Dawniej każda linia dodana, gdy coś grało lub czekało w kolejce, dostawała
+stały mnożnik `audio_speed_inc` - przy szybkim dialogu zaległości rosły.
+`TempoScheduler` śledzi przewidywany czas zakończenia kolejki (długości
+z AudioIndex) i dla nowej linii wybiera najmniejszy mnożnik, przy którym
+cała zaległość skończy się w budżecie opóźnienia (`audio_latency_budget`).
+Mnożnik jest zaokrąglany w górę do progów z `speed_steps`, żeby warianty
+z TempoCache mogły być wyrenderowane z góry.
+"""
+import math
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Długość przyjmowana dla klipów, których nagłówka nie udało się odczytać
+DEFAULT_CLIP_SECONDS = 3.0
+
+
+def speed_steps(speed_inc: float, speed_max: float, step: float = 0.1) -> List[float]:
+    """Dozwolone mnożniki tempa: 1.0, co `step` do `speed_max`, plus `audio_speed_inc`."""
+    speed_max = max(1.0, speed_max)
+    steps = {1.0, round(min(max(speed_inc, 1.0), speed_max), 2), round(speed_max, 2)}
+    for k in range(1, int(math.floor((speed_max - 1.0) / step + 1e-9)) + 1):
+        steps.add(round(1.0 + k * step, 2))
+    return sorted(steps)
+
+
+class TempoScheduler:
+    """
+    Przewiduje zaległość kolejki audio i wybiera mnożnik tempa nowej linii.
+    Wywoływany z wątku dopasowania; `plan()` zwraca (mnożnik, przewidywane
+    oczekiwanie na start w sekundach).
+    """
+
+    def __init__(self, budget: float, steps: List[float], base_speed_callback: Callable[[], float]):
+        self.budget = budget
+        self.steps = sorted(steps) or [1.0]
+        self.base_speed_callback = base_speed_callback
+        self._busy_until = 0.0
+        self._lock = threading.Lock()
+
+    def backlog(self, now: Optional[float] = None) -> float:
+        """Przewidywany czas (s) do zakończenia wszystkiego, co gra i czeka."""
+        now = time.perf_counter() if now is None else now
+        return max(0.0, self._busy_until - now)
+
+    def _pick(self, required: float) -> float:
+        for step in self.steps:
+            if step >= required - 1e-6:
+                return step
+        return self.steps[-1]
+
+    def plan(self, duration: Optional[float], busy: bool,
+             now: Optional[float] = None) -> Tuple[float, float]:
+        """
+        `duration` - długość klipu w tempie 1.0 (None = nieznana),
+        `busy` - czy coś gra lub czeka (jak dawny warunek przyspieszenia).
+        """
+        base = max(0.5, self.base_speed_callback() or 1.0)
+        seconds = duration if duration else DEFAULT_CLIP_SECONDS
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            if not busy:
+                # Kolejka faktycznie pusta - przewidywania z przeszłości nieaktualne
+                self._busy_until = now
+            wait = self.backlog(now)
+
+            multiplier = 1.0
+            if busy:
+                room = self.budget - wait
+                if room <= 0:
+                    multiplier = self.steps[-1]
+                else:
+                    multiplier = self._pick(seconds / (base * room))
+
+            self._busy_until = now + wait + seconds / (base * multiplier)
+        return multiplier, wait
@@ -1,5 +1,9 @@
 import re
 
+# Wersja reguł normalizacji (clean_text). Zwiększ przy każdej zmianie wyniku
+# czyszczenia - unieważnia to zapisany na dysku cache bazy napisów.
+NORMALIZER_VERSION = 1
+
 VALID_SHORT_WORDS = {
     'a', 'i', 'o', 'u', 'w', 'z',
     'az', 'aż', 'ba', 'bo', 'by', 'ci', 'co', 'da', 'do', 'go', 'ha', 'he', 'hm',
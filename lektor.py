@@ -3,9 +3,6 @@ import sys
 import os
 import queue
 import threading
-from app.optimization_result import OptimizationResultWindow
-from app.processing_window import ProcessingWindow
-from app.optimization_wizard import OptimizationWizard
 import subprocess
 import time
 import argparse
@@ -53,20 +50,22 @@ from app.config_manager import (
     STANDARD_WIDTH,
     STANDARD_HEIGHT,
 )
-from app.reader import ReaderThread
-from app.player import PlayerThread
+from app.playback_queue import PlaybackQueue
 from app.log import LogWindow
 from app.settings import SettingsDialog
 from app.area_selector import AreaSelector, ColorSelector
-from app.area_manager import AreaManagerWindow
-from app.capture import capture_fullscreen, reset_pipewire_source, SCREENSHOT_BACKEND
+from app.capture import capture_fullscreen, reset_pipewire_source, invalidate_capture, expected_backend
 from app.help import HelpWindow
-from app.optimizer import SettingsOptimizer
 from app.geometry_utils import calculate_merged_area
 
+# Moduły ciężkie ładowane są przy pierwszym użyciu, nie przy starcie:
+# czytnik i odtwarzacz (OCR, audio) przy START, optymalizator (multiprocessing)
+# przy otwarciu kreatora, menedżer obszarów przy jego otwarciu.
+# Pomiar startu: `python lektor.py --profile-startup`.
+
 # Global events/queues
 stop_event = threading.Event()
-audio_queue = queue.Queue()
+audio_queue = PlaybackQueue()
 log_queue = queue.Queue()
 debug_queue = queue.Queue()
 
@@ -170,6 +169,7 @@ class LektorApp:
         if "x" in res_str:
             w, h = map(int, res_str.split("x"))
             self.config_mgr.display_resolution = (w, h)
+            invalidate_capture()
 
     # -----------------------
 
@@ -308,7 +308,7 @@ class LektorApp:
         self.btn_change_source.pack(side=tk.LEFT, padx=5)
 
         # Disable by default if not wayland
-        if SCREENSHOT_BACKEND != "pipewire_wayland":
+        if expected_backend() != "pipewire_wayland":
             self.btn_change_source.configure(state="disabled")
 
         # Actions Panel (Replaces Colors Panel)
@@ -446,7 +446,7 @@ class LektorApp:
         img = None
         # Zapobiegaj wywołaniu portalu PipeWire przy starcie aplikacji (lazy loading)
         if (
-            app.capture.SCREENSHOT_BACKEND == "pipewire_wayland"
+            app.capture.expected_backend() == "pipewire_wayland"
             and app.capture._PIPEWIRE_CAPTURE is None
         ):
             pass
@@ -575,18 +575,27 @@ class LektorApp:
             except Exception:
                 pass
 
-        # Sync UI state from canonical properties via ConfigManager
+        # Indeks plików audio (jeden skan katalogu, cache na dysku) i detekcja formatu
+        detected_ext = self.config_mgr.load_audio_index().dominant_ext
+        if detected_ext and detected_ext != self.config_mgr.audio_ext:
+            self.config_mgr.audio_ext = detected_ext
+
+        self._sync_preset_vars()
+
+        # Refresh Area Manager if open
+        if self.area_mgr_win and self.area_mgr_win.winfo_exists():
+            self.area_mgr_win.refresh_data()
+
+        self.refresh_color_canvas()
+
+    def _sync_preset_vars(self):
+        """Sync UI state from canonical properties via ConfigManager."""
         self.var_speed.set(self.config_mgr.audio_speed)
         self.lbl_spd.configure(text=f"{self.var_speed.get():.2f}x")
 
         self.var_volume.set(self.config_mgr.audio_volume)
         self.lbl_vol.configure(text=f"{self.var_volume.get():.2f}")
 
-        # Automatyczna detekcja formatu audio
-        detected_ext = self._detect_audio_format(self.config_mgr.audio_dir or "")
-        if detected_ext and detected_ext != self.config_mgr.audio_ext:
-            self.config_mgr.audio_ext = detected_ext
-
         self.var_audio_ext.set(self.config_mgr.audio_ext)
         self.var_auto_names.set(self.config_mgr.auto_remove_names)
         self.var_capture_interval.set(self.config_mgr.capture_interval)
@@ -611,10 +620,9 @@ class LektorApp:
                 self.var_custom_regex.set(self.config_mgr.regex_pattern or "")
             self.on_regex_changed()
 
-        # Refresh Area Manager if open
-        if self.area_mgr_win and self.area_mgr_win.winfo_exists():
-            self.area_mgr_win.refresh_data()
-
+    def on_preset_reloaded(self):
+        """Preset zmieniony na dysku w trakcie czytania (wątek UI, przed podmianą migawki czytnika)."""
+        self._sync_preset_vars()
         self.refresh_color_canvas()
 
     def on_regex_changed(self, event=None):
@@ -655,6 +663,11 @@ class LektorApp:
             )
         if new:
             setattr(self.config_mgr, key, new)
+            if key == "audio_dir":
+                detected_ext = self.config_mgr.load_audio_index().dominant_ext
+                if detected_ext and detected_ext != self.config_mgr.audio_ext:
+                    self.config_mgr.audio_ext = detected_ext
+                self.var_audio_ext.set(self.config_mgr.audio_ext)
 
     def set_area(self, idx):
         path = self.var_preset_full_path.get()
@@ -715,6 +728,11 @@ class LektorApp:
         new_areas = [a for a in areas if a.id != id_to_clear]
         self.config_mgr.areas = new_areas
 
+    def refresh_runtime_config(self):
+        """Po zmianie ustawień: działający czytnik dostaje nową migawkę (bez restartu)."""
+        if self.is_running and self.reader_thread:
+            self.reader_thread.update_runtime()
+
     def open_settings(self):
         SettingsDialog(self.root, self.config_mgr.settings, self)
         self.config_mgr.save_app_config()
@@ -726,7 +744,7 @@ class LektorApp:
         # Odśwież dostępność przycisku Zmień Okno
         import app.capture
 
-        if app.capture._determine_backend() == "pipewire_wayland":
+        if app.capture._determine_backend(probe=False) == "pipewire_wayland":
             self.btn_change_source.configure(state="normal")
         else:
             self.btn_change_source.configure(state="disabled")
@@ -779,7 +797,7 @@ class LektorApp:
         import app.capture
 
         if (
-            app.capture.SCREENSHOT_BACKEND == "pipewire_wayland"
+            app.capture.get_screenshot_backend() == "pipewire_wayland"
             and app.capture._PIPEWIRE_CAPTURE is None
         ):
             try:
@@ -805,11 +823,16 @@ class LektorApp:
         with audio_queue.mutex:
             audio_queue.queue.clear()
 
+        from app.player import PlayerThread
+        from app.reader import ReaderThread
+
         self.player_thread = PlayerThread(
             stop_event,
             audio_queue,
             base_speed_callback=lambda: self.var_speed.get(),
             volume_callback=lambda: self.var_volume.get(),
+            log_queue=log_queue,
+            pcm_cache_mb=self.config_mgr.audio_pcm_cache_mb,
         )
         self.reader_thread = ReaderThread(
             config_manager=self.config_mgr,
@@ -819,6 +842,8 @@ class LektorApp:
             player_thread=self.player_thread,
             log_queue=log_queue,
             debug_queue=debug_queue,
+            ui_dispatch=lambda fn: self.root.after(0, fn),
+            on_preset_reload=self.on_preset_reloaded,
         )
         self.player_thread.start()
         self.reader_thread.start()
@@ -845,20 +870,6 @@ class LektorApp:
         self.cb_preset.configure(state=s)
         self.cb_res.configure(state=s)
 
-    def _detect_audio_format(self, audio_dir_path: str) -> Optional[str]:
-        if not audio_dir_path or not os.path.exists(audio_dir_path):
-            return None
-
-        valid_exts = {".ogg", ".mp3", ".wav"}
-        try:
-            for f in os.listdir(audio_dir_path):
-                base, ext = os.path.splitext(f)
-                if ext.lower() in valid_exts:
-                    return ext.lower()
-        except Exception:
-            pass
-        return None
-
     def on_close(self):
         self.is_running = False
         if self.reader_thread and self.reader_thread.is_alive():
@@ -867,6 +878,10 @@ class LektorApp:
             self.game_process.terminate()
         if hasattr(self, "hotkey_listener") and self.hotkey_listener:
             self.hotkey_listener.stop()
+        self.config_mgr.flush()
+        stats = self.config_mgr.write_stats()
+        print(f"Config: {stats['changes']} zmian, {stats['writes']} zapisów "
+              f"({stats['saved']} zaoszczędzonych)")
         self.root.destroy()
 
     def _check_debug_queue(self):
@@ -982,8 +997,8 @@ class LektorApp:
 
         self.color_canvas.delete("all")
 
-        # Use authoritative ConfigManager to get areas
-        areas = self.config_mgr.get_areas()
+        # Use authoritative ConfigManager to get areas (read-only views)
+        areas = self.config_mgr.get_area_views()
         colors = []
         if areas:
             a1 = next((a for a in areas if self._is_main_area(a.id)), None)
@@ -1097,6 +1112,8 @@ class LektorApp:
             subs = self.config_mgr.load_text_lines(txt_path)
 
         # Open Manager: pass the LektorApp instance
+        from app.area_manager import AreaManagerWindow
+
         self.area_mgr_win = AreaManagerWindow(self.root, self, subs)
 
     def _get_screen_size(self):
@@ -1169,7 +1186,7 @@ class LektorApp:
                 old_res = self.config_mgr.display_resolution
                 try:
                     self.config_mgr.display_resolution = (sw, sh)
-                    areas_to_show = self.config_mgr.get_areas()
+                    areas_to_show = self.config_mgr.get_area_views()
                     # AreaSelector currently expects a list of dicts with 'rect' key
                     existing = [a._to_dict() for a in areas_to_show]
                 finally:
@@ -1230,6 +1247,10 @@ class LektorApp:
             messagebox.showerror("Błąd", "Plik napisów jest pusty.")
             return
 
+        from app.optimization_wizard import OptimizationWizard
+        from app.optimizer import SettingsOptimizer
+        from app.processing_window import ProcessingWindow
+
         def on_wizard_finish(frames_data, mode, initial_color=None, advanced_settings=None):
             # frames_data: list of {'image': PIL, 'rect': (x,y,w,h) or None}
             valid_images = [f["image"] for f in frames_data]
@@ -1424,6 +1445,8 @@ class LektorApp:
             self.on_preset_loaded()
 
         # Show result dialog
+        from app.optimization_result import OptimizationResultWindow
+
         OptimizationResultWindow(
             self.root,
             score,
@@ -1437,8 +1460,15 @@ class LektorApp:
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--preset", type=str)
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Zmierz czas importu przy zimnym starcie i zakończ (kod 1 = ponad budżet)")
+    parser.add_argument("--startup-budget", type=float, default=None, help="Budżet startu w ms")
     parser.add_argument("game_command", nargs=argparse.REMAINDER)
     args = parser.parse_args()
+    if args.profile_startup:
+        from app.startup_profile import STARTUP_BUDGET_MS, profile_startup
+
+        sys.exit(profile_startup(args.startup_budget or STARTUP_BUDGET_MS))
     cmd = args.game_command
     if cmd and cmd[0] == "--":
         cmd.pop(0)
@@ -0,0 +1,29 @@
+import os
+import wave
+
+from app.audio_index import get_audio_index
+
+
+def _write_wav(path, frames):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\x00\x00" * frames)
+
+
+def test_cache_rescans_file_overwritten_in_place(tmp_path):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    cache_dir = str(tmp_path / "cache")
+    wav = str(audio_dir / "output1 (1).wav")
+    _write_wav(wav, 8000)
+    assert get_audio_index(str(audio_dir), cache_dir, ".wav").duration_for(0) == 1.0
+
+    dir_mtime = os.stat(audio_dir).st_mtime_ns
+    _write_wav(wav, 16000)
+    os.utime(audio_dir, ns=(dir_mtime, dir_mtime))
+
+    index = get_audio_index(str(audio_dir), cache_dir, ".wav")
+    assert index.duration_for(0) == 2.0
+    assert index.entry_for(0).size == os.path.getsize(wav)
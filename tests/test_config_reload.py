@@ -0,0 +1,47 @@
+import json
+
+from app.config_manager import ConfigManager
+
+
+def _external_edit(path, **values):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data.update(values)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+
+def _load(tmp_path):
+    cm = ConfigManager()
+    path = cm.ensure_preset_exists(str(tmp_path))
+    cm.load_preset(path)
+    return cm, path
+
+
+def test_reload_keeps_external_edit_over_pending_write(tmp_path):
+    cm, path = _load(tmp_path)
+    cm.similarity = 7.0  # zapis odroczony, jeszcze nie na dysku
+    _external_edit(path, similarity=12.0)
+
+    cm.reload_preset()
+    cm.flush()
+
+    assert cm.similarity == 12.0
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["similarity"] == 12.0
+
+
+def test_reload_reapplies_untouched_local_changes(tmp_path):
+    cm, path = _load(tmp_path)
+    cm.capture_interval = 0.9
+    _external_edit(path, similarity=12.0)
+
+    cm.reload_preset()
+    cm.flush()
+
+    assert cm.similarity == 12.0
+    assert cm.capture_interval == 0.9
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["similarity"] == 12.0
+    assert data["capture_interval"] == 0.9
@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import tempo_cache
+from app.audio_index import AudioEntry, AudioIndex
+from app.tempo_cache import TempoCache
+
+
+def _cache(tmp_path, count, max_bytes):
+    entries = {i: AudioEntry(str(tmp_path / f"output1 ({i + 1}).wav"), ".wav", 10, i, 1.0)
+               for i in range(count)}
+    return TempoCache(str(tmp_path / "tempo"), AudioIndex(str(tmp_path), entries),
+                      ffmpeg_cmd="ffmpeg", max_bytes=max_bytes)
+
+
+def _disk_bytes(cache_dir):
+    return sum(e.stat().st_size for e in os.scandir(cache_dir))
+
+
+def test_fill_stops_at_limit_without_leaving_files(tmp_path, monkeypatch):
+    started = []
+
+    def fake_render(source, target, tempo, ffmpeg_cmd):
+        started.append(target)
+        if len(started) > 3:
+            time.sleep(0.2)  # kończy się już po przerwaniu renderowania
+        with open(target, "wb") as f:
+            f.write(b"\x00" * 100)
+        return True
+
+    monkeypatch.setattr(tempo_cache, "render_variant", fake_render)
+    monkeypatch.setattr(tempo_cache, "ProcessPoolExecutor", ThreadPoolExecutor)
+    cache = _cache(tmp_path, 8, max_bytes=250)
+
+    assert cache.fill([1.5], workers=4) == 2
+    assert _disk_bytes(cache.cache_dir) == cache.nbytes == 200
+    assert len(os.listdir(cache.cache_dir)) == 2
+
+
+def test_prune_keeps_size_of_files_it_cannot_remove(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, 0, max_bytes=0)
+    os.makedirs(cache.cache_dir)
+    for name in ("a@1.50.flac", "b@1.50.flac"):
+        with open(os.path.join(cache.cache_dir, name), "wb") as f:
+            f.write(b"\x00" * 100)
+        cache._available[name] = 100
+        cache.nbytes += 100
+
+    real_remove = os.remove
+
+    def remove(path):
+        if path.endswith("a@1.50.flac"):
+            raise PermissionError(path)
+        real_remove(path)
+
+    monkeypatch.setattr(os, "remove", remove)
+    assert cache.prune() == 1
+    assert cache.nbytes == _disk_bytes(cache.cache_dir) == 100